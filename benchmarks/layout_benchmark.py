@@ -0,0 +1,47 @@
+# Measure how the layered layout of the function block network scales with the number of blocks.
+# Run from the repository root: python -m benchmarks.layout_benchmark
+import argparse
+import random
+import time
+
+from diac.layout import layered_layout
+from radio.block import Block, Connection
+from radio.flowgraph import FlowGraph
+
+
+def synthesize_graph(num_blocks, fan_out, seed=0):
+    """
+    Build a FlowGraph where every block feeds up to fan_out blocks further down the chain.
+
+    :param num_blocks: Number of blocks.
+    :param fan_out: Maximum number of outgoing connections per block.
+    :param seed: Seed of the random connection targets.
+    :return: The FlowGraph.
+    """
+    rng = random.Random(seed)
+    blocks = [Block(f'block_{i}', 'blocks_multiply_const_xx') for i in range(num_blocks)]
+    for i, block in enumerate(blocks[:-1]):
+        for _ in range(rng.randint(1, fan_out)):
+            target = min(num_blocks - 1, i + rng.randint(1, 20))
+            block.add_connection(Connection(block.name, f'block_{target}'))
+    return FlowGraph(blocks)
+
+
+def main():
+    args = argparse.ArgumentParser(description='Benchmark the layered layout of the FB network')
+    args.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000],
+                      help='Number of blocks per synthesized flowgraph')
+    args.add_argument('--fan-out', type=int, default=3, help='Maximum outgoing connections per block')
+    args = args.parse_args()
+
+    print(f"{'blocks':>8} {'edges':>8} {'seconds':>10} {'us/block':>10}")
+    for size in args.sizes:
+        graph = synthesize_graph(size, args.fan_out)
+        start = time.perf_counter()
+        layered_layout(graph)
+        seconds = time.perf_counter() - start
+        print(f"{size:>8} {graph.num_edges:>8} {seconds:>10.4f} {seconds / size * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+# Measure how Parser.parse scales with the size of the flowgraph.
+# Run from the repository root: python -m benchmarks.parse_benchmark
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synth import write_flowgraph
+from radio.parser import Parser
+
+
+def time_parse(path, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Parser(path).parse()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    args = argparse.ArgumentParser(description='Benchmark the GNU Radio flowgraph parser')
+    args.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 2000, 4000, 8000],
+                      help='Number of blocks per synthesized flowgraph')
+    args.add_argument('--repeat', type=int, default=3, help='Number of runs per size, the best is reported')
+    args = args.parse_args()
+
+    print(f"{'blocks':>8} {'seconds':>10} {'us/block':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f'flowgraph_{size}.grc')
+            write_flowgraph(path, size)
+            seconds = time_parse(path, args.repeat)
+            print(f"{size:>8} {seconds:>10.4f} {seconds / size * 1e6:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+# Time every phase of the conversion pipeline on synthesized flowgraphs and compare against a baseline.
+# Run from the repository root: python -m benchmarks.pipeline --output results.json [--baseline baseline.json]
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from benchmarks.synth import write_flowgraph, write_project
+from diac.fb_registry import FunctionBlockRegistry
+from diac.types import IEC61499Converter
+from diac.writer import generate_fb_xml, generate_fbn, replace_subappnetwork_in_file
+from radio.parser import Parser
+
+PHASES = ["parse", "generate_fb_xml", "generate_fbn", "replace_subappnetwork_in_file"]
+
+
+class PhaseRecorder:
+    """Records the wall time of each phase, or the peak memory above the start of each phase when tracing."""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.seconds = {}
+        self.peak_bytes = {}
+
+    @contextmanager
+    def phase(self, name):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            start = tracemalloc.get_traced_memory()[0]
+            yield
+            self.peak_bytes[name] = tracemalloc.get_traced_memory()[1] - start
+        else:
+            start = time.perf_counter()
+            yield
+            self.seconds[name] = time.perf_counter() - start
+
+
+def run_pipeline(flowgraph, project, recorder: PhaseRecorder, partition_size=None):
+    """Run the conversion pipeline once, recording every phase."""
+    with recorder.phase("parse"):
+        parsed = Parser(flowgraph).parse()
+
+    with recorder.phase("generate_fb_xml"):
+        converted = IEC61499Converter.convert_many(parsed)
+        registry = FunctionBlockRegistry()
+        fb_types = [registry.register(block, block_converted) for block, block_converted in zip(parsed, converted)]
+        registry.assign_names()
+        names = [fb_type.name for fb_type in fb_types]
+        for fb_type in registry:
+            generate_fb_xml(fb_type.block, fb_type.name, fb_type.converted)
+
+    with recorder.phase("generate_fbn"):
+        network = generate_fbn(parsed, names, converted, partition_size=partition_size)
+
+    with recorder.phase("replace_subappnetwork_in_file"):
+        replace_subappnetwork_in_file(project, network)
+    return len(parsed), parsed.num_edges
+
+
+def benchmark_size(directory, size, options, repeat):
+    """
+    Benchmark one flowgraph size, the best wall time of all repetitions and the peak memory of one extra run.
+
+    :return: A result dictionary for the size.
+    """
+    flowgraph = os.path.join(directory, f"flowgraph_{size}.grc")
+    template = os.path.join(directory, f"project_{size}.sys")
+    project = os.path.join(directory, "project.sys")
+    write_flowgraph(flowgraph, size, fan_out=options.fan_out, type_mix=tuple(options.types),
+                    num_parameters=options.parameters, seed=options.seed)
+    write_project(template, padding_fbs=options.project_padding)
+
+    best = {}
+    for _ in range(repeat):
+        shutil.copy(template, project)
+        wall = PhaseRecorder()
+        blocks, connections = run_pipeline(flowgraph, project, wall, options.partition)
+        for phase, seconds in wall.seconds.items():
+            best[phase] = min(seconds, best.get(phase, seconds))
+
+    # Tracing slows everything down, so memory is measured in a separate run
+    shutil.copy(template, project)
+    memory = PhaseRecorder(trace_memory=True)
+    tracemalloc.start()
+    try:
+        run_pipeline(flowgraph, project, memory, options.partition)
+    finally:
+        tracemalloc.stop()
+
+    return {"size": size, "blocks": blocks, "connections": connections,
+            "phases": {phase: {"seconds": best[phase], "peak_bytes": memory.peak_bytes[phase]} for phase in PHASES}}
+
+
+def compare(results, baseline, threshold):
+    """
+    Flag phases that got slower than the baseline by more than the threshold.
+
+    :return: A list of regression descriptions.
+    """
+    regressions = []
+    baseline_sizes = {entry["size"]: entry for entry in baseline["results"]}
+    for entry in results["results"]:
+        reference = baseline_sizes.get(entry["size"])
+        if reference is None:
+            continue
+        for phase, measured in entry["phases"].items():
+            expected = reference["phases"].get(phase)
+            if expected and measured["seconds"] > expected["seconds"] * (1 + threshold):
+                regressions.append(f"{phase} at {entry['size']} blocks: {measured['seconds']:.4f}s, "
+                                   f"baseline {expected['seconds']:.4f}s")
+    return regressions
+
+
+def main():
+    args = argparse.ArgumentParser(description='Benchmark the phases of the GNU Radio to 4diac conversion')
+    args.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000], help='Number of blocks')
+    args.add_argument('--fan-out', type=int, default=2, help='Maximum outgoing connections per block')
+    args.add_argument('--types', nargs='+', default=['complex', 'float'], help='Stream types of the blocks')
+    args.add_argument('--parameters', type=int, default=4, help='Parameters per block')
+    args.add_argument('--project-padding', type=int, default=1000,
+                      help='FBs in an unrelated application of the 4diac project')
+    args.add_argument('--partition', type=int, help='Split the network into nested SubApps of this size')
+    args.add_argument('--seed', type=int, default=0, help='Seed of the synthesized flowgraphs')
+    args.add_argument('--repeat', type=int, default=3, help='Runs per size, the best wall time is reported')
+    args.add_argument('--output', type=str, help='Write the results as JSON to this file')
+    args.add_argument('--baseline', type=str, help='JSON results of an earlier run to compare against')
+    args.add_argument('--threshold', type=float, default=0.2,
+                      help='Relative slowdown against the baseline that counts as a regression')
+    args = args.parse_args()
+
+    results = {"python": platform.python_version(),
+               "config": {"fan_out": args.fan_out, "types": args.types, "parameters": args.parameters,
+                          "project_padding": args.project_padding, "partition": args.partition, "seed": args.seed,
+                          "repeat": args.repeat},
+               "results": []}
+    print(f"{'blocks':>8} {'phase':<30} {'seconds':>10} {'peak KiB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            entry = benchmark_size(directory, size, args, args.repeat)
+            results["results"].append(entry)
+            for phase, measured in entry["phases"].items():
+                print(f"{size:>8} {phase:<30} {measured['seconds']:>10.4f} {measured['peak_bytes'] / 1024:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for regression in regressions:
+                print("  " + regression)
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
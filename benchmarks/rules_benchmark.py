@@ -0,0 +1,86 @@
+# Measure compiling, loading from the cache and matching a large rules file.
+# Run from the repository root: python -m benchmarks.rules_benchmark
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import yaml
+
+from diac.rules import load_rules
+from radio.block import Block
+
+
+def synthesize_rules(num_rules, num_ids, pattern_share=0.05, seed=0):
+    """
+    Build a rules file where most rules name an exact block id and some use an id pattern.
+
+    :param num_rules: Number of rules.
+    :param num_ids: Number of distinct block ids the rules are spread over.
+    :param pattern_share: Share of the rules matching the block id by a pattern.
+    :param seed: Seed of the random choices.
+    :return: The rules file as a dictionary.
+    """
+    rng = random.Random(seed)
+    rules = []
+    for i in range(num_rules):
+        rule = {"rename": {"param_0": "IN"}, "omit": ["vlen"]}
+        if rng.random() < pattern_share:
+            rule["id_pattern"] = f"block_{rng.randrange(num_ids)}\\d*_.*"
+        else:
+            rule["id"] = f"block_{rng.randrange(num_ids)}"
+            rule["parameters"] = {"param_1": f"{rng.randrange(10)}\\d*"}
+            rule["fb_type"] = f"library::FB_{i}"
+        rules.append(rule)
+    return {"rules": rules}
+
+
+def synthesize_blocks(num_blocks, num_ids, seed=0):
+    rng = random.Random(seed)
+    blocks = []
+    for i in range(num_blocks):
+        block = Block(f"b_{i}", f"block_{rng.randrange(num_ids * 2)}")
+        block.type = "complex"
+        block.parameters = {"param_0": str(rng.randrange(100)), "param_1": str(rng.randrange(1000)), "vlen": "1"}
+        blocks.append(block)
+    return blocks
+
+
+def main():
+    args = argparse.ArgumentParser(description='Benchmark compiling and matching a rules file')
+    args.add_argument('--rules', type=int, nargs='+', default=[100, 1000, 10000], help='Number of rules')
+    args.add_argument('--ids', type=int, default=500, help='Number of distinct block ids in the rules')
+    args.add_argument('--blocks', type=int, default=100000, help='Number of blocks to match')
+    args = args.parse_args()
+
+    blocks = synthesize_blocks(args.blocks, args.ids)
+    print(f"{'rules':>8} {'compile s':>10} {'cached s':>10} {'first s':>10} {'warm s':>10} {'blocks/s':>12} "
+          f"{'matched':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.rules:
+            path = os.path.join(directory, f"rules_{size}.yml")
+            with open(path, 'w') as file:
+                yaml.safe_dump(synthesize_rules(size, args.ids), file)
+            cache = os.path.join(directory, "cache")
+
+            start = time.perf_counter()
+            load_rules(path, cache)
+            compile_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            rules = load_rules(path, cache)
+            cached_seconds = time.perf_counter() - start
+
+            # The first pass fills the candidates of every block id, the second one only matches
+            start = time.perf_counter()
+            rules.match_all(blocks)
+            first_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            matched = sum(rule is not None for rule in rules.match_all(blocks))
+            warm_seconds = time.perf_counter() - start
+            print(f"{size:>8} {compile_seconds:>10.4f} {cached_seconds:>10.4f} {first_seconds:>10.4f} "
+                  f"{warm_seconds:>10.4f} {len(blocks) / warm_seconds:>12.0f} {matched:>8}")
+
+
+if __name__ == '__main__':
+    main()
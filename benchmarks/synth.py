@@ -0,0 +1,71 @@
+# Synthesize GNU Radio flowgraphs and matching 4diac projects for the benchmarks
+import random
+
+import yaml
+
+from diac.xml_writer import XML_DECLARATION
+
+BLOCK_IDS = ["blocks_multiply_const_xx", "blocks_add_const_vxx", "blocks_throttle", "low_pass_filter",
+             "analog_agc_xx", "blocks_delay"]
+
+
+def synthesize_flowgraph(num_blocks, fan_out=1, type_mix=("complex",), num_parameters=2, seed=0):
+    """
+    Build a GRC style flowgraph.
+
+    Block i connects to up to fan_out blocks shortly after it, so the flowgraph is a chain widened by the fan out.
+    Parameter values alternate between integers, reals, booleans and expressions.
+
+    :param num_blocks: Number of blocks, not counting the samp_rate variable.
+    :param fan_out: Maximum number of outgoing connections per block.
+    :param type_mix: GNU Radio stream types the blocks are drawn from.
+    :param num_parameters: Number of parameters per block, besides the advanced tab and type.
+    :param seed: Seed of the random choices, the same arguments always give the same flowgraph.
+    :return: The flowgraph as a dictionary.
+    """
+    rng = random.Random(seed)
+    values = [lambda: str(rng.randint(0, 100000)), lambda: str(rng.random()), lambda: rng.choice(["True", "False"]),
+              lambda: f"samp_rate/{rng.randint(1, 16)}"]
+    blocks = [{'name': 'samp_rate', 'id': 'variable', 'parameters': {'comment': '', 'value': '32000'}}]
+    for i in range(num_blocks):
+        parameters = {'affinity': '', 'alias': '', 'comment': '', 'maxoutbuf': '0', 'minoutbuf': '0',
+                      'type': rng.choice(type_mix), 'vlen': '1'}
+        for p in range(num_parameters):
+            parameters[f'param_{p}'] = values[p % len(values)]()
+        blocks.append({'name': f'block_{i}', 'id': rng.choice(BLOCK_IDS), 'parameters': parameters,
+                       'states': {'state': 'enabled'}})
+
+    connections = []
+    for i in range(num_blocks - 1):
+        targets = {min(num_blocks - 1, i + rng.randint(1, 8)) for _ in range(rng.randint(1, fan_out))}
+        for target in sorted(targets):
+            connections.append([f'block_{i}', '0', f'block_{target}', '0'])
+    return {'options': {'parameters': {'title': f'synthetic_{num_blocks}'}}, 'blocks': blocks,
+            'connections': connections, 'metadata': {'file_format': 1}}
+
+
+def write_flowgraph(path, num_blocks, **kwargs):
+    with open(path, 'w') as file:
+        yaml.safe_dump(synthesize_flowgraph(num_blocks, **kwargs), file, sort_keys=False)
+
+
+def write_project(path, num_devices=1, padding_fbs=0):
+    """
+    Write a dummy 4diac system project with an empty SubAppNetwork.
+
+    :param path: Path of the project file.
+    :param num_devices: Number of devices, to make the rest of the project bigger.
+    :param padding_fbs: Number of FBs in a second application, also to make the project bigger.
+    """
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(XML_DECLARATION)
+        file.write('<System Name="benchmark" Comment="">\n')
+        file.write('\t<Application Name="benchmarkApp" Comment="">\n\t\t<SubAppNetwork>\n\t\t</SubAppNetwork>\n'
+                   '\t</Application>\n')
+        file.write('\t<Application Name="paddingApp" Comment="">\n\t\t<FBNetwork>\n')
+        for i in range(padding_fbs):
+            file.write(f'\t\t\t<FB Name="E_CYCLE_{i}" Type="E_CYCLE" x="{i * 10}" y="{i * 10}"/>\n')
+        file.write('\t\t</FBNetwork>\n\t</Application>\n')
+        for i in range(num_devices):
+            file.write(f'\t<Device Name="FORTE_PC_{i}" Type="FORTE_PC" x="{i * 100}" y="100"/>\n')
+        file.write('</System>\n')
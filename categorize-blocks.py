@@ -1,41 +1,77 @@
-from gnuradio import blocks
-import inspect
+import argparse
+import os
 from collections import defaultdict
 
-def categorize_blocks_by_type():
+import yaml
+
+from radio.block_index import BlockIndex, DEFAULT_BLOCK_DIRECTORY, DEFAULT_INDEX_PATH
+
+DEFAULT_MAPPING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "block_categories.yml")
+
+
+def load_category_mapping(path):
     """
-    Categorizes all blocks in the blocks module of GNU Radio into predefined types.
+    Load the categories that override the GRC categories, a YAML mapping of category names to lists of block ids.
+
+    A category without any block ids, written as ``name:``, overrides nothing.
+
+    :return: A dictionary of block id to category.
+    :raise ValueError: If the file holds no such mapping.
     """
-    # Predefined categories based on typical block purposes
-    predefined_categories = {
-        "Audio": ["audio_source", "audio_sink"],
-        "Boolean Operators": ["and_bb", "or_bb", "xor_bb", "not_bb"],
-        "Byte Operators": ["pack_k_bits_bb", "unpack_k_bits_bb"],
-        "Filters": ["fir_filter_ccf", "iir_filter_ffd", "band_pass_filter"],
-        # Add more categories and blocks as needed
-    }
+    with open(path, 'r') as file:
+        predefined_categories = yaml.safe_load(file) or {}
+    if not isinstance(predefined_categories, dict):
+        raise ValueError(f"{path}: expected a mapping of category names to lists of block ids")
+    overrides = {}
+    for category, block_list in predefined_categories.items():
+        if block_list is None:
+            continue
+        if not isinstance(block_list, list):
+            raise ValueError(f"{path}: category {category} is no list of block ids")
+        overrides.update((block, category) for block in block_list)
+    return overrides
 
 
+def categorize_blocks_by_type(index: BlockIndex, overrides=None):
+    """
+    Categorizes all blocks of the block index, using the `category` of their GRC block definition.
+
+    :param index: A refreshed BlockIndex.
+    :param overrides: A dictionary of block id to category that takes precedence over the GRC category.
+    """
+    overrides = overrides or {}
     default_category = "Miscellaneous"
 
     categories = defaultdict(list)
 
-    for name, obj in inspect.getmembers(blocks):
-        if inspect.isclass(obj) or inspect.isfunction(obj):
-            found = False
-            for category, block_list in predefined_categories.items():
-                if name in block_list:
-                    categories[category].append(name)
-                    found = True
-                    break
-
-            if not found:
-                categories[default_category].append(name)
+    for name, category in index.categories():
+        categories[overrides.get(name) or category or default_category].append(name)
 
     return categories
 
 if __name__ == "__main__":
-    block_categories = categorize_blocks_by_type()
+    args = argparse.ArgumentParser(description='Group the blocks of the GRC block library by category')
+    args.add_argument('directories', nargs='*', default=[DEFAULT_BLOCK_DIRECTORY],
+                      help='Block YAML directories, all of them are indexed')
+    args.add_argument('--mapping', type=str, default=DEFAULT_MAPPING_FILE,
+                      help='YAML file with categories that override the GRC categories')
+    args.add_argument('--block-index', type=str, default=DEFAULT_INDEX_PATH,
+                      help='Path of the persistent block definition index')
+    args = args.parse_args()
+
+    block_index = BlockIndex(args.block_index)
+    directories = [directory for directory in args.directories if os.path.isdir(directory)]
+    if directories:
+        block_index.refresh(directories)
+    else:
+        # Without GNU Radio installed the blocks indexed by earlier runs are still there
+        print(f"Directory does not exist: {', '.join(args.directories)}, using the block index {args.block_index}")
+    try:
+        block_categories = categorize_blocks_by_type(block_index, load_category_mapping(args.mapping))
+    except ValueError as e:
+        raise SystemExit(f"--mapping {e}")
+    finally:
+        block_index.close()
 
     print("Blocks grouped by categories:")
     for category, block_names in block_categories.items():
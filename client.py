@@ -0,0 +1,97 @@
+# Thin client for server.py, it only imports the standard library so it starts quickly
+import argparse
+import json
+import os
+import sys
+import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+# server.py writes a new token here on every start, readable by the user only
+DEFAULT_TOKEN_PATH = os.path.join(os.path.expanduser("~"), ".cache", "radio2diac", "server.token")
+
+
+def read_token(path=DEFAULT_TOKEN_PATH):
+    """The token of the running server, None if there is no token file."""
+    try:
+        with open(path, 'r') as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def request(url, path, body=None, timeout=60, token=None):
+    """
+    Send a request to the server, a POST if there is a body.
+
+    :param token: The token of the server, read from DEFAULT_TOKEN_PATH if None.
+    """
+    data = None if body is None else json.dumps(body).encode()
+    headers = {"Content-Type": "application/json"}
+    token = token or read_token()
+    if token:
+        headers["Authorization"] = "Bearer " + token
+    try:
+        with urlopen(Request(url + path, data=data, headers=headers), timeout=timeout) as response:
+            return json.loads(response.read())
+    except HTTPError as e:
+        return json.loads(e.read())
+
+
+def convert(url, radio, diac, blocks, types=None, force=False, partition=None, optimize=None,
+            fold=False, rules=None, token=None):
+    """Ask the server to convert a GNU Radio project file, paths are sent as absolute paths."""
+    paths = {"radio": radio, "diac": diac, "blocks": blocks, "types": types, "rules": rules}
+    body = {key: os.path.abspath(path) if path else path for key, path in paths.items()}
+    body["force"] = force
+    body["partition"] = partition
+    body["optimize"] = optimize
+    body["fold"] = fold
+    return request(url, "/convert", body, token=token)
+
+
+def main():
+    args = argparse.ArgumentParser(description='Convert a GNU Radio project through a running server.py')
+    args.add_argument('radio', nargs='?', type=str, help='Path to GNU Radio project file')
+    args.add_argument('--diac', type=str, help='Path to Eclipse 4diac project file')
+    args.add_argument('--blocks', type=str, help='Path to the 4diac blocks output directory')
+    args.add_argument('--types', type=str, help='Path to the 4diac types output directory')
+    args.add_argument('--force', action='store_true', help='Regenerate all function blocks')
+    args.add_argument('--partition', type=int, help='Split large networks into nested SubApps of this size')
+    args.add_argument('--optimize', type=str, nargs='*', metavar='PASS',
+                      help='Simplify the flowgraph first, with all or the given optimization passes')
+    args.add_argument('--fold-constants', action='store_true',
+                      help='Fold parameter expressions of constants and variables into literals')
+    args.add_argument('--rules', type=str, help='Path to a rules file mapping blocks onto library FB types')
+    args.add_argument('--url', type=str, default=DEFAULT_URL, help='URL of the conversion server')
+    args.add_argument('--token-file', type=str, default=DEFAULT_TOKEN_PATH,
+                      help='File the server wrote its access token to')
+    args.add_argument('--status', action='store_true', help='Print the server status instead of converting')
+    args.add_argument('--shutdown', action='store_true', help='Stop the server')
+    args = args.parse_args()
+
+    token = read_token(args.token_file)
+    if token is None:
+        print(f"No server token in {args.token_file}, is server.py running?")
+        sys.exit(1)
+    if args.status:
+        print(json.dumps(request(args.url, "/status", token=token), indent=2))
+        return
+    if args.shutdown:
+        request(args.url, "/shutdown", {}, token=token)
+        return
+
+    start = time.perf_counter()
+    result = convert(args.url, args.radio, args.diac, args.blocks, args.types, args.force,
+                     args.partition, args.optimize, args.fold_constants, args.rules, token)
+    if not result["ok"]:
+        print(f"FAILED {args.radio}: {result['error']}")
+        sys.exit(1)
+    print(f"{args.radio}: {result['blocks']} blocks, {result['fb_types']} FB types, converted in "
+          f"{result['seconds'] * 1000:.1f} ms, {(time.perf_counter() - start) * 1000:.1f} ms round trip "
+          f"(cache: {result['cache']})")
+
+
+if __name__ == '__main__':
+    main()
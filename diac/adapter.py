@@ -1,10 +1,12 @@
-from datetime import datetime
-from xml.etree.ElementTree import SubElement, Element, tostring
+from io import StringIO
 
-from diac.function_block import MetaData
+from diac.function_block import MetaData, generation_date
+from diac.xml_writer import XMLWriter
 
 
 MAX_ARRAY_SIZE = 4096
+# Data types that are part of IEC 61499, everything else is generated into the gnu_radio package
+ELEMENTARY_TYPES = {"BOOL", "SINT", "INT", "DINT", "LINT", "REAL", "LREAL", "STRING"}
 
 class AdapterType:
     def __init__(self):
@@ -26,49 +28,53 @@ class AdapterType:
     def add_service_sequence(self, name, transactions):
         self.services.append((name, transactions))
 
-    def to_xml(self, parent):
+    def to_xml(self, writer: XMLWriter, array_size=MAX_ARRAY_SIZE):
         # Add meta data
         metadata = MetaData(standard="61499-1", version="1.0", author="radio2diac",
-                            date=datetime.now().strftime("%Y-%m-%d"),
+                            date=generation_date(),
                             package_name="gnu_radio")
-        metadata.to_xml(parent)
-
-        interface_list_elem = SubElement(parent, "InterfaceList")
-        event_inputs_elem = SubElement(interface_list_elem, "EventInputs")
-        event_outputs_elem = SubElement(interface_list_elem, "EventOutputs")
-        input_vars_elem = SubElement(interface_list_elem, "InputVars")
-        output_vars_elem = SubElement(interface_list_elem, "OutputVars")
+        metadata.to_xml(writer)
 
+        sections = {"EventInput": [], "EventOutput": [], "InputVar": [], "OutputVar": []}
         for item in self.interface_list:
-            if item[0] == "EventInput":
-                event_elem = SubElement(event_inputs_elem, "Event", Name=item[1], Type="Event")
-                SubElement(event_elem, "With", Var=item[2])
-            elif item[0] == "EventOutput":
-                event_elem = SubElement(event_outputs_elem, "Event", Name=item[1], Type="Event")
-                SubElement(event_elem, "With", Var=item[2])
-            elif item[0] == "InputVar":
-                SubElement(input_vars_elem, "VarDeclaration", Name=item[1], Type=item[2], Comment=item[3])
-            elif item[0] == "OutputVar":
-                SubElement(output_vars_elem, "VarDeclaration", Name=item[1], Type=item[2], ArraySize="0.." + str(MAX_ARRAY_SIZE), Comment=item[3])
-
-        service_elem = SubElement(parent, "Service", RightInterface="SOCKET", LeftInterface="PLUG",
-                                  Comment="Adapter Interface")
-        for name, transactions in self.services:
-            sequence_elem = SubElement(service_elem, "ServiceSequence", Name=name)
-            for input_primitive, output_primitive in transactions:
-                transaction_elem = SubElement(sequence_elem, "ServiceTransaction")
-                SubElement(transaction_elem, "InputPrimitive", Interface=input_primitive[0], Event=input_primitive[1],
-                           Parameters=input_primitive[2])
-                SubElement(transaction_elem, "OutputPrimitive", Interface=output_primitive[0],
-                           Event=output_primitive[1], Parameters=output_primitive[2])
-        return parent
-
-
-def generate_generic_adapter(type_of_data: str):
-    adapter_elem = Element("AdapterType", Name="GenericAdapter_"+type_of_data, Comment="Generic Adapter for GNU Radio")
+            sections[item[0]].append(item)
+
+        with writer.tag("InterfaceList"):
+            with writer.tag("EventInputs"):
+                for item in sections["EventInput"]:
+                    with writer.tag("Event", Name=item[1], Type="Event"):
+                        writer.element("With", Var=item[2])
+            with writer.tag("EventOutputs"):
+                for item in sections["EventOutput"]:
+                    with writer.tag("Event", Name=item[1], Type="Event"):
+                        writer.element("With", Var=item[2])
+            with writer.tag("InputVars"):
+                for item in sections["InputVar"]:
+                    writer.element("VarDeclaration", Name=item[1], Type=item[2], Comment=item[3])
+            with writer.tag("OutputVars"):
+                for item in sections["OutputVar"]:
+                    writer.element("VarDeclaration", Name=item[1], Type=item[2],
+                                   ArraySize="0.." + str(array_size), Comment=item[3])
+
+        with writer.tag("Service", RightInterface="SOCKET", LeftInterface="PLUG", Comment="Adapter Interface"):
+            for name, transactions in self.services:
+                with writer.tag("ServiceSequence", Name=name):
+                    for input_primitive, output_primitive in transactions:
+                        with writer.tag("ServiceTransaction"):
+                            writer.element("InputPrimitive", Interface=input_primitive[0], Event=input_primitive[1],
+                                           Parameters=input_primitive[2])
+                            writer.element("OutputPrimitive", Interface=output_primitive[0],
+                                           Event=output_primitive[1], Parameters=output_primitive[2])
+
+
+# Write a generic adapter for the given data type, carrying up to array_size items per event, into a text stream
+def write_generic_adapter(stream, type_of_data: str, array_size=MAX_ARRAY_SIZE, adapter_name=None):
+    writer = XMLWriter(stream)
+    writer.declaration()
+    adapter_name = adapter_name or "GenericAdapter_" + type_of_data
     adapter = AdapterType()
-    if type_of_data == "COMPLEX":
-        type_of_data = "gnu_radio::COMPLEX"
+    if type_of_data not in ELEMENTARY_TYPES:
+        type_of_data = "gnu_radio::" + type_of_data
 
     adapter.add_event_output("CNF", "CNFD")
     adapter.add_output_var("CNFD", type_of_data, "Confirmation Data from Plug")
@@ -81,7 +87,11 @@ def generate_generic_adapter(type_of_data: str):
         (("SOCKET", "RSP", "RSPD"), ("PLUG", "RSP", "RSPD"))
     ])
 
-    adapter.to_xml(adapter_elem)
+    with writer.tag("AdapterType", Name=adapter_name, Comment="Generic Adapter for GNU Radio"):
+        adapter.to_xml(writer, array_size)
+
 
-    xml = tostring(adapter_elem, encoding='utf8', method='xml').decode().replace("utf8", "utf-8")
-    return xml
+def generate_generic_adapter(type_of_data: str):
+    stream = StringIO()
+    write_generic_adapter(stream, type_of_data)
+    return stream.getvalue()
@@ -0,0 +1,122 @@
+# Size the array of every adapter after the sample rate of its stream, instead of one fixed size for all streams.
+import math
+
+from diac.rates import DEFAULT_SAMPLE_RATE, propagate_rates
+from diac.types import StreamType, stream_type_of
+from radio.flowgraph import FlowGraph
+
+
+class BufferProfile:
+    """
+    How long one frame of samples lasts and the bounds of its size.
+
+    :param target_seconds: The duration of one frame, shorter frames mean lower latency and more events.
+    :param min_frame: The smallest frame, in items.
+    :param max_frame: The largest frame, in items.
+    """
+
+    def __init__(self, name, target_seconds, min_frame, max_frame):
+        self.name = name
+        self.target_seconds = target_seconds
+        self.min_frame = min_frame
+        self.max_frame = max_frame
+
+    def frame_size(self, rate):
+        """The frame holding target_seconds of the rate, rounded up to a power of two and clamped to the bounds."""
+        items = max(1, math.ceil(rate * self.target_seconds))
+        return min(max(1 << (items - 1).bit_length(), self.min_frame), self.max_frame)
+
+    def __str__(self):
+        return f'BufferProfile({self.name}, {self.target_seconds}s, {self.min_frame}..{self.max_frame})'
+
+    def __repr__(self):
+        return str(self)
+
+
+BUFFER_PROFILES = {
+    "latency": BufferProfile("latency", 0.001, 16, 1024),
+    "balanced": BufferProfile("balanced", 0.01, 64, 4096),
+    "throughput": BufferProfile("throughput", 0.05, 256, 16384),
+}
+
+
+class BufferPlan:
+    """
+    The sized stream type of the socket and the plug of every block.
+
+    :ivar ports: A (socket, plug) pair of StreamTypes by block id, None for a block without inputs or outputs.
+    :ivar rates: The input rate of every block, in items per second.
+    """
+
+    def __init__(self, profile, ports, rates):
+        self.profile = profile
+        self.ports = ports
+        self.rates = rates
+
+    @property
+    def frame_sizes(self):
+        return sorted({port.frame_size for pair in self.ports for port in pair if port is not None})
+
+    @property
+    def max_event_rate(self):
+        """The most events per second a socket receives, one per frame."""
+        return max((rate / socket.frame_size for rate, (socket, _) in zip(self.rates, self.ports)
+                    if socket is not None), default=0.0)
+
+    def summary(self):
+        sizes = self.frame_sizes
+        if not sizes:
+            return f"{self.profile.name} buffers: no streams"
+        return (f"{self.profile.name} buffers: frames of {sizes[0]}..{sizes[-1]} items, "
+                f"at most {self.max_event_rate:.0f} events/s")
+
+    def __str__(self):
+        return f'BufferPlan({self.summary()})'
+
+    def __repr__(self):
+        return str(self)
+
+
+def plan_buffers(graph: FlowGraph, profile, default_rate=DEFAULT_SAMPLE_RATE):
+    """
+    Size the frames of all streams of the flowgraph after their sample rates.
+
+    Both ends of a connection use the same adapter type, so the plug of a block and the sockets it feeds share
+    one frame size, the largest any of them asks for.
+
+    :param graph: The FlowGraph of the blocks.
+    :param profile: A BufferProfile or the name of one in BUFFER_PROFILES.
+    :param default_rate: The rate of sources without a declared rate.
+    :return: A BufferPlan.
+    """
+    if isinstance(profile, str):
+        if profile not in BUFFER_PROFILES:
+            raise ValueError(f"Unknown buffer profile {profile}, use one of {', '.join(BUFFER_PROFILES)}")
+        profile = BUFFER_PROFILES[profile]
+    input_rates, output_rates = propagate_rates(graph, default_rate)
+
+    # Ports are numbered 2 * block id for the socket and 2 * block id + 1 for the plug
+    parent = list(range(2 * len(graph)))
+
+    def find(port):
+        while parent[port] != port:
+            parent[port] = parent[parent[port]]
+            port = parent[port]
+        return port
+
+    for src, dst in graph.edges():
+        parent[find(2 * src + 1)] = find(2 * dst)
+
+    frames = {}
+    for block_id in range(len(graph)):
+        for port, rate in ((2 * block_id, input_rates[block_id]), (2 * block_id + 1, output_rates[block_id])):
+            root = find(port)
+            frames[root] = max(frames.get(root, 0), profile.frame_size(rate))
+
+    ports = []
+    for block_id, block in enumerate(graph):
+        stream_type = stream_type_of(block)
+        socket = StreamType(stream_type.item_type, stream_type.vlen, frames[find(2 * block_id)])
+        plug = StreamType(stream_type.item_type, stream_type.vlen, frames[find(2 * block_id + 1)])
+        ports.append((socket if block.has_inputs else None, plug if block.has_outputs else None))
+    return BufferPlan(profile, ports, input_rates)
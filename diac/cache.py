@@ -0,0 +1,70 @@
+# On-disk manifest of generated function block files, used to skip regenerating unchanged blocks.
+import json
+import os
+
+from diac.writer import write_to_file
+
+CACHE_FILE_NAME = ".radio2diac_cache.json"
+
+
+class BlockCache:
+    def __init__(self, directory, force=False):
+        self.path = os.path.join(directory, CACHE_FILE_NAME)
+        self.entries = {}
+        self.force = force
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        # Modification time and size of the manifest as last loaded or saved, None if there was none
+        self.stamp = None
+
+    def reset_counts(self):
+        self.hits = 0
+        self.misses = 0
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        self.stamp = self._stat()
+        try:
+            with open(self.path, 'r') as file:
+                self.entries = json.load(file)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+        self.dirty = False
+        return self
+
+    def is_current(self):
+        """Check if nobody else changed the manifest since it was loaded or saved, like another conversion."""
+        return self._stat() == self.stamp
+
+    def is_fresh(self, file_path, digest):
+        """Check if the file was generated from the same interface digest and still exists, counting hits and misses."""
+        key = os.path.basename(file_path)
+        fresh = (not self.force and self.entries.get(key) == digest
+                 and os.path.exists(file_path))
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return fresh
+
+    def update(self, file_path, digest):
+        key = os.path.basename(file_path)
+        if self.entries.get(key) != digest:
+            self.entries[key] = digest
+            self.dirty = True
+
+    def save(self):
+        if self.dirty:
+            write_to_file(self.path, json.dumps(self.entries, indent=1, sort_keys=True))
+            self.dirty = False
+            self.stamp = self._stat()
+
+    def summary(self):
+        return f"{self.hits} unchanged, {self.misses} regenerated"
@@ -0,0 +1,219 @@
+# Convert a GNU Radio flowgraph into 4diac documents held in memory, sinks decide where they end up.
+import os
+from contextlib import nullcontext
+
+from diac.buffers import plan_buffers
+from diac.document import NetworkDocument
+from diac.fb_network import fb_instance, instance_names
+from diac.fb_registry import FunctionBlockRegistry
+from diac.mapping import map_blocks
+from diac.type_registry import TypeRegistry
+from diac.types import IEC61499Converter
+from diac.writer import generate_fbn
+from radio.block_index import apply_block_definitions
+from radio.flowgraph import FlowGraph
+from radio.expressions import fold_constants
+from radio.optimize import optimize
+from radio.parser import Parser
+from radio.profiler import NULL_PROFILER
+
+NETWORK_FILE_NAME = "fbn_gen.sys"
+
+
+class ConversionResult:
+    """
+    Everything generated for one flowgraph.
+
+    Function block types and the data and adapter types are rendered when a sink or the caller first asks for
+    their content, the network is generated right away.
+    """
+
+    def __init__(self, flowgraph, converted, fb_registry, type_registry, network, network_name=NETWORK_FILE_NAME,
+                 definitions_found=None, mapping=None, buffer_plan=None, optimization=None, folding=None,
+                 rules=None):
+        self.flowgraph = flowgraph
+        # Number of blocks found in the block index, None without one
+        self.definitions_found = definitions_found
+        self.converted = converted
+        self.fb_registry = fb_registry
+        self.type_registry = type_registry
+        self.network = network
+        # The Mapping of the FBs onto resources, None if they are not mapped
+        self.mapping = mapping
+        # The BufferPlan sizing the adapters, None if they have the fixed MAX_ARRAY_SIZE
+        self.buffer_plan = buffer_plan
+        # The OptimizationReport of the passes run on the flowgraph, None if it was converted as parsed
+        self.optimization = optimization
+        # The FoldingReport of the parameter expressions, None if they were not folded
+        self.folding = folding
+        # The Rule matching every block, None without a rules file
+        self.rules = rules
+        self.type_documents = list(type_registry.documents())
+        self.fb_documents = list(fb_registry.documents())
+        self.network_document = NetworkDocument(network_name, network, mapping)
+
+    @property
+    def documents(self):
+        return self.type_documents + self.fb_documents + [self.network_document]
+
+    def get(self, file_name):
+        """Return the document with the given file name, or None."""
+        for document in self.documents:
+            if document.file_name == file_name:
+                return document
+        return None
+
+    def write(self, sink, profiler=NULL_PROFILER):
+        """
+        Hand every document to the sink and close it, the sink is aborted if writing fails.
+
+        :return: The sink.
+        """
+        try:
+            self._write_documents(sink, self.type_documents, "types", profiler)
+            self._write_documents(sink, self.fb_documents, "FB types", profiler, category="fb type")
+            with profiler.phase("write network"):
+                sink.write(self.network_document)
+        except BaseException:
+            sink.abort()
+            raise
+        sink.close()
+        return sink
+
+    @staticmethod
+    def _write_documents(sink, documents, kind, profiler, category=None):
+        """
+        Render and write the documents, the profiler times rendering and writing as separate phases.
+
+        Documents the sink already holds are handed over without rendering them. With a category, every document
+        also gets a render event of its own in the trace. A FB type is rendered once for all blocks sharing it.
+        """
+        for document in documents:
+            if not sink.holds(document):
+                event = profiler.phase(document.name, category=category) if category else nullcontext()
+                with profiler.phase("render " + kind), event:
+                    sink.render(document)
+            with profiler.phase("write " + kind):
+                sink.write(document)
+
+    def __str__(self):
+        return (f'ConversionResult({len(self.flowgraph)} blocks, {len(self.fb_documents)} FB types, '
+                f'{len(self.type_documents)} types)')
+
+    def __repr__(self):
+        return str(self)
+
+
+def parse_source(grc_source):
+    """
+    Parse a GNU Radio flowgraph from any of the supported sources.
+
+    :param grc_source: A path, a text stream holding the YAML, the loaded YAML data or an already parsed FlowGraph.
+    :return: The FlowGraph.
+    """
+    if isinstance(grc_source, FlowGraph):
+        return grc_source
+    if isinstance(grc_source, dict):
+        return Parser(None).parse_data(grc_source)
+    if hasattr(grc_source, "read"):
+        return Parser(getattr(grc_source, "name", None)).parse_stream(grc_source)
+    return Parser(os.fspath(grc_source)).parse()
+
+
+def convert(grc_source, block_index=None, network_name=NETWORK_FILE_NAME, profiler=NULL_PROFILER,
+            partition_size=None, workers=None, resources=None, cost_model=None, buffer_profile=None,
+            optimizations=None, fold=False, rules=None, fb_suffixes=None):
+    """
+    Convert a GNU Radio flowgraph without touching the file system, see ConversionResult.write to store it.
+
+    :param grc_source: The flowgraph, see parse_source.
+    :param block_index: A BlockIndex to complete the blocks with their GNU Radio block definitions.
+    :param network_name: The file name a sink stores the network under, if it stores it as a file.
+    :param profiler: Records the phases and counts of the conversion.
+    :param partition_size: Split networks with more FBs into nested SubApps of at most this many FBs and SubApps.
+    :param workers: Number of processes generating the SubApps of a partitioned network.
+    :param resources: Map the FBs onto these Resources of the project, see diac.mapping.
+    :param cost_model: The CostModel of the mapping, the default one if not given.
+    :param buffer_profile: Size the adapters after the sample rates of the streams with this BufferProfile or name
+                           of one, see diac.buffers. Without one every adapter carries up to MAX_ARRAY_SIZE items.
+    :param optimizations: The names of the optimization passes to run on the flowgraph, see radio.optimize.PASSES,
+                          None to convert every block as parsed.
+    :param fold: Fold the parameter expressions depending only on constants and variables into typed literals
+                 before optimizing, see radio.expressions.
+    :param rules: A RuleSet of diac.rules, blocks matching a rule with an fb_type become instances of that library
+                  type instead of a generated one.
+    :param fb_suffixes: The suffixes of the FB type names by digest, as decided for a batch of flowgraphs sharing
+                        a blocks directory, see FunctionBlockRegistry.
+    :return: A ConversionResult. A FlowGraph handed in stays as it is, so a parsed flowgraph can be cached.
+    """
+    if isinstance(grc_source, FlowGraph):
+        flowgraph = grc_source
+    else:
+        with profiler.phase("parse"):
+            flowgraph = parse_source(grc_source)
+    folding = None
+    if fold:
+        with profiler.phase("fold constants"):
+            flowgraph, folding = fold_constants(flowgraph)
+        profiler.count("folded_parameters", folding.folded)
+    optimization = None
+    if optimizations is not None:
+        with profiler.phase("optimize"):
+            flowgraph, optimization = optimize(flowgraph, optimizations)
+        profiler.count("optimized_away", optimization.total)
+    found = None
+    if block_index is not None:
+        with profiler.phase("apply block definitions"):
+            # Folding and optimizing work on copies already, the blocks handed in are not completed in place
+            if flowgraph is grc_source:
+                flowgraph = flowgraph.copy()
+            found = apply_block_definitions(flowgraph, block_index)
+    profiler.count("blocks", len(flowgraph))
+    profiler.count("connections", flowgraph.num_edges)
+
+    buffer_plan = None
+    ports = [None] * len(flowgraph)
+    if buffer_profile is not None:
+        with profiler.phase("plan buffers"):
+            buffer_plan = plan_buffers(flowgraph, buffer_profile)
+        ports = buffer_plan.ports
+
+    type_registry = TypeRegistry()
+    for block, block_ports in zip(flowgraph, ports):
+        type_registry.register(block, block_ports)
+
+    with profiler.phase("type inference"):
+        converted = IEC61499Converter.convert_many(flowgraph)
+    matches = None
+    if rules is not None:
+        with profiler.phase("match rules"):
+            matches = rules.match_all(flowgraph)
+        profiler.count("rule_matches", sum(rule is not None for rule in matches))
+    with profiler.phase("register FB types"):
+        fb_registry = FunctionBlockRegistry(fb_suffixes)
+        # Blocks mapped onto a library type need no generated type
+        fb_types = [None if rule is not None and rule.fb_type else
+                    fb_registry.register(block, block_converted, block_ports, rule)
+                    for block, block_converted, block_ports, rule
+                    in zip(flowgraph, converted, ports, matches or [None] * len(flowgraph))]
+        fb_registry.assign_names()
+        fb_type_names = [fb_type and fb_type.name for fb_type in fb_types]
+    profiler.count("fb_types", len(fb_registry))
+
+    with profiler.phase("generate network"):
+        network = generate_fbn(flowgraph, fb_type_names, converted, partition_size=partition_size,
+                               workers=workers, ports=buffer_plan and buffer_plan.ports, rules=matches)
+
+    mapping = None
+    if resources:
+        if partition_size is not None and len(flowgraph) > partition_size:
+            raise ValueError("Mapping FBs inside partitioned SubApps onto resources is not supported")
+        with profiler.phase("map resources"):
+            mapping = map_blocks(flowgraph, resources, cost_model)
+            instances = [fb_instance(block, fb_type_name, block_converted, rule)
+                         for block, fb_type_name, block_converted, rule
+                         in zip(flowgraph, fb_type_names, converted, matches or [None] * len(flowgraph))]
+            names = instance_names([block.name for block in flowgraph], [fb_type for fb_type, _ in instances])
+            mapping.instances = [(name, fb_type, parameters) for name, (fb_type, parameters) in zip(names, instances)]
+    return ConversionResult(flowgraph, converted, fb_registry, type_registry, network, network_name, found,
+                            mapping, buffer_plan, optimization, folding, matches)
@@ -0,0 +1,56 @@
+# A generated 4diac document, rendered on demand so sinks can skip documents they already hold.
+from io import StringIO
+
+# Kinds of documents, the file extension of each except the network
+FBT = "fbt"
+DTP = "dtp"
+ADP = "adp"
+NETWORK = "network"
+
+
+class Document:
+    """
+    :param kind: One of FBT, DTP, ADP or NETWORK.
+    :param file_name: The file name of the document, relative to the blocks or types directory.
+    :param render: A function writing the document into a text stream.
+    :param digest: A digest of everything the content depends on, None if only the content itself tells.
+    :param name: The type name, defaults to the file name.
+    """
+
+    def __init__(self, kind, file_name, render, digest=None, name=None):
+        self.kind = kind
+        self.file_name = file_name
+        self.render = render
+        self.digest = digest
+        self.name = name or file_name
+        self._content = None
+
+    @property
+    def content(self):
+        if self._content is None:
+            stream = StringIO()
+            self.render(stream)
+            self._content = stream.getvalue()
+        return self._content
+
+    def write_to(self, stream):
+        # Stream straight into the target unless the content was rendered already
+        if self._content is None:
+            self.render(stream)
+        else:
+            stream.write(self._content)
+
+    def __str__(self):
+        return f'Document({self.kind}, {self.file_name})'
+
+    def __repr__(self):
+        return str(self)
+
+
+class NetworkDocument(Document):
+    """The network of the application, with the mapping of its FBs onto resources if there is one."""
+
+    def __init__(self, file_name, network, mapping=None):
+        super().__init__(NETWORK, file_name, lambda stream: stream.write(network))
+        self._content = network
+        self.mapping = mapping
@@ -1,4 +1,5 @@
-from xml.etree.ElementTree import SubElement, Element, tostring
+from diac.types import parameter_literal
+from diac.xml_writer import XMLWriter
 
 
 class FunctionBlockNetwork:
@@ -6,26 +7,31 @@ class FunctionBlockNetwork:
         self.function_blocks = []
         self.adapter_connections = []
         self.event_connections = []
+        self.subapps = []  # Generated <SubApp> elements
         self.fb_counters = {}  # To track FB types and ensure unique names
         self.x_base = 500  # Starting x-coordinate
         self.y_base = 1400  # Starting y-coordinate
 
-    def add_function_block(self, name, fb_type, connections, parameters=None):
+    def unique_name(self, name, fb_type):
         if fb_type not in self.fb_counters:
             self.fb_counters[fb_type] = 0
         self.fb_counters[fb_type] += 1
 
         # Generate a unique name with a suffix if needed
         suffix = f"_{self.fb_counters[fb_type]}" if self.fb_counters[fb_type] > 1 else ""
-        unique_name = f"{name}{suffix}"
+        return f"{name}{suffix}"
 
-        # Add FB details
+    def add_function_block(self, name, fb_type, connections, parameters=None, position=None):
+        unique_name = self.unique_name(name, fb_type)
+
+        # Add FB details, without a layout position the FBs are stacked diagonally
+        x, y = position or (self.x_base, self.y_base)
         self.function_blocks.append({
             "name": unique_name,
             "type": fb_type,
             "parameters": parameters or [],
-            "x": self.x_base,
-            "y": self.y_base
+            "x": x,
+            "y": y
         })
 
         # Increment x and y coordinates for the next FB
@@ -45,50 +51,67 @@ class FunctionBlockNetwork:
                 "destination": f"{connection.dst}.DataIn"
             })
 
-    def to_xml(self):
-        sub_app_elem = Element("SubAppNetwork")
+    def add_subapp(self, xml):
+        self.subapps.append(xml)
+
+    def add_adapter_connection(self, source, destination):
+        self.adapter_connections.append({"source": source, "destination": destination})
 
-        # Add FB elements
-        for fb in self.function_blocks:
-            fb_elem = SubElement(sub_app_elem, "FB", Name=fb["name"], Type=fb["type"], x=str(fb["x"]), y=str(fb["y"]))
+    def write_function_block(self, writer: XMLWriter, fb):
+        # Generated types capitalize the GNU Radio parameter names, library types get the names as they are
+        name = str.capitalize if fb["type"].startswith("gnu_radio::") else str
+        with writer.tag("FB", Name=fb["name"], Type=fb["type"], x=str(fb["x"]), y=str(fb["y"])):
 
-            # Check if fb["parameters"] is not a list
+            # Parameters are either a dictionary of values or a list of (name, value, IEC 61499 type)
             if not isinstance(fb["parameters"], list):
                 for param_name, param_value in fb["parameters"].items():
-                    # If params does not contain numbers its a string enquote it with ''
-                    try:
-                        float(param_value)
-                    except ValueError:
-                        # Check if the value is a boolean
-                        if not (param_value == "True" or param_value == "False"):
-                            param_value = f"'{param_value}'"
-                        else:
-                            param_value = param_value
-                    SubElement(fb_elem, "Parameter", Name=param_name.capitalize(), Value=param_value)
+                    # If params does not contain numbers or booleans its a string enquote it with ''
+                    writer.element("Parameter", Name=name(param_name), Value=parameter_literal(param_value))
             else:
-                for parameter in fb["parameters"]:
-                    try:
-                        float(parameter)
-                    except ValueError:
-                        # Check if the value is a boolean
-                        if not (parameter == "True" or parameter == "False"):
-                            parameter = f"'{parameter}'"
-                        else:
-                            parameter = parameter
-
-                    SubElement(fb_elem, "Parameter", Name=parameter[0].capitalize(), Value=parameter[1])
-
-
-        # EventConnections
-        #event_connections_elem = SubElement(sub_app_elem, "EventConnections")
-        #for connection in self.event_connections:
-        #    SubElement(event_connections_elem, "Connection", Source=connection["source"],
-        #               Destination=connection["destination"])
-
-        # Add AdapterConnections
-        adapter_connections_elem = SubElement(sub_app_elem, "AdapterConnections")
-        for connection in self.adapter_connections:
-            SubElement(adapter_connections_elem, "Connection", Source=connection["source"],
-                       Destination=connection["destination"])
-
-        return tostring(sub_app_elem, encoding="unicode", method="xml").replace("utf-8", "utf8")
+                for param_name, param_value, iec_type in fb["parameters"]:
+                    writer.element("Parameter", Name=name(param_name),
+                                   Value=parameter_literal(param_value, iec_type))
+
+    def to_xml(self, writer: XMLWriter, tag="SubAppNetwork"):
+        with writer.tag(tag):
+            # Add FB elements
+            for fb in self.function_blocks:
+                self.write_function_block(writer, fb)
+
+            # SubApps are generated on their own and inserted as they are
+            for xml in self.subapps:
+                writer.raw(xml)
+
+            # EventConnections
+            #with writer.tag("EventConnections"):
+            #    for connection in self.event_connections:
+            #        writer.element("Connection", Source=connection["source"],
+            #                       Destination=connection["destination"])
+
+            # Add AdapterConnections
+            with writer.tag("AdapterConnections"):
+                for connection in self.adapter_connections:
+                    writer.element("Connection", Source=connection["source"],
+                                   Destination=connection["destination"])
+
+
+def fb_instance(radio_block, fb_type_name, converted, rule=None):
+    """
+    The FB type and the parameters of the FB instance of a block in a network.
+
+    :param fb_type_name: The name of the generated gnu_radio type of the block.
+    :param converted: The block's parameters as returned by IEC61499Converter.convert.
+    :param rule: The Rule of diac.rules matching the block, or None.
+    :return: The full FB type name and a (name, value, IEC 61499 type) list, values as written in GNU Radio.
+    """
+    # Keep the values as written in GNU Radio, only their type is taken from the conversion
+    parameters = [(key, radio_block.parameters[key], iec_type) for key, _, iec_type in converted]
+    if rule is None:
+        return "gnu_radio::" + str(fb_type_name), parameters
+    return rule.type_name(fb_type_name), rule.apply(parameters)
+
+
+def instance_names(names, fb_types):
+    """The FB instance names add_function_block gives to blocks added to a network in this order."""
+    network = FunctionBlockNetwork()
+    return [network.unique_name(name, fb_type) for name, fb_type in zip(names, fb_types)]
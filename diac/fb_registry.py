@@ -0,0 +1,159 @@
+# Registry of the distinct function block types needed by a GNU Radio flowgraph.
+import copy
+import hashlib
+
+from diac.document import Document, FBT
+from diac.sinks import DirectorySink
+from diac.types import IEC61499Converter, stream_type_of
+from diac.writer import write_fb_xml
+from radio.block import Block
+
+# Number of digest characters in the name of a type
+SUFFIX_LENGTH = 8
+
+
+def interface_signature(radio_block: Block, converted=None, ports=None, rule=None):
+    """
+    Derive everything of a block that ends up in its function block interface.
+
+    :param radio_block: A parsed Block object.
+    :param converted: The block's parameters as returned by IEC61499Converter.convert, converted if not given.
+    :param ports: The (socket, plug) StreamTypes of the block from a BufferPlan, if its adapters are sized.
+    :param rule: The Rule of diac.rules renaming and omitting parameters of the block, or None.
+    :return: A hashable signature of the block's interface.
+    """
+    if converted is None:
+        converted = IEC61499Converter(radio_block.parameters).convert()
+    if rule is not None:
+        converted = rule.apply(converted)
+    parameters = tuple((name, iec_type) for name, _, iec_type in converted)
+    signature = (radio_block.id, parameters, bool(radio_block.has_inputs), bool(radio_block.has_outputs),
+                 stream_type_of(radio_block).name)
+    if ports is not None:
+        signature += (tuple(port.adapter_name if port is not None else None for port in ports),)
+    return signature
+
+
+class FunctionBlockType:
+    def __init__(self, signature, block, converted=None, ports=None, rule=None):
+        self.signature = signature
+        # The first block with this signature, its converted parameters, ports and rule, used to generate the type
+        self.block = block
+        self.converted = converted
+        self.ports = ports
+        self.rule = rule
+        self.digest = hashlib.sha256(repr(signature).encode()).hexdigest()
+        # Set by FunctionBlockRegistry.assign_names once every type of the flowgraph or batch is known
+        self.suffix = ""
+        self.instances = 0
+
+    @property
+    def name(self):
+        return str(self.block.id).upper() + self.suffix.upper()
+
+    @property
+    def file_name(self):
+        return "fb_" + self.block.id + self.suffix.lower() + "_gen.fbt"
+
+    def __str__(self):
+        return f'FunctionBlockType({self.name}, {self.instances} instances)'
+
+    def __repr__(self):
+        return str(self)
+
+
+class FunctionBlockRegistry:
+    """
+    Collects one function block type per distinct interface signature.
+
+    A type is named after the upper case block id. Only if an id has more than one signature, all of its types are
+    suffixed with the first characters of their digest, so the names do not depend on the order of the blocks.
+
+    :param suffixes: Suffixes of the types by digest, decided by the registry of a whole batch, see update.
+    """
+
+    def __init__(self, suffixes=None):
+        self.types = {}
+        self.suffixes = suffixes or {}
+
+    def register(self, radio_block: Block, converted=None, ports=None, rule=None):
+        """Register the type of a block, its name is known after assign_names."""
+        signature = interface_signature(radio_block, converted, ports, rule)
+        fb_type = self.types.get(signature)
+        if fb_type is None:
+            fb_type = self.types[signature] = FunctionBlockType(signature, radio_block, converted, ports, rule)
+        fb_type.instances += 1
+        return fb_type
+
+    def assign_names(self):
+        """
+        Name the types once all are registered, ids with several signatures get suffixes.
+
+        :return: The types whose name changed.
+        """
+        by_id = {}
+        for fb_type in self.types.values():
+            by_id.setdefault(str(fb_type.block.id), []).append(fb_type)
+        renamed = []
+        for fb_types in by_id.values():
+            length = SUFFIX_LENGTH
+            while length < len(fb_types[0].digest) and len({t.digest[:length] for t in fb_types}) < len(fb_types):
+                length *= 2
+            for fb_type in fb_types:
+                suffix = self.suffixes.get(fb_type.digest)
+                if suffix is None:
+                    suffix = "" if len(fb_types) == 1 else "_" + fb_type.digest[:length]
+                if suffix != fb_type.suffix:
+                    fb_type.suffix = suffix
+                    renamed.append(fb_type)
+        return renamed
+
+    def update(self, fb_registry):
+        """
+        Add the types of another registry, like the one of a flowgraph converted in a worker process.
+
+        Flowgraphs sharing a blocks directory share one registry, call assign_names afterwards to resolve the ids
+        the flowgraphs gave different interfaces.
+        """
+        for fb_type in fb_registry:
+            existing = self.types.get(fb_type.signature)
+            if existing is None:
+                # A copy, naming the shared types leaves the names the other registry used alone
+                self.types[fb_type.signature] = copy.copy(fb_type)
+            else:
+                existing.instances += fb_type.instances
+
+    def suffixes_of(self, fb_registry):
+        """The suffixes this registry gives the types of another one, if any of them differs."""
+        suffixes = {fb_type.digest: self.types[fb_type.signature].suffix for fb_type in fb_registry}
+        if all(fb_type.suffix == suffixes[fb_type.digest] for fb_type in fb_registry):
+            return None
+        return suffixes
+
+    def documents(self):
+        """Yield a Document for every function block type."""
+        for fb_type in self.types.values():
+            yield Document(FBT, fb_type.file_name,
+                           lambda stream, t=fb_type: write_fb_xml(stream, t.block, t.name, t.converted, t.ports,
+                                                                  t.rule),
+                           digest=fb_type.digest, name=fb_type.name)
+
+    def write(self, blocks_dir, force=False):
+        """
+        Write all types into the directory, types the function block cache holds unchanged are skipped.
+
+        :param blocks_dir: The blocks output directory, its cache is loaded and saved here.
+        :param force: Write every type even if the cache says it is unchanged.
+        :return: The DirectorySink, for its summary and written paths.
+        """
+        sink = DirectorySink(blocks=blocks_dir, force=force)
+        for document in self.documents():
+            sink.write(document)
+        sink.close()
+        return sink
+
+    def __iter__(self):
+        return iter(self.types.values())
+
+    def __len__(self):
+        return len(self.types)
@@ -1,5 +1,29 @@
 # Class that holds an IEC 61499 Eclipse 4diac compatible function block representation
-from xml.etree.ElementTree import Element, SubElement, tostring, ElementTree
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from diac.xml_writer import XMLWriter
+
+# A timestamp replacing today as the date of the generated types while reproducible output is written
+_DATE_EPOCH = ContextVar("date_epoch", default=None)
+
+
+def generation_date():
+    """The Date of the MetaData of generated types, today unless fixed_generation_date says otherwise."""
+    epoch = _DATE_EPOCH.get()
+    date = datetime.now() if epoch is None else datetime.fromtimestamp(epoch, timezone.utc)
+    return date.strftime("%Y-%m-%d")
+
+
+@contextmanager
+def fixed_generation_date(epoch):
+    """Date the types generated within the block after the timestamp instead of today."""
+    token = _DATE_EPOCH.set(epoch)
+    try:
+        yield
+    finally:
+        _DATE_EPOCH.reset(token)
 
 
 class FunctionBlock:
@@ -47,28 +71,18 @@ class FunctionBlock:
                 event.add_with_var(adapter_name)
                 return
 
-    def to_xml(self):
-        fb_elem = Element("FBType")
-        fb_elem.set("Name", self.name)
-        if self.comment:
-            fb_elem.set("Comment", self.comment)
-        else:
-            fb_elem.set("Comment", "This is a generated function block of type " + self.name)
-
-        # Add MetaData
-        self.meta_data.to_xml(fb_elem)
-
-        # Add InterfaceList
-        interface_list_elem = self.interface_list.to_xml()
-        fb_elem.append(interface_list_elem)
+    def to_xml(self, writer: XMLWriter):
+        comment = self.comment or "This is a generated function block of type " + self.name
+        with writer.tag("FBType", Name=self.name, Comment=comment):
+            # Add MetaData
+            self.meta_data.to_xml(writer)
 
-        # A dummy ECC
-        basic_fb_elem = SubElement(fb_elem, "BasicFB")
-        ecc_elem = SubElement(basic_fb_elem, "ECC")
-        ecstate_elem = SubElement(ecc_elem, "ECState", Name="START", Comment="Initial State", x="475", y="1125")
-        ecstate_elem.text = ''  # Ensure explicit closing tag
+            # Add InterfaceList
+            self.interface_list.to_xml(writer)
 
-        return fb_elem
+            # A dummy ECC
+            with writer.tag("BasicFB"), writer.tag("ECC"):
+                writer.element("ECState", Name="START", Comment="Initial State", x="475", y="1125")
 
 
 class MetaData:
@@ -79,14 +93,10 @@ class MetaData:
         self.date = date
         self.package_name = package_name
 
-    def to_xml(self, parent):
-        ident_elem = SubElement(parent, "Identification", Standard=self.standard)
-        ident_elem.text = ' \n'
-        version_elem = SubElement(parent, "VersionInfo", Version=self.version, Author=self.author, Date=self.date)
-        version_elem.text = ' \n'
-        compiler_elem = SubElement(parent, "CompilerInfo", packageName=self.package_name)
-        compiler_elem.text = ' \n'
-        return ident_elem, version_elem, compiler_elem
+    def to_xml(self, writer: XMLWriter):
+        writer.element("Identification", ' \n', Standard=self.standard)
+        writer.element("VersionInfo", ' \n', Version=self.version, Author=self.author, Date=self.date)
+        writer.element("CompilerInfo", ' \n', packageName=self.package_name)
 
 
 class Event:
@@ -99,27 +109,25 @@ class Event:
     def add_with_var(self, var_name):
         self.with_vars.append(var_name)
 
-    def to_xml(self, parent):
-        event_elem = SubElement(parent, "Event", Name=self.name, Type=self.type)
+    def to_xml(self, writer: XMLWriter):
+        attributes = {"Name": self.name, "Type": self.type}
         if self.comment:
-            event_elem.set("Comment", self.comment)
+            attributes["Comment"] = self.comment
+        writer.element("Event", **attributes)
         #for var in self.with_vars:
-            # SubElement(event_elem, "With", Var=var)
-        return event_elem
+            # writer.element("With", Var=var)
 
 
 class Plug:
 
-    def to_xml(self, parent):
-        plug_elem = SubElement(parent, "Plug")
-        return plug_elem
+    def to_xml(self, writer: XMLWriter):
+        writer.element("Plug")
 
 
 class Socket:
 
-    def to_xml(self, parent):
-        socket_elem = SubElement(parent, "Socket")
-        return socket_elem
+    def to_xml(self, writer: XMLWriter):
+        writer.element("Socket")
 
 
 class VarDeclaration:
@@ -128,11 +136,11 @@ class VarDeclaration:
         self.type = var_type
         self.comment = comment
 
-    def to_xml(self, parent):
+    def to_xml(self, writer: XMLWriter):
         attributes = {"Name": self.name, "Type": self.type}
         if self.comment:
             attributes["Comment"] = self.comment
-        return SubElement(parent, "VarDeclaration", **attributes)
+        writer.element("VarDeclaration", **attributes)
 
 
 class AdapterDeclaration:
@@ -141,11 +149,11 @@ class AdapterDeclaration:
         self.type_name = type_name
         self.comment = comment
 
-    def to_xml(self, parent):
+    def to_xml(self, writer: XMLWriter):
         attributes = {"Name": self.name, "Type": self.type_name}
         if self.comment:
             attributes["Comment"] = self.comment
-        return SubElement(parent, "AdapterDeclaration", **attributes)
+        writer.element("AdapterDeclaration", **attributes)
 
 
 class InterfaceList:
@@ -175,46 +183,16 @@ class InterfaceList:
     def add_output_var(self, var):
         self.output_vars.append(var)
 
-    def to_xml(self):
-        interface_list_elem = Element("InterfaceList")
-
-        # Add EventInputs
-        if self.event_inputs:
-            event_inputs_elem = SubElement(interface_list_elem, "EventInputs")
-            for event in self.event_inputs:
-                event.to_xml(event_inputs_elem)
-
-        # Add EventOutputs
-        if self.event_outputs:
-            event_outputs_elem = SubElement(interface_list_elem, "EventOutputs")
-            for event in self.event_outputs:
-                event.to_xml(event_outputs_elem)
-
-        # Add InputVars
-        if self.input_vars:
-            input_vars_elem = SubElement(interface_list_elem, "InputVars")
-            for var in self.input_vars:
-                var.to_xml(input_vars_elem)
-
-        # Add OutputVars
-        if self.output_vars:
-            output_vars_elem = SubElement(interface_list_elem, "OutputVars")
-            for var in self.output_vars:
-                var.to_xml(output_vars_elem)
-
-        # Add Sockets
-        if self.sockets:
-            sockets_elem = SubElement(interface_list_elem, "Sockets")
-            for socket in self.sockets:
-                socket.to_xml(sockets_elem)
-
-        # Add Plugs
-        if self.plugs:
-            plugs_elem = SubElement(interface_list_elem, "Plugs")
-            for plug in self.plugs:
-                plug.to_xml(plugs_elem)
-
-        return interface_list_elem
+    def to_xml(self, writer: XMLWriter):
+        with writer.tag("InterfaceList"):
+            # Add EventInputs, EventOutputs, InputVars, OutputVars, Sockets and Plugs
+            for section, items in (("EventInputs", self.event_inputs), ("EventOutputs", self.event_outputs),
+                                   ("InputVars", self.input_vars), ("OutputVars", self.output_vars),
+                                   ("Sockets", self.sockets), ("Plugs", self.plugs)):
+                if items:
+                    with writer.tag(section):
+                        for item in items:
+                            item.to_xml(writer)
 
 
 class Adapter:
@@ -0,0 +1,145 @@
+# Layered (Sugiyama style) placement of the function blocks of a network
+from radio.flowgraph import FlowGraph
+
+X_ORIGIN = 500
+Y_ORIGIN = 1400
+LAYER_SPACING = 900  # Horizontal distance between two layers
+ROW_SPACING = 600  # Vertical distance between two blocks of a layer
+CROSSING_SWEEPS = 4
+
+
+def assign_layers(graph: FlowGraph):
+    """
+    Assign every block to the layer after its furthest predecessor, in O(V + E).
+
+    Blocks in cycles are placed once nothing else is left, the remaining connections into them are treated as
+    pointing backwards.
+
+    :return: The layer of each block id.
+    """
+    size = len(graph)
+    layers = [0] * size
+    remaining = [graph.in_degree(block_id) for block_id in range(size)]
+    done = [False] * size
+    queue = [block_id for block_id in range(size) if remaining[block_id] == 0]
+    next_forced = 0
+    processed = 0
+
+    while processed < size:
+        if not queue:
+            # Break a cycle at the first block that is not placed yet
+            while done[next_forced]:
+                next_forced += 1
+            queue.append(next_forced)
+        block_id = queue.pop()
+        if done[block_id]:
+            continue
+        done[block_id] = True
+        processed += 1
+        layer = layers[block_id] + 1
+        for successor in graph.successors(block_id):
+            if done[successor]:
+                continue
+            if layers[successor] < layer:
+                layers[successor] = layer
+            remaining[successor] -= 1
+            if remaining[successor] == 0:
+                queue.append(successor)
+    return layers
+
+
+def _reorder(order, neighbours, position):
+    """Sort each layer by the barycenter of the neighbour positions, blocks without neighbours keep their place."""
+    for layer in order:
+        barycenters = {}
+        for block_id in layer:
+            adjacent = neighbours(block_id)
+            if len(adjacent):
+                barycenters[block_id] = sum(position[other] for other in adjacent) / len(adjacent)
+            else:
+                barycenters[block_id] = position[block_id]
+        layer.sort(key=barycenters.__getitem__)
+        for index, block_id in enumerate(layer):
+            position[block_id] = index
+
+
+def count_crossings(graph: FlowGraph, layers, order):
+    """
+    Count the crossings of the connections between neighbouring layers, in O(E log V).
+
+    Connections spanning several layers or pointing backwards are not counted.
+    """
+    position = [0] * len(graph)
+    for block_ids in order:
+        for index, block_id in enumerate(block_ids):
+            position[block_id] = index
+    total = 0
+    for layer, block_ids in enumerate(order[:-1]):
+        # The destination rows of the connections in the order of their sources, inversions are crossings
+        rows = [position[dst] for src in block_ids for dst in sorted(graph.successors(src), key=position.__getitem__)
+                if layers[dst] == layer + 1]
+        tree = [0] * (len(order[layer + 1]) + 1)
+        for seen, row in enumerate(rows):
+            index, smaller = row + 1, 0
+            while index:
+                smaller += tree[index]
+                index -= index & -index
+            total += seen - smaller
+            index = row + 1
+            while index < len(tree):
+                tree[index] += 1
+                index += index & -index
+    return total
+
+
+def order_layers(graph: FlowGraph, layers, sweeps=CROSSING_SWEEPS):
+    """
+    Reduce connection crossings with alternating down and up barycenter sweeps.
+
+    A block is placed after its neighbours in the layer before or after it. The order with the fewest crossings
+    seen is kept, so the sweeps never make it worse than the order of the blocks in the flowgraph.
+
+    :return: The block ids of each layer, in their order from top to bottom.
+    """
+    order = [[] for _ in range(max(layers, default=-1) + 1)]
+    for block_id, layer in enumerate(layers):
+        order[layer].append(block_id)
+    position = [0] * len(graph)
+    for layer in order:
+        for index, block_id in enumerate(layer):
+            position[block_id] = index
+
+    def predecessors(block_id):
+        return [other for other in graph.predecessors(block_id) if layers[other] == layers[block_id] - 1]
+
+    def successors(block_id):
+        return [other for other in graph.successors(block_id) if layers[other] == layers[block_id] + 1]
+
+    best, fewest = [list(layer) for layer in order], None
+    for sweep in range(sweeps):
+        if fewest is None:
+            fewest = count_crossings(graph, layers, order)
+        if sweep % 2 == 0:
+            _reorder(order[1:], predecessors, position)
+        else:
+            _reorder(order[-2::-1], successors, position)
+        crossings = count_crossings(graph, layers, order)
+        if crossings < fewest:
+            best, fewest = [list(layer) for layer in order], crossings
+    return best
+
+
+def layered_layout(graph: FlowGraph, sweeps=CROSSING_SWEEPS):
+    """
+    Compute the position of every block, layers run from left to right along the signal flow.
+
+    :param graph: The FlowGraph of the blocks.
+    :param sweeps: Number of crossing reduction sweeps.
+    :return: The (x, y) position of each block id.
+    """
+    layers = assign_layers(graph)
+    positions = [None] * len(graph)
+    for layer, block_ids in enumerate(order_layers(graph, layers, sweeps)):
+        for row, block_id in enumerate(block_ids):
+            positions[block_id] = (X_ORIGIN + layer * LAYER_SPACING, Y_ORIGIN + row * ROW_SPACING)
+    return positions
@@ -0,0 +1,306 @@
+# Map the blocks of a flowgraph onto the devices and resources of a 4diac system, balancing their load.
+from io import StringIO
+
+from diac.fb_network import FunctionBlockNetwork
+from diac.layout import assign_layers, layered_layout
+from diac.rates import DEFAULT_SAMPLE_RATE, propagate_rates
+from diac.types import stream_type_of
+from diac.xml_writer import XMLWriter
+from radio.flowgraph import FlowGraph
+
+# Relative processing cost per sample, matched against the block id, the longest matching key wins
+BLOCK_WEIGHTS = {
+    "variable": 0.0,
+    "import": 0.0,
+    "options": 0.0,
+    "blocks_": 1.0,
+    "blocks_null_": 0.1,
+    "blocks_throttle": 0.5,
+    "analog_": 1.5,
+    "digital_": 4.0,
+    "qtgui_": 2.0,
+    "filter": 6.0,
+    "fir": 6.0,
+    "iir": 4.0,
+    "resampler": 6.0,
+    "fft": 8.0,
+    "pfb": 8.0,
+}
+DEFAULT_BLOCK_WEIGHT = 1.0
+# Bytes per item of a stream
+ITEM_SIZES = {"COMPLEX": 8, "REAL": 4, "DINT": 4, "INT": 2, "SINT": 1}
+IMBALANCE = 0.1  # Allowed load above the fair share of a resource
+REFINEMENT_PASSES = 4
+
+
+class Resource:
+    """
+    A resource of a device of the 4diac system, written as ``DEVICE.RESOURCE`` with an optional ``:CAPACITY``.
+
+    :param capacity: The processing capacity relative to the other resources.
+    """
+
+    def __init__(self, device, name, capacity=1.0):
+        self.device = device
+        self.name = name
+        self.capacity = capacity
+
+    @property
+    def path(self):
+        return f"{self.device}.{self.name}"
+
+    @classmethod
+    def parse(cls, text):
+        path, _, capacity = text.partition(":")
+        device, _, name = path.partition(".")
+        if not device or not name:
+            raise ValueError(f"Resource {text} is not written as DEVICE.RESOURCE[:CAPACITY]")
+        return cls(device, name, float(capacity) if capacity else 1.0)
+
+    def __str__(self):
+        return f'Resource({self.path}, {self.capacity})'
+
+    def __repr__(self):
+        return str(self)
+
+
+class CostModel:
+    """
+    Processing cost of the blocks and communication cost of the connections.
+
+    A block costs its weight times its sample rate, a connection costs the bytes per second it carries times
+    the communication weight.
+
+    :param weights: Weight per sample by block id, see BLOCK_WEIGHTS.
+    :param communication_weight: Cost per byte per second of a connection between two resources.
+    :param default_sample_rate: Sample rate of blocks without a known rate upstream.
+    """
+
+    def __init__(self, weights=None, default_weight=DEFAULT_BLOCK_WEIGHT, communication_weight=1.0,
+                 default_sample_rate=DEFAULT_SAMPLE_RATE):
+        self.weights = BLOCK_WEIGHTS if weights is None else weights
+        self.default_weight = default_weight
+        self.communication_weight = communication_weight
+        self.default_sample_rate = default_sample_rate
+
+    def weight(self, block_id):
+        matches = [key for key in self.weights if key in block_id]
+        return self.weights[max(matches, key=len)] if matches else self.default_weight
+
+    def sample_rates(self, graph: FlowGraph):
+        """The input and the output sample rate of every block, see propagate_rates."""
+        return propagate_rates(graph, self.default_sample_rate)
+
+    def block_costs(self, graph: FlowGraph, input_rates):
+        return [self.weight(str(block.id)) * rate for block, rate in zip(graph, input_rates)]
+
+    def connection_costs(self, graph: FlowGraph, output_rates):
+        """The cost of every connection by (source id, destination id)."""
+        costs = {}
+        for src, dst in graph.edges():
+            stream_type = stream_type_of(graph[src])
+            size = ITEM_SIZES.get(stream_type.item_type, 4) * stream_type.vlen
+            costs[(src, dst)] = costs.get((src, dst), 0.0) + size * output_rates[src] * self.communication_weight
+        return costs
+
+
+class Mapping:
+    """
+    The resource of every block, with the costs it was computed from.
+
+    :ivar assignment: The index into resources of every block id.
+    :ivar instances: The FB instance name, type and parameters of every block id, set by the conversion.
+    """
+
+    def __init__(self, graph: FlowGraph, resources, assignment, rates, block_costs, connection_costs):
+        self.graph = graph
+        self.resources = resources
+        self.assignment = assignment
+        self.rates = rates
+        self.block_costs = block_costs
+        self.connection_costs = connection_costs
+        self.instances = None
+
+    @property
+    def loads(self):
+        loads = [0.0] * len(self.resources)
+        for block_id, resource in enumerate(self.assignment):
+            loads[resource] += self.block_costs[block_id]
+        return loads
+
+    @property
+    def cross_traffic(self):
+        return sum(cost for (src, dst), cost in self.connection_costs.items()
+                   if self.assignment[src] != self.assignment[dst])
+
+    @property
+    def total_traffic(self):
+        return sum(self.connection_costs.values())
+
+    def cut_connections(self):
+        """
+        The connections between blocks on different resources, which no resource network holds.
+
+        Without communication FBs like PUBLISH/SUBSCRIBE added in 4diac, no data flows along them.
+
+        :return: A (source FB instance, source resource path, destination FB instance, destination resource path)
+                 tuple per connection, in the order of the connection costs.
+        """
+        return [(self.instances[src][0], self.resources[self.assignment[src]].path,
+                 self.instances[dst][0], self.resources[self.assignment[dst]].path)
+                for src, dst in self.connection_costs if self.assignment[src] != self.assignment[dst]]
+
+    def warnings(self):
+        """A warning naming every cut connection, see cut_connections."""
+        cut = self.cut_connections()
+        if not cut:
+            return []
+        return [f"Warning: {len(cut)} connection(s) between resources left out of the resource networks, they "
+                f"need communication FBs like PUBLISH/SUBSCRIBE in 4diac:"] + [
+            f"  {src} ({src_resource}) -> {dst} ({dst_resource})" for src, src_resource, dst, dst_resource in cut]
+
+    def mappings(self):
+        """Yield the FB instance name and the "device.resource.instance" path it is mapped to."""
+        for block_id, resource in enumerate(self.assignment):
+            name = self.instances[block_id][0]
+            yield name, f"{self.resources[resource].path}.{name}"
+
+    def resource_network(self, index):
+        """The <FBNetwork> of a resource with the FBs mapped onto it."""
+        stream = StringIO()
+        self._network(index).to_xml(XMLWriter(stream), "FBNetwork")
+        return stream.getvalue()
+
+    def resource_parts(self, index):
+        """The FBs and the adapter connections of a resource, to be inserted into an existing FBNetwork."""
+        stream = StringIO()
+        writer = XMLWriter(stream)
+        network = self._network(index)
+        for fb in network.function_blocks:
+            network.write_function_block(writer, fb)
+        fbs = stream.getvalue()
+        stream = StringIO()
+        for connection in network.adapter_connections:
+            XMLWriter(stream).element("Connection", Source=connection["source"],
+                                      Destination=connection["destination"])
+        return fbs, stream.getvalue()
+
+    def _network(self, index):
+        block_ids = [block_id for block_id, resource in enumerate(self.assignment) if resource == index]
+        local = {block_id: position for position, block_id in enumerate(block_ids)}
+        positions = layered_layout(FlowGraph([self.graph[block_id] for block_id in block_ids]))
+        network = FunctionBlockNetwork()
+        for block_id, position in zip(block_ids, positions):
+            name, fb_type, parameters = self.instances[block_id]
+            network.function_blocks.append({"name": name, "type": fb_type, "parameters": parameters,
+                                            "x": position[0], "y": position[1]})
+        for src, dst in self.graph.edges():
+            if src in local and dst in local:
+                network.add_adapter_connection(f"{self.instances[src][0]}.DataOut",
+                                               f"{self.instances[dst][0]}.DataIn")
+        return network
+
+    def summary(self):
+        loads = self.loads
+        total = sum(loads) or 1.0
+        shares = ", ".join(f"{resource.path} {load / total:.0%}" for resource, load in zip(self.resources, loads))
+        cut = self.cross_traffic
+        return (f"{len(self.assignment)} blocks on {len(self.resources)} resources ({shares}); "
+                f"{len(self.cut_connections())} connections, {cut:.0f} of {self.total_traffic:.0f} bytes/s "
+                f"cross resources")
+
+    def to_dict(self):
+        """The cost model inputs and the assignment, for inspection."""
+        return {
+            "resources": [{"path": resource.path, "capacity": resource.capacity, "load": load}
+                          for resource, load in zip(self.resources, self.loads)],
+            "blocks": [{"name": block.name, "id": block.id, "resource": self.resources[resource].path,
+                        "sample_rate": rate, "cost": cost}
+                       for block, resource, rate, cost in zip(self.graph, self.assignment, self.rates,
+                                                              self.block_costs)],
+            "connections": [{"source": self.graph[src].name, "destination": self.graph[dst].name,
+                             "cost": cost, "crosses": self.assignment[src] != self.assignment[dst]}
+                            for (src, dst), cost in self.connection_costs.items()],
+            "cross_traffic": self.cross_traffic,
+            "total_traffic": self.total_traffic,
+        }
+
+    def __str__(self):
+        return f'Mapping({self.summary()})'
+
+    def __repr__(self):
+        return str(self)
+
+
+def map_blocks(graph: FlowGraph, resources, cost_model=None, imbalance=IMBALANCE, passes=REFINEMENT_PASSES):
+    """
+    Assign every block to a resource, keeping every resource within its share of the total cost while as little
+    traffic as possible crosses resources.
+
+    Blocks are placed greedily along the signal flow next to the neighbours they exchange the most data with,
+    then single blocks are moved to other resources as long as that lowers the crossing traffic and the target
+    stays within its share.
+
+    :param graph: The FlowGraph of the blocks.
+    :param resources: The Resource list to map onto.
+    :param cost_model: A CostModel, the default one if not given.
+    :param imbalance: Load allowed above the fair share of a resource, relative to that share.
+    :param passes: Number of refinement passes.
+    :return: A Mapping.
+    """
+    if not resources:
+        raise ValueError("No resources to map the blocks onto")
+    cost_model = cost_model or CostModel()
+    rates, output_rates = cost_model.sample_rates(graph)
+    costs = cost_model.block_costs(graph, rates)
+    connection_costs = cost_model.connection_costs(graph, output_rates)
+
+    neighbours = [{} for _ in range(len(graph))]
+    for (src, dst), cost in connection_costs.items():
+        if src != dst:
+            neighbours[src][dst] = neighbours[src].get(dst, 0.0) + cost
+            neighbours[dst][src] = neighbours[dst].get(src, 0.0) + cost
+
+    total = sum(costs)
+    capacity = sum(resource.capacity for resource in resources)
+    limits = [total * resource.capacity / capacity * (1 + imbalance) for resource in resources]
+    loads = [0.0] * len(resources)
+    assignment = [None] * len(graph)
+
+    def affinity(block_id):
+        shared = [0.0] * len(resources)
+        for other, cost in neighbours[block_id].items():
+            if assignment[other] is not None:
+                shared[assignment[other]] += cost
+        return shared
+
+    layers = assign_layers(graph)
+    for block_id in sorted(range(len(graph)), key=layers.__getitem__):
+        shared = affinity(block_id)
+        fitting = [index for index in range(len(resources)) if loads[index] + costs[block_id] <= limits[index]]
+        if fitting:
+            best = max(fitting, key=lambda index: (shared[index], -loads[index] / resources[index].capacity, -index))
+        else:
+            # Too big for the room left anywhere, it goes to the least loaded resource
+            best = min(range(len(resources)), key=lambda index: (loads[index] / resources[index].capacity, index))
+        assignment[block_id] = best
+        loads[best] += costs[block_id]
+
+    for _ in range(passes):
+        moved = False
+        for block_id in range(len(graph)):
+            current = assignment[block_id]
+            shared = affinity(block_id)
+            best, best_gain = current, 0.0
+            for index in range(len(resources)):
+                gain = shared[index] - shared[current]
+                if index != current and gain > best_gain and loads[index] + costs[block_id] <= limits[index]:
+                    best, best_gain = index, gain
+            if best != current:
+                loads[current] -= costs[block_id]
+                loads[best] += costs[block_id]
+                assignment[block_id] = best
+                moved = True
+        if not moved:
+            break
+    return Mapping(graph, resources, assignment, rates, costs, connection_costs)
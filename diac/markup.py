@@ -0,0 +1,12 @@
+# Patterns for finding markup in the raw bytes of a 4diac project, shared by the splicing and editing code.
+import re
+
+# The attributes of a start tag, quoted values may hold a closing bracket
+ATTRIBUTES = rb"""(?:[^>"']|"[^"]*"|'[^']*')*"""
+DECLARED_ENCODING = re.compile(rb"""^\s*<\?xml[^>]*encoding\s*=\s*["']([A-Za-z0-9._-]+)["']""")
+
+
+def declared_encoding(data):
+    """The encoding named in the XML declaration of the raw bytes, utf-8 without one."""
+    declared = DECLARED_ENCODING.match(data)
+    return declared.group(1).decode() if declared else "utf-8"
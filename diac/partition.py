@@ -0,0 +1,341 @@
+# Partition large flowgraphs into nested SubApps, so the 4diac IDE only opens a bounded number of FBs at a time.
+from concurrent.futures import ProcessPoolExecutor
+from io import StringIO
+
+from diac.fb_network import FunctionBlockNetwork, fb_instance
+from diac.layout import layered_layout
+from diac.types import stream_type_of
+from diac.xml_writer import XMLWriter
+from radio.block import Block, Connection
+from radio.flowgraph import FlowGraph
+
+MAX_PARTITION_SIZE = 32  # FBs and SubApps per network
+PROPAGATION_ROUNDS = 10
+
+
+def block_adjacency(graph: FlowGraph):
+    """The undirected, weighted adjacency of the blocks, one {neighbour id: connections} dictionary per block."""
+    adjacency = [{} for _ in range(len(graph))]
+    for src, dst in graph.edges():
+        if src != dst:
+            adjacency[src][dst] = adjacency[src].get(dst, 0) + 1
+            adjacency[dst][src] = adjacency[dst].get(src, 0) + 1
+    return adjacency
+
+
+def find_communities(adjacency, max_size, rounds=PROPAGATION_ROUNDS):
+    """
+    Group the nodes into communities of at most max_size nodes that keep most connections inside.
+
+    Capped label propagation lets every node join the community it has the most connections to, then small
+    communities are merged into the neighbour they share the most connections with while the cap allows. Nodes
+    are visited in id order and ties go to the lower label, so the result is deterministic.
+
+    :param adjacency: One {neighbour: weight} dictionary per node.
+    :param max_size: The largest number of nodes of a community.
+    :param rounds: The maximum number of propagation rounds.
+    :return: The communities as lists of node ids, ordered by their first node.
+    """
+    size = len(adjacency)
+    labels = list(range(size))
+    sizes = [1] * size
+    for _ in range(rounds):
+        changed = False
+        for node in range(size):
+            weights = {}
+            for other, weight in adjacency[node].items():
+                weights[labels[other]] = weights.get(labels[other], 0) + weight
+            current = labels[node]
+            best, best_weight = current, weights.get(current, 0)
+            for label, weight in weights.items():
+                if label == current or sizes[label] >= max_size:
+                    continue
+                if weight > best_weight or (weight == best_weight and label < best):
+                    best, best_weight = label, weight
+            if best != current:
+                sizes[current] -= 1
+                sizes[best] += 1
+                labels[node] = best
+                changed = True
+        if not changed:
+            break
+
+    # Weights between the communities, then merge the smallest ones first
+    between = {label: {} for label in set(labels)}
+    for node in range(size):
+        for other, weight in adjacency[node].items():
+            a, b = labels[node], labels[other]
+            if a != b:
+                between[a][b] = between[a].get(b, 0) + weight
+    merged_into = {}
+    for label in sorted(between, key=lambda label: (sizes[label], label)):
+        neighbours = between[label]
+        candidates = [(weight, -other) for other, weight in neighbours.items()
+                      if sizes[other] + sizes[label] <= max_size]
+        if not candidates:
+            continue
+        target = -max(candidates)[1]
+        merged_into[label] = target
+        sizes[target] += sizes[label]
+        for other, weight in neighbours.items():
+            del between[other][label]
+            if other != target:
+                between[target][other] = between[target].get(other, 0) + weight
+                between[other][target] = between[other].get(target, 0) + weight
+        between[target].pop(label, None)
+        del between[label]
+
+    groups = {}
+    for node in range(size):
+        label = labels[node]
+        while label in merged_into:
+            label = merged_into[label]
+        groups.setdefault(label, []).append(node)
+    return sorted(groups.values(), key=lambda group: group[0])
+
+
+def quotient_adjacency(adjacency, groups):
+    """The adjacency between the groups, with the weights of the connections between their nodes summed up."""
+    group_of = {}
+    for index, group in enumerate(groups):
+        for node in group:
+            group_of[node] = index
+    quotient = [{} for _ in groups]
+    for node, neighbours in enumerate(adjacency):
+        a = group_of[node]
+        for other, weight in neighbours.items():
+            b = group_of[other]
+            if a != b:
+                quotient[a][b] = quotient[a].get(b, 0) + weight
+    return quotient
+
+
+class Partition:
+    """
+    A SubApp holding blocks, given by their block id, and nested partitions.
+
+    The adapter pins of the SubApp are collected while connections are routed, see route_connections.
+    """
+
+    def __init__(self, members):
+        self.name = None
+        self.members = members
+        self.parent = None
+        for member in members:
+            if isinstance(member, Partition):
+                member.parent = self
+        self.sockets = {}  # Block id -> pin name, for blocks inside receiving from outside
+        self.plugs = {}  # Block id -> pin name, for blocks inside sending to outside
+        self.connections = []
+
+    def partitions(self):
+        """Yield this partition and all nested ones, parents first."""
+        yield self
+        for member in self.members:
+            if isinstance(member, Partition):
+                yield from member.partitions()
+
+    def blocks(self):
+        """Yield the ids of all blocks in this partition and the nested ones."""
+        for member in self.members:
+            if isinstance(member, Partition):
+                yield from member.blocks()
+            else:
+                yield member
+
+    def __str__(self):
+        return f'Partition({self.name}, {len(self.members)} members)'
+
+    def __repr__(self):
+        return str(self)
+
+
+def partition_graph(graph: FlowGraph, max_size=MAX_PARTITION_SIZE):
+    """
+    Build a tree of partitions where no network has more than max_size FBs and SubApps.
+
+    Blocks are grouped into communities, then the communities are grouped again, until the top level fits.
+
+    :return: The root Partition, it stands for the network of the project and gets no SubApp of its own.
+    """
+    if max_size < 2:
+        raise ValueError("Partitions need room for at least two members")
+    nodes = list(range(len(graph)))
+    adjacency = block_adjacency(graph)
+    while len(nodes) > max_size:
+        groups = find_communities(adjacency, max_size)
+        if len(groups) == len(nodes):
+            # Nothing left to merge along connections, group unconnected neighbours in order instead
+            groups = [list(range(start, min(start + max_size, len(nodes))))
+                      for start in range(0, len(nodes), max_size)]
+        adjacency = quotient_adjacency(adjacency, groups)
+        nodes = [nodes[group[0]] if len(group) == 1 else Partition([nodes[index] for index in group])
+                 for group in groups]
+
+    root = Partition(nodes)
+    for number, partition in enumerate(list(root.partitions())[1:], start=1):
+        partition.name = f"SubApp_{number}"
+    return root
+
+
+def route_connections(graph: FlowGraph, root: Partition):
+    """
+    Route every connection through the SubApp pins between its blocks.
+
+    A connection lives in the innermost partition holding both blocks, each SubApp on the way down to a block gets
+    one pin per block, shared by all connections of the block crossing it.
+    """
+    parent = {}
+    for partition in root.partitions():
+        for member in partition.members:
+            if not isinstance(member, Partition):
+                parent[member] = partition
+
+    def ancestors(block_id):
+        chain = []
+        partition = parent[block_id]
+        while partition is not None:
+            chain.append(partition)
+            partition = partition.parent
+        return chain
+
+    def endpoint(block_id, chain, index, pins, port):
+        # The endpoint of the block as seen from inside chain[index], created on the way down if needed
+        name = graph[block_id].name
+        if index == 0:
+            return f"{name}.{port}"
+        child = chain[index - 1]
+        if block_id not in pins(child):
+            pins(child)[block_id] = f"{name}_{port}"
+            inner = endpoint(block_id, chain, index - 1, pins, port)
+            if port == "DataOut":
+                child.connections.append((inner, pins(child)[block_id]))
+            else:
+                child.connections.append((pins(child)[block_id], inner))
+        return f"{child.name}.{pins(child)[block_id]}"
+
+    for src, dst in graph.edges():
+        src_chain = ancestors(src)
+        dst_chain = ancestors(dst)
+        common = next(partition for partition in src_chain if partition in dst_chain)
+        source = endpoint(src, src_chain, src_chain.index(common), lambda p: p.plugs, "DataOut")
+        destination = endpoint(dst, dst_chain, dst_chain.index(common), lambda p: p.sockets, "DataIn")
+        common.connections.append((source, destination))
+
+    # Connections to blocks missing from the flowgraph are kept next to their source, like in a flat network
+    for block_id, block in enumerate(graph):
+        for connection in block.connections:
+            if connection.dst not in graph.ids:
+                parent[block_id].connections.append((f"{connection.src}.DataOut", f"{connection.dst}.DataIn"))
+
+
+def partition_spec(graph: FlowGraph, partition: Partition, function_blocks, converted, ports=None, rules=None):
+    """
+    Collect everything needed to generate the network of a partition into plain data, so it can be generated in
+    another process.
+    """
+    blocks = [member for member in partition.members if not isinstance(member, Partition)]
+    nested = [member for member in partition.members if isinstance(member, Partition)]
+
+    fbs = []
+    for block_id in blocks:
+        block = graph[block_id]
+        fb_type, parameters = fb_instance(block, function_blocks[block_id], converted[block_id],
+                                          rules[block_id] if rules is not None else None)
+        fbs.append((block.name, fb_type, parameters))
+
+    # Connections between the members, FBs first and then SubApps, only used to lay them out
+    index = {}
+    for position, member in enumerate(blocks + nested):
+        for block_id in (member.blocks() if isinstance(member, Partition) else (member,)):
+            index[block_id] = position
+    links = sorted({(index[src], index[dst]) for src in index for dst in graph.successors(src)
+                    if dst in index and index[src] != index[dst]})
+
+    def pins(pin_map, side):
+        # The pin carries the adapter of the socket or the plug of the block it leads to
+        return [(pin, "gnu_radio::" + (ports[block_id][side] if ports is not None
+                                        else stream_type_of(graph[block_id])).adapter_name)
+                for block_id, pin in pin_map.items()]
+
+    return {"name": partition.name, "sockets": pins(partition.sockets, 0), "plugs": pins(partition.plugs, 1),
+            "fbs": fbs, "subapps": [partition_spec(graph, member, function_blocks, converted, ports, rules)
+                                    for member in nested],
+            "links": links, "connections": partition.connections}
+
+
+def member_positions(spec, layout=True):
+    """The positions of the FBs followed by the SubApps of a partition's network."""
+    count = len(spec["fbs"]) + len(spec["subapps"])
+    if not layout:
+        return [None] * count
+    proxies = [Block(str(member), None) for member in range(count)]
+    for src, dst in spec["links"]:
+        proxies[src].add_connection(Connection(str(src), str(dst)))
+    return layered_layout(FlowGraph(proxies))
+
+
+def _network(spec, fb_positions, subapps):
+    network = FunctionBlockNetwork()
+    for (name, fb_type, parameters), position in zip(spec["fbs"], fb_positions):
+        network.add_function_block(name, fb_type, [], parameters, position)
+    for xml in subapps:
+        network.add_subapp(xml)
+    for source, destination in spec["connections"]:
+        network.add_adapter_connection(source, destination)
+    return network
+
+
+def render_subapp(spec, position=None, layout=True):
+    """Generate the <SubApp> element of a partition with its nested SubApps."""
+    positions = member_positions(spec, layout)
+    fb_count = len(spec["fbs"])
+    children = [render_subapp(child, child_position, layout)
+                for child, child_position in zip(spec["subapps"], positions[fb_count:])]
+
+    stream = StringIO()
+    writer = XMLWriter(stream)
+    x, y = position or (0, 0)
+    with writer.tag("SubApp", Name=spec["name"], x=str(x), y=str(y)):
+        with writer.tag("SubAppInterfaceList"):
+            for section, pins in (("Sockets", spec["sockets"]), ("Plugs", spec["plugs"])):
+                if pins:
+                    with writer.tag(section):
+                        for pin, adapter_type in pins:
+                            writer.element("AdapterDeclaration", Name=pin, Type=adapter_type)
+        _network(spec, positions[:fb_count], children).to_xml(writer)
+    return stream.getvalue()
+
+
+def generate_partitioned_fbn(graph: FlowGraph, function_blocks, converted, max_size=MAX_PARTITION_SIZE,
+                             workers=None, layout=True, ports=None, rules=None):
+    """
+    Generate the network of the project with the blocks partitioned into nested SubApps.
+
+    :param graph: The FlowGraph of the blocks.
+    :param function_blocks: The function block type name of each block.
+    :param converted: The converted parameters of each block.
+    :param max_size: The largest number of FBs and SubApps in one network.
+    :param workers: Generate the top level SubApps in this many processes, None or 1 to generate them here.
+    :param layout: Lay out the members of every network, otherwise they are stacked diagonally.
+    :param ports: The (socket, plug) StreamTypes of each block from a BufferPlan, for the adapter types of the pins.
+    :param rules: The Rule of diac.rules matching each block, or None.
+    :return: The <SubAppNetwork> XML of the project.
+    """
+    root = partition_graph(graph, max_size)
+    route_connections(graph, root)
+    spec = partition_spec(graph, root, function_blocks, converted, ports, rules)
+
+    positions = member_positions(spec, layout)
+    fb_count = len(spec["fbs"])
+    # Every top level SubApp is generated on its own, from plain data
+    arguments = (spec["subapps"], positions[fb_count:], [layout] * len(spec["subapps"]))
+    if workers is not None and workers > 1 and len(spec["subapps"]) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            children = list(executor.map(render_subapp, *arguments))
+    else:
+        children = list(map(render_subapp, *arguments))
+
+    stream = StringIO()
+    _network(spec, positions[:fb_count], children).to_xml(XMLWriter(stream))
+    return stream.getvalue()
@@ -0,0 +1,232 @@
+# Read and edit the parts of a 4diac system project the converter owns, every other byte of the file stays as it is.
+import re
+from xml.sax.saxutils import unescape
+
+from diac.markup import ATTRIBUTES, declared_encoding
+from diac.writer import find_subappnetwork_span
+from diac.xml_writer import escape_attribute
+
+_MARKUP = re.compile(
+    rb"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>|<!DOCTYPE[^>]*>"
+    rb"|<(?P<close>/)?(?P<tag>[A-Za-z_][\w.:-]*)(?P<attributes>" + ATTRIBUTES + rb")>",
+    re.DOTALL)
+_ATTRIBUTE = re.compile(rb"""([\w.:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+
+
+class Element:
+    """
+    The byte span of an element of the project.
+
+    :ivar start: Offset of the start tag.
+    :ivar end: Offset after the end tag.
+    :ivar content_start: Offset after the start tag, None for an empty element.
+    :ivar content_end: Offset of the end tag, None for an empty element.
+    :ivar parents: The enclosing elements, outermost first.
+    """
+
+    def __init__(self, tag, attributes, start, content_start, parents):
+        self.tag = tag
+        self.attributes = attributes
+        self.start = start
+        self.content_start = content_start
+        self.content_end = None
+        self.end = None
+        self.parents = parents
+
+    @property
+    def name(self):
+        return self.attributes.get("Name")
+
+    @property
+    def is_empty(self):
+        return self.content_start is None
+
+    def __str__(self):
+        return f'Element({self.tag}, {self.name}, {self.start}:{self.end})'
+
+    def __repr__(self):
+        return str(self)
+
+
+def scan_elements(data):
+    """
+    Find every element of a project file, comments and CDATA are skipped.
+
+    :param data: The raw bytes of the project file.
+    :return: The elements in the order of their start tags.
+    """
+    elements = []
+    stack = []
+    for match in _MARKUP.finditer(data):
+        tag = match.group("tag")
+        if tag is None:
+            continue
+        if match.group("close"):
+            if stack and stack[-1].tag == tag.decode():
+                element = stack.pop()
+                element.content_end = match.start()
+                element.end = match.end()
+            continue
+        raw = match.group("attributes")
+        attributes = {name.decode(): unescape((double if double is not None else single).decode(),
+                                              {"&quot;": '"', "&apos;": "'"})
+                      for name, double, single in _ATTRIBUTE.findall(raw)}
+        empty = raw.rstrip().endswith(b"/")
+        element = Element(tag.decode(), attributes, match.start(), None if empty else match.end(), tuple(stack))
+        elements.append(element)
+        if empty:
+            element.end = match.end()
+        else:
+            stack.append(element)
+    return elements
+
+
+def project_resources(elements):
+    """
+    :return: The "device.resource" path of every resource of the project, in the order of the project.
+    """
+    return [f"{element.parents[-1].name}.{element.name}" for element in elements
+            if element.tag == "Resource" and element.parents and element.parents[-1].tag == "Device"]
+
+
+def application_of(elements, offset):
+    """Return the Application element holding the offset."""
+    for element in elements:
+        if element.tag == "Application" and element.start <= offset < element.end:
+            return element
+    raise ValueError("The <SubAppNetwork> is not part of an <Application>.")
+
+
+def _remove(element, data):
+    # Take the indentation and line break in front of the element along
+    start = element.start
+    while start > 0 and data[start - 1] in b" \t":
+        start -= 1
+    if data[start - 1:start] == b"\n":
+        start -= 1
+        if data[start - 1:start] == b"\r":
+            start -= 1
+    return start, element.end, b""
+
+
+def mapping_edits(data, elements, mapping, application, encoding):
+    """
+    The edits writing the mapping into the project.
+
+    The generated FBs, recognised by their gnu_radio type, and their connections are replaced in the network of
+    every resource, other FBs like the START block of a resource stay. Resources the mapping leaves out lose
+    their generated FBs. <Mapping> elements of the application are replaced as well.
+
+    :return: A list of (start, end, replacement) edits.
+    """
+    edits = []
+    resources = {}
+    for element in elements:
+        if element.tag == "Resource" and element.parents and element.parents[-1].tag == "Device":
+            resources[f"{element.parents[-1].name}.{element.name}"] = element
+
+    for index, resource in enumerate(mapping.resources):
+        element = resources.get(resource.path)
+        if element is None:
+            raise ValueError(f"Resource {resource.path} not found in the project, it has "
+                             f"{', '.join(resources) or 'no resources'}")
+        network_xml = mapping.resource_network(index).encode(encoding, errors="xmlcharrefreplace")
+        if element.is_empty:
+            start_tag = data[element.start:element.end].rstrip(b"/> \t\r\n")
+            edits.append((element.start, element.end,
+                          start_tag + b">" + network_xml + b"</Resource>"))
+            continue
+        network = next((child for child in elements if child.tag == "FBNetwork" and child.parents
+                        and child.parents[-1] is element), None)
+        if network is None:
+            edits.append((element.content_end, element.content_end, network_xml))
+            continue
+        edits.extend(resource_network_edits(data, elements, network, mapping, index, encoding))
+
+    # FBs mapped onto a resource by an earlier conversion are gone from it when the mapping leaves it out
+    mapped = {resource.path for resource in mapping.resources}
+    for path, element in resources.items():
+        if path in mapped or element.is_empty:
+            continue
+        network = next((child for child in elements if child.tag == "FBNetwork" and child.parents
+                        and child.parents[-1] is element), None)
+        if network is not None:
+            edits.extend(generated_edits(data, elements, network)[0])
+
+    system = elements[0]
+    if system.tag != "System":
+        raise ValueError("The project has no <System> root element.")
+    prefix = application.name + "."
+    for element in elements:
+        if (element.tag == "Mapping" and element.parents == (system,)
+                and element.attributes.get("From", "").startswith(prefix)):
+            edits.append(_remove(element, data))
+    mappings = "".join(f'\t<Mapping From="{escape_attribute(application.name + "." + source)}" '
+                       f'To="{escape_attribute(target)}" />\n' for source, target in mapping.mappings())
+    edits.append((system.content_end, system.content_end, mappings.encode(encoding)))
+    return edits
+
+
+def generated_edits(data, elements, network):
+    """
+    The edits removing the generated FBs and their connections from the existing FBNetwork of a resource.
+
+    :return: The edits and the children of the network.
+    """
+    edits = []
+    children = [element for element in elements if element.parents and element.parents[-1] is network]
+    generated = set()
+    for element in children:
+        if element.tag == "FB" and element.attributes.get("Type", "").startswith("gnu_radio::"):
+            generated.add(element.name)
+            edits.append(_remove(element, data))
+    for element in elements:
+        if element.tag == "Connection" and len(element.parents) > 1 and element.parents[-2] is network:
+            ends = (element.attributes.get("Source", ""), element.attributes.get("Destination", ""))
+            if any(end.split(".")[0] in generated for end in ends):
+                edits.append(_remove(element, data))
+    return edits, children
+
+
+def resource_network_edits(data, elements, network, mapping, index, encoding):
+    """The edits replacing the generated FBs and connections in the existing FBNetwork of a resource."""
+    edits, children = generated_edits(data, elements, network)
+    fbs, connections = mapping.resource_parts(index)
+    edits.append((network.content_start, network.content_start, fbs.encode(encoding, errors="xmlcharrefreplace")))
+    adapter_connections = next((child for child in children if child.tag == "AdapterConnections"), None)
+    if adapter_connections is None or adapter_connections.is_empty:
+        connections = "<AdapterConnections>" + connections + "</AdapterConnections>"
+        if adapter_connections is not None:
+            edits.append(_remove(adapter_connections, data))
+        edits.append((network.content_end, network.content_end, connections.encode(encoding)))
+    else:
+        edits.append((adapter_connections.content_end, adapter_connections.content_end, connections.encode(encoding)))
+    return edits
+
+
+def update_project(data, network_xml, mapping=None):
+    """
+    Replace the network of the project and, if given, write the mapping of its FBs onto the resources.
+
+    :param data: The raw bytes of the project file.
+    :param network_xml: The new <SubAppNetwork> element.
+    :param mapping: A Mapping from diac.mapping, or None.
+    :return: The parts of the new project, write them out in order or join them.
+    """
+    encoding = declared_encoding(data)
+    start, end = find_subappnetwork_span(data)
+    edits = [(start, end, network_xml.encode(encoding, errors="xmlcharrefreplace"))]
+    if mapping is not None:
+        elements = scan_elements(data)
+        edits += mapping_edits(data, elements, mapping, application_of(elements, start), encoding)
+
+    parts = []
+    position = 0
+    view = memoryview(data)
+    # Insertions at the same offset keep the order they were added in
+    for edit_start, edit_end, replacement in sorted(edits, key=lambda edit: (edit[0], edit[1])):
+        parts.append(view[position:edit_start])
+        parts.append(replacement)
+        position = max(position, edit_end)
+    parts.append(view[position:])
+    return parts
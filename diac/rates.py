@@ -0,0 +1,51 @@
+# Sample rates along the streams of a flowgraph, taking decimating and interpolating blocks into account
+from diac.layout import assign_layers
+from diac.types import classify_value
+from radio.flowgraph import FlowGraph
+
+DEFAULT_SAMPLE_RATE = 32000.0
+# Parameters declaring the rate of a source, after set_sample_rate they hold the flowgraph's samp_rate
+RATE_PARAMETERS = ("samp_rate", "sample_rate", "samples_per_second")
+# Parameters dividing or multiplying the rate of the output stream against the input stream
+DECIMATION_PARAMETERS = ("decim", "decimation")
+INTERPOLATION_PARAMETERS = ("interp", "interpolation")
+
+
+def numeric_parameter(block, keys):
+    """The first of the parameters holding a positive number, or None."""
+    for key in keys:
+        if key in block.parameters:
+            iec_type, value = classify_value(block.parameters[key])
+            if iec_type in ("INT", "DINT", "REAL") and 0 < float(value) < float("inf"):
+                return float(value)
+    return None
+
+
+def rate_change(block):
+    """The output rate of the block relative to its input rate."""
+    decimation = numeric_parameter(block, DECIMATION_PARAMETERS) or 1.0
+    interpolation = numeric_parameter(block, INTERPOLATION_PARAMETERS) or 1.0
+    return interpolation / decimation
+
+
+def propagate_rates(graph: FlowGraph, default_rate=DEFAULT_SAMPLE_RATE):
+    """
+    Propagate the sample rates along the signal flow.
+
+    A block without inputs runs at its declared rate, see RATE_PARAMETERS, a block with inputs at the highest
+    output rate of its predecessors. The output rate is the input rate changed by the block's decimation and
+    interpolation.
+
+    :return: The input rates and the output rates of all blocks, in items per second.
+    """
+    input_rates = [0.0] * len(graph)
+    output_rates = [None] * len(graph)
+    layers = assign_layers(graph)
+    for block_id in sorted(range(len(graph)), key=layers.__getitem__):
+        upstream = [output_rates[other] for other in graph.predecessors(block_id) if output_rates[other] is not None]
+        if upstream:
+            input_rates[block_id] = max(upstream)
+        else:
+            input_rates[block_id] = numeric_parameter(graph[block_id], RATE_PARAMETERS) or default_rate
+        output_rates[block_id] = input_rates[block_id] * rate_change(graph[block_id])
+    return input_rates, output_rates
@@ -0,0 +1,183 @@
+# Rules mapping GNU Radio blocks onto existing 4diac library FB types, with parameter renames and omissions.
+import hashlib
+import os
+import pickle
+import re
+
+import yaml
+
+from diac.writer import open_for_write
+from radio.parser import SafeLoader
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "radio2diac", "rules")
+# Bumped whenever the compiled form changes, older cache files are ignored then
+RULES_CACHE_VERSION = 1
+RULE_KEYS = {"id", "id_pattern", "type", "parameters", "fb_type", "rename", "omit"}
+
+
+class Rule:
+    """
+    One rule of a rules file.
+
+    A rule matches a block by its exact ``id`` or an ``id_pattern`` regular expression, optionally only for one
+    stream ``type`` and only if the ``parameters`` values match the given regular expressions. A matched block
+    becomes an instance of the library ``fb_type`` instead of a generated type, if given, with its parameters
+    renamed after ``rename`` and the ones listed in ``omit`` left out.
+    """
+
+    def __init__(self, index, block_id=None, id_pattern=None, stream_type=None, parameters=None, fb_type=None,
+                 rename=None, omit=None):
+        self.index = index
+        self.block_id = block_id
+        self.id_pattern = re.compile(id_pattern) if id_pattern is not None else None
+        self.stream_type = stream_type
+        self.parameters = [(key, re.compile(str(pattern))) for key, pattern in (parameters or {}).items()]
+        self.fb_type = fb_type
+        self.rename = dict(rename or {})
+        self.omit = set(omit or ())
+
+    @classmethod
+    def from_dict(cls, index, entry):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Rule {index} is not a mapping")
+        unknown = set(entry) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"Rule {index} has unknown keys {', '.join(sorted(unknown))}")
+        if ("id" in entry) == ("id_pattern" in entry):
+            raise ValueError(f"Rule {index} needs either id or id_pattern")
+        if "fb_type" in entry and "::" not in str(entry["fb_type"]):
+            raise ValueError(f"Rule {index} fb_type {entry['fb_type']} is not written as PACKAGE::NAME")
+        if not any(key in entry for key in ("fb_type", "rename", "omit")):
+            raise ValueError(f"Rule {index} changes nothing, give fb_type, rename or omit")
+        try:
+            return cls(index, entry.get("id"), entry.get("id_pattern"), entry.get("type"), entry.get("parameters"),
+                       entry.get("fb_type"), entry.get("rename"), entry.get("omit"))
+        except re.error as e:
+            raise ValueError(f"Rule {index} has an invalid pattern: {e}") from None
+
+    def matches(self, radio_block):
+        """Check everything but the block id, the RuleSet only asks rules whose id matches."""
+        if self.stream_type is not None and radio_block.type != self.stream_type:
+            return False
+        for key, pattern in self.parameters:
+            if key not in radio_block.parameters or not pattern.fullmatch(str(radio_block.parameters[key])):
+                return False
+        return True
+
+    def type_name(self, generated_name):
+        """The FB type of a matched block, generated_name is its generated gnu_radio type."""
+        return self.fb_type or "gnu_radio::" + str(generated_name)
+
+    def apply(self, parameters):
+        """Rename and omit the parameters, a list of tuples starting with the parameter name."""
+        return [(self.rename.get(parameter[0], parameter[0]),) + tuple(parameter[1:])
+                for parameter in parameters if parameter[0] not in self.omit]
+
+    def __str__(self):
+        return f'Rule({self.index}, {self.block_id or self.id_pattern.pattern}, {self.fb_type})'
+
+    def __repr__(self):
+        return str(self)
+
+
+class RuleSet:
+    """
+    Rules compiled into an index, the first rule of the file that matches a block wins.
+
+    Rules with an exact id are kept in one bucket per id, rules with an id pattern are only tried once per block
+    id. The candidates of a block id, both kinds merged in file order, are memoized.
+    """
+
+    def __init__(self, rules, digest=None):
+        self.rules = rules
+        self.digest = digest
+        self.by_id = {}
+        self.patterned = []
+        for rule in rules:
+            if rule.block_id is not None:
+                self.by_id.setdefault(str(rule.block_id), []).append(rule)
+            else:
+                self.patterned.append(rule)
+        self._candidates = {}
+
+    def candidates(self, block_id):
+        candidates = self._candidates.get(block_id)
+        if candidates is None:
+            patterned = [rule for rule in self.patterned if rule.id_pattern.fullmatch(block_id)]
+            candidates = sorted(self.by_id.get(block_id, []) + patterned, key=lambda rule: rule.index)
+            self._candidates[block_id] = candidates
+        return candidates
+
+    def match(self, radio_block):
+        """Return the first Rule matching the block, or None."""
+        for rule in self.candidates(str(radio_block.id)):
+            if rule.matches(radio_block):
+                return rule
+        return None
+
+    def match_all(self, radio_blocks):
+        """Return the matching Rule or None of every block."""
+        return [self.match(block) for block in radio_blocks]
+
+    def __getstate__(self):
+        # The memoized candidates depend on the flowgraphs seen, they are not worth caching
+        return {"rules": self.rules, "digest": self.digest, "by_id": self.by_id, "patterned": self.patterned}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._candidates = {}
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __str__(self):
+        return f'RuleSet({len(self.rules)} rules, {len(self.by_id)} ids, {len(self.patterned)} patterns)'
+
+    def __repr__(self):
+        return str(self)
+
+
+def compile_rules(data, digest=None):
+    """
+    Compile the loaded rules file, a list of rules or a mapping with a ``rules`` list.
+
+    :raise ValueError: If a rule is malformed.
+    """
+    entries = data.get("rules") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError("The rules file holds no list of rules")
+    return RuleSet([Rule.from_dict(index, entry) for index, entry in enumerate(entries)], digest)
+
+
+def load_rules(path, cache_directory=DEFAULT_CACHE_DIRECTORY):
+    """
+    Load a rules file, compiled once and then taken from the cache as long as the file content stays the same.
+
+    :param path: The YAML rules file.
+    :param cache_directory: Where the compiled rules are kept by the hash of the file, None to always compile.
+    :return: The RuleSet.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    digest = hashlib.sha256(data).hexdigest()
+    cache_path = None
+    if cache_directory is not None:
+        cache_path = os.path.join(cache_directory, f"{digest}.v{RULES_CACHE_VERSION}.pickle")
+        try:
+            with open(cache_path, 'rb') as file:
+                rules = pickle.load(file)
+            if isinstance(rules, RuleSet) and rules.digest == digest:
+                return rules
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            pass
+
+    rules = compile_rules(yaml.load(data, Loader=SafeLoader), digest)
+    if cache_path is not None:
+        try:
+            os.makedirs(cache_directory, exist_ok=True)
+            with open_for_write(cache_path, 'wb') as file:
+                pickle.dump(rules, file, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass  # A read-only cache only costs the compilation
+    return rules
+
@@ -0,0 +1,266 @@
+# Destinations for the documents of a conversion, see ConversionResult.write.
+import gzip
+import io
+import os
+import tarfile
+import time
+import zipfile
+
+from diac.cache import BlockCache
+from diac.document import FBT, DTP, ADP, NETWORK
+from diac.function_block import fixed_generation_date
+from diac.project import update_project
+from diac.writer import open_for_write, write_if_changed, replace_subappnetwork_in_file
+
+# Timestamp of every archive member, the earliest a zip file can hold, unless SOURCE_DATE_EPOCH says otherwise
+ARCHIVE_EPOCH = 315532800
+ARCHIVE_FORMATS = {".zip": "zip", ".tar": "tar", ".tar.gz": "tar.gz", ".tgz": "tar.gz"}
+
+
+class Sink:
+    """
+    Receives every document of a conversion through write() and is closed once all were written, or aborted if
+    the conversion failed on the way.
+    """
+
+    def write(self, document):
+        raise NotImplementedError
+
+    def holds(self, document):
+        """Check if the sink already holds the document and will skip it, so it need not be rendered."""
+        return False
+
+    def render(self, document):
+        """Render the content of a document before it is written, the document keeps it."""
+        return document.content
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+    def summary(self):
+        return type(self).__name__
+
+
+class MemorySink(Sink):
+    """Keeps the content of every document by file name."""
+
+    def __init__(self):
+        self.documents = {}
+
+    def write(self, document):
+        self.documents[document.file_name] = document.content
+
+
+class DirectorySink(Sink):
+    """
+    Writes function block types into the blocks directory, data and adapter types into the types directory and
+    splices the network into the 4diac project file. Kinds without a target are skipped.
+
+    :param blocks: The blocks output directory.
+    :param types: The types output directory.
+    :param diac: The Eclipse 4diac project file.
+    :param force: Regenerate every function block even if the cache says it is unchanged.
+    :param cache: A loaded BlockCache of the blocks directory, loaded here if not given.
+    :param known_types: A set of type paths this process already wrote, see TypeRegistry.write.
+    :param previous_network: The network written before, it is not spliced in again.
+    """
+
+    def __init__(self, blocks=None, types=None, diac=None, force=False, cache=None, known_types=None,
+                 previous_network=None):
+        self.blocks = blocks
+        self.types = types
+        self.diac = diac
+        self.cache = cache
+        if self.cache is None and blocks is not None:
+            self.cache = BlockCache(blocks, force=force).load()
+        self.known_types = known_types
+        self.previous_network = previous_network
+        self.types_written = 0
+        self.types_unchanged = 0
+        self.network_written = False
+        self.written_paths = []
+        # Whether the cache holds each FB type, by file name, so every type is looked up and counted once
+        self._fresh = {}
+
+    def write(self, document):
+        if document.kind == FBT:
+            self.write_fb_type(document)
+        elif document.kind in (DTP, ADP):
+            self.write_type(document)
+        elif document.kind == NETWORK:
+            self.write_network(document)
+
+    def holds(self, document):
+        if document.kind == FBT:
+            if self.blocks is None:
+                return True
+            fresh = self._fresh.get(document.file_name)
+            if fresh is None:
+                path = os.path.join(self.blocks, document.file_name)
+                fresh = self._fresh[document.file_name] = self.cache.is_fresh(path, document.digest)
+            return fresh
+        if document.kind in (DTP, ADP):
+            if self.types is None:
+                return True
+            path = os.path.join(self.types, document.file_name)
+            return self.known_types is not None and path in self.known_types and os.path.exists(path)
+        return False
+
+    def write_fb_type(self, document):
+        if self.holds(document):
+            return
+        path = os.path.join(self.blocks, document.file_name)
+        with open_for_write(path) as file:
+            document.write_to(file)
+        self.cache.update(path, document.digest)
+        self.written_paths.append(path)
+
+    def write_type(self, document):
+        if self.types is None:
+            return
+        path = os.path.join(self.types, document.file_name)
+        known = self.known_types
+        if known is not None and path in known and os.path.exists(path):
+            self.types_unchanged += 1
+            return
+        if write_if_changed(path, document.content):
+            self.types_written += 1
+            self.written_paths.append(path)
+        else:
+            self.types_unchanged += 1
+        if known is not None:
+            known.add(path)
+
+    def write_network(self, document):
+        if self.diac is None or (document.content == self.previous_network and document.mapping is None):
+            return
+        if document.mapping is None:
+            replace_subappnetwork_in_file(self.diac, document.content)
+        else:
+            with open(self.diac, 'rb') as file:
+                parts = update_project(file.read(), document.content, document.mapping)
+            with open_for_write(self.diac, 'wb') as file:
+                for part in parts:
+                    file.write(part)
+        self.network_written = True
+        self.written_paths.append(self.diac)
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.save()
+
+    def summary(self):
+        return self.cache.summary() if self.cache is not None else "no function blocks written"
+
+
+def archive_format(path):
+    for extension, archive_type in ARCHIVE_FORMATS.items():
+        if path.endswith(extension):
+            return archive_type
+    raise ValueError(f"Unknown archive type of {path}, use one of {', '.join(ARCHIVE_FORMATS)}")
+
+
+class ArchiveSink(Sink):
+    """
+    Writes all documents into a single zip or tar archive, as blocks/<file>, types/<file> and the network.
+
+    Every member is rendered into memory and then added, in the order the documents are written, with a fixed
+    timestamp, owner and mode. The generated types are rendered again dated after the same timestamp, even if
+    their content was rendered before, so the same conversion gives a byte identical archive on any day.
+    The archive is written to a temporary file, synced once and moved into place on close().
+
+    :param path: The archive to write, its type is taken from the extension, see ARCHIVE_FORMATS.
+    :param project: An Eclipse 4diac project file, if given the archive holds a copy of it with the network
+                    spliced in instead of the bare network. The project file itself is not changed.
+    :param epoch: The timestamp of all members and the date of the types, defaults to SOURCE_DATE_EPOCH or
+                  ARCHIVE_EPOCH.
+    """
+
+    def __init__(self, path, project=None, epoch=None):
+        self.path = path
+        self.project = project
+        self.format = archive_format(path)
+        if epoch is None:
+            epoch = int(os.environ.get("SOURCE_DATE_EPOCH", ARCHIVE_EPOCH))
+        self.epoch = max(epoch, ARCHIVE_EPOCH)
+        self.members = 0
+        self.bytes = 0
+        # The document last rendered and its content, kept until it is written
+        self._rendered = (None, None)
+
+        # Written next to the archive and moved into place on close(), like open_for_write does
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.file = open(self.tmp_path, 'wb')
+        self._gzip = None
+        if self.format == "zip":
+            self.archive = zipfile.ZipFile(self.file, 'w', compression=zipfile.ZIP_DEFLATED)
+        else:
+            stream = self.file
+            if self.format == "tar.gz":
+                # GzipFile stores a timestamp and the file name in its header unless told otherwise
+                stream = self._gzip = gzip.GzipFile(filename="", mode='wb', fileobj=self.file, mtime=self.epoch)
+            self.archive = tarfile.open(fileobj=stream, mode='w', format=tarfile.PAX_FORMAT)
+
+    def member_name(self, document):
+        if document.kind == FBT:
+            return "blocks/" + document.file_name
+        if document.kind in (DTP, ADP):
+            return "types/" + document.file_name
+        if self.project is not None:
+            return os.path.basename(self.project)
+        return document.file_name
+
+    def write(self, document):
+        name = self.member_name(document)
+        if document.kind == NETWORK and self.project is not None:
+            with open(self.project, 'rb') as file:
+                data = b"".join(update_project(file.read(), document.content, document.mapping))
+        else:
+            rendered, content = self._rendered
+            data = (content if rendered is document else self.render(document)).encode("utf-8")
+            self._rendered = (None, None)
+
+        if self.format == "zip":
+            info = zipfile.ZipInfo(name, date_time=time.gmtime(self.epoch)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o100644 << 16
+            self.archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = self.epoch
+            info.mode = 0o644
+            self.archive.addfile(info, io.BytesIO(data))
+        self.members += 1
+        self.bytes += len(data)
+
+    def render(self, document):
+        # The content the document holds may carry another date, the archive gets a copy of its own
+        stream = io.StringIO()
+        with fixed_generation_date(self.epoch):
+            document.render(stream)
+        self._rendered = (document, stream.getvalue())
+        return self._rendered[1]
+
+    def close(self):
+        self.archive.close()
+        if self._gzip is not None:
+            self._gzip.close()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        # An existing archive stays untouched, the archive is closed first so nothing writes to the file later
+        self.archive.close()
+        if self._gzip is not None:
+            self._gzip.close()
+        self.file.close()
+        os.remove(self.tmp_path)
+
+    def summary(self):
+        return f"{self.members} documents, {self.bytes} bytes into {self.path}"
@@ -0,0 +1,71 @@
+# Registry of the data types and adapters needed by the streams of a GNU Radio flowgraph.
+from diac.adapter import MAX_ARRAY_SIZE, write_generic_adapter
+from diac.document import Document, DTP, ADP
+from diac.sinks import DirectorySink
+from diac.types import stream_type_of, write_complex_datatype_struct, write_vector_datatype_struct
+from radio.block import Block
+
+
+class TypeRegistry:
+    """
+    Collects the stream types used by a flowgraph and writes each data type and adapter type once.
+
+    The COMPLEX data type is always written, function block parameters may use it as well.
+    """
+
+    def __init__(self):
+        self.stream_types = set()
+        self.written = 0
+        self.unchanged = 0
+        self.written_paths = []
+
+    def register(self, radio_block: Block, ports=None):
+        """
+        :param ports: The (socket, plug) StreamTypes of the block from a BufferPlan, its unsized stream type if not
+                      given.
+        """
+        if ports is not None:
+            self.stream_types.update(port for port in ports if port is not None)
+        # Only blocks with ports use an adapter
+        elif radio_block.has_inputs or radio_block.has_outputs:
+            self.stream_types.add(stream_type_of(radio_block))
+
+    def update(self, stream_types):
+        self.stream_types.update(stream_types)
+
+    def documents(self):
+        """Yield a Document for every data type and adapter type, each exactly once."""
+        yield Document(DTP, "COMPLEX.dtp", write_complex_datatype_struct)
+        # Sized adapters of one stream share the data type of its items
+        vector_types = {stream_type.name: stream_type for stream_type in sorted(self.stream_types)
+                        if stream_type.is_vector}
+        for stream_type in vector_types.values():
+            yield Document(DTP, stream_type.name + ".dtp",
+                           lambda stream, t=stream_type: write_vector_datatype_struct(stream, t))
+        for stream_type in sorted(self.stream_types):
+            yield Document(ADP, stream_type.adapter_name + ".adp",
+                           lambda stream, t=stream_type: write_generic_adapter(
+                               stream, t.name, t.frame_size or MAX_ARRAY_SIZE, t.adapter_name))
+
+    def write(self, types_dir, known=None):
+        """
+        Write all types into the directory, files with unchanged content are left alone.
+
+        :param types_dir: The types output directory.
+        :param known: A set of paths this process already wrote, they are neither generated nor compared again.
+                      Paths written or found unchanged are added to it.
+        """
+        sink = DirectorySink(types=types_dir, known_types=known)
+        for document in self.documents():
+            sink.write(document)
+        self.record(sink)
+        self.written_paths.extend(sink.written_paths)
+
+    def record(self, sink):
+        """Add the type counts of a DirectorySink the documents were written to."""
+        self.written += sink.types_written
+        self.unchanged += sink.types_unchanged
+
+    def summary(self):
+        names = ", ".join(sorted({stream_type.name for stream_type in self.stream_types})) or "none"
+        return f"stream types {names}; {self.written} written, {self.unchanged} unchanged"
@@ -1,8 +1,120 @@
 # This file holds the type convertion from GNU Radio to IEC 61499 and type generation for IEC 61499 data types.
-from datetime import datetime
-from xml.etree.ElementTree import SubElement, Element, tostring
+import re
+from functools import lru_cache
+from io import StringIO
 
-from diac.function_block import MetaData
+from diac.function_block import MetaData, generation_date
+from diac.xml_writer import XMLWriter
+
+# GNU Radio stream item types and the IEC 61499 type of one item
+GNU_RADIO_STREAM_TYPES = {
+    "complex": "COMPLEX",
+    "float": "REAL",
+    "int": "DINT",
+    "short": "INT",
+    "byte": "SINT",
+}
+DEFAULT_STREAM_TYPE = "REAL"
+
+
+class StreamType:
+    """
+    The data carried on a stream, an IEC 61499 item type and the vector length of the stream.
+
+    :param frame_size: The number of items the adapter carries per event, None for the fixed MAX_ARRAY_SIZE.
+    """
+
+    def __init__(self, item_type, vlen=1, frame_size=None):
+        self.item_type = item_type
+        self.vlen = vlen
+        self.frame_size = frame_size
+
+    @property
+    def name(self):
+        return self.item_type if self.vlen == 1 else f"{self.item_type}_V{self.vlen}"
+
+    @property
+    def adapter_name(self):
+        if self.frame_size is None:
+            return "GenericAdapter_" + self.name
+        return f"GenericAdapter_{self.name}_F{self.frame_size}"
+
+    @property
+    def is_vector(self):
+        return self.vlen > 1
+
+    def __eq__(self, other):
+        return isinstance(other, StreamType) and self._key() == other._key()
+
+    def __lt__(self, other):
+        return self._key() < other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def _key(self):
+        return self.item_type, self.vlen, self.frame_size or 0
+
+    def __str__(self):
+        if self.frame_size is None:
+            return f'StreamType({self.name})'
+        return f'StreamType({self.name}, {self.frame_size})'
+
+    def __repr__(self):
+        return str(self)
+
+
+def stream_type_of(radio_block):
+    """Determine the stream type of a block from its type and vlen parameters."""
+    item_type = GNU_RADIO_STREAM_TYPES.get(radio_block.type, DEFAULT_STREAM_TYPE)
+    vlen = str(radio_block.parameters.get("vlen", "1"))
+    return StreamType(item_type, int(vlen) if vlen.isdigit() and int(vlen) > 0 else 1)
+
+
+# Literals Python's float() accepts, matched without raising and catching ValueError
+_DIGIT_PART = r"\d(?:_?\d)*"
+_FLOAT_LITERAL = re.compile(
+    rf"\s*[+-]?(?:(?:{_DIGIT_PART}(?:\.(?:{_DIGIT_PART})?)?|\.{_DIGIT_PART})(?:[eE][+-]?{_DIGIT_PART})?"
+    r"|inf(?:inity)?|nan)\s*",
+    re.IGNORECASE)
+CLASSIFY_CACHE_SIZE = 4096
+# Types whose values are written as quoted strings into the function block network
+QUOTED_TYPES = {"STRING", "COMPLEX"}
+
+
+@lru_cache(maxsize=CLASSIFY_CACHE_SIZE)
+def _classify_literal(value: str):
+    if value.isdecimal():
+        return ("DINT" if int(value) > 32768 else "INT"), value
+    if _FLOAT_LITERAL.fullmatch(value):
+        return "REAL", float(value)
+    if value == "True" or value == "False":
+        return "BOOL", value
+    if value == "COMPLEX":
+        return "COMPLEX", value
+    return "STRING", value  # Default to STRING for other types
+
+
+def classify_value(value):
+    """
+    Determine the IEC 61499 data type of a parameter value and the value converted to that type.
+
+    String literals recur across blocks and flowgraphs, their classification is memoized.
+
+    :return: A tuple of the IEC 61499 type name and the converted value.
+    """
+    if isinstance(value, int):
+        return ("DINT" if value > 32768 else "INT"), value
+    if isinstance(value, float):
+        return "REAL", value
+    return _classify_literal(str(value))
+
+
+def parameter_literal(value, iec_type=None):
+    """Format a parameter value for the function block network, strings are enquoted with ''."""
+    if iec_type is None:
+        iec_type = classify_value(value)[0]
+    return f"'{value}'" if iec_type in QUOTED_TYPES else str(value)
 
 
 class IEC61499Converter:
@@ -11,31 +123,26 @@ class IEC61499Converter:
 
     def determine_type(self, value):
         """Determine the IEC 61499 data type based on the value."""
-        if isinstance(value, int) or value.isdigit():
-            if(int(value) > 32768):
-                return "DINT"
-            else:
-                return "INT"
-        try:
-            float(value)
-            return "REAL"
-        except ValueError:
-            pass
-        if value == "True" or value == "False":
-            return "BOOL"
-        if value == "COMPLEX":
-            return "COMPLEX"
-
-        return "STRING"  # Default to STRING for other types
+        return classify_value(value)[0]
 
     def convert(self):
         """Convert the dictionary to IEC 61499 datatype format."""
         converted_data = []
         for key, value in self.data.items():
-            iec_type = self.determine_type(value)
-            converted_data.append([key, float(value) if iec_type == "REAL" else value, iec_type])
+            iec_type, converted = classify_value(value)
+            converted_data.append([key, converted, iec_type])
         return converted_data
 
+    @staticmethod
+    def convert_many(blocks):
+        """
+        Convert the parameters of many blocks at once.
+
+        :param blocks: A list of Block objects.
+        :return: A list with the converted parameters of each block, in the order of the blocks.
+        """
+        return [IEC61499Converter(block.parameters).convert() for block in blocks]
+
 
 class StructuredType:
     def __init__(self):
@@ -44,28 +151,48 @@ class StructuredType:
     def add_variable(self, name, var_type):
         self.variables.append((name, var_type))
 
-    def to_xml(self, parent):
-        structured_type_elem = SubElement(parent, "StructuredType")
-        for name, var_type in self.variables:
-            SubElement(structured_type_elem, "VarDeclaration", Name=name, Type=var_type)
-        return structured_type_elem
+    def to_xml(self, writer: XMLWriter):
+        with writer.tag("StructuredType"):
+            for name, var_type in self.variables:
+                writer.element("VarDeclaration", Name=name, Type=var_type)
+
+
+# Write a complex data type using a IEC 61499 struct into a text stream
+def write_complex_datatype_struct(stream):
+    writer = XMLWriter(stream)
+    writer.declaration()
+    with writer.tag("DataType", Name="COMPLEX", Comment="Complex data type for GNU Radio"):
+        # MetaData Example
+        metadata = MetaData(standard="61499-2", version="1.0", author="radio2diac",
+                            date=generation_date(),
+                            package_name="gnu_radio")
+        metadata.to_xml(writer)
+
+        # StructuredType Example
+        structured_type = StructuredType()
+        structured_type.add_variable("Re", "REAL")
+        structured_type.add_variable("Im", "REAL")
+        structured_type.to_xml(writer)
+
+
+# Write a vector data type, a IEC 61499 struct holding one array of stream items, into a text stream
+def write_vector_datatype_struct(stream, stream_type: StreamType):
+    writer = XMLWriter(stream)
+    writer.declaration()
+    item_type = "gnu_radio::COMPLEX" if stream_type.item_type == "COMPLEX" else stream_type.item_type
+    with writer.tag("DataType", Name=stream_type.name,
+                    Comment=f"Vector of {stream_type.vlen} {stream_type.item_type} items for GNU Radio"):
+        metadata = MetaData(standard="61499-2", version="1.0", author="radio2diac",
+                            date=generation_date(),
+                            package_name="gnu_radio")
+        metadata.to_xml(writer)
+
+        with writer.tag("StructuredType"):
+            writer.element("VarDeclaration", Name="Items", Type=item_type, ArraySize=str(stream_type.vlen))
 
 
 # Generate a complex data type using a IEC 61499 struct
 def generate_complex_datatype_struct():
-    struct_elem = Element("DataType", Name="COMPLEX", Comment="Complex data type for GNU Radio")
-
-    # MetaData Example
-    metadata = MetaData(standard="61499-2", version="1.0", author="radio2diac",
-                        date=datetime.now().strftime("%Y-%m-%d"),
-                        package_name="gnu_radio")
-    metadata.to_xml(struct_elem)
-
-    # StructuredType Example
-    structured_type = StructuredType()
-    structured_type.add_variable("Re", "REAL")
-    structured_type.add_variable("Im", "REAL")
-    structured_type.to_xml(struct_elem)
-
-    xml = tostring(struct_elem, encoding="utf8", method="xml").decode().replace("utf8", "utf-8")
-    return xml
+    stream = StringIO()
+    write_complex_datatype_struct(stream)
+    return stream.getvalue()
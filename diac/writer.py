@@ -1,18 +1,62 @@
 # Write the python class into an XML format file compatible with the 4diac IDE.
+import os
+import re
 import xml.etree.ElementTree as ET
-from datetime import datetime
+from contextlib import contextmanager
+from io import StringIO
 
-from diac.adapter import AdapterType, generate_generic_adapter
-from diac.function_block import InterfaceList, Event, VarDeclaration, FunctionBlock, MetaData, Plug, AdapterDeclaration
-from diac.fb_network import FunctionBlockNetwork
-from diac.types import generate_complex_datatype_struct, IEC61499Converter
+from diac.adapter import AdapterType, write_generic_adapter
+from diac.function_block import (InterfaceList, Event, VarDeclaration, FunctionBlock, MetaData, Plug,
+                                 AdapterDeclaration, generation_date)
+from diac.fb_network import FunctionBlockNetwork, fb_instance
+from diac.layout import layered_layout
+from diac.markup import ATTRIBUTES, declared_encoding
+from diac.partition import generate_partitioned_fbn
+from diac.types import write_complex_datatype_struct, IEC61499Converter, stream_type_of
+from diac.xml_writer import XMLWriter
 from radio.block import Block
+from radio.flowgraph import FlowGraph
+
+@contextmanager
+def open_for_write(file_path, mode='w'):
+    # Write to a temporary file and move it into place, so parallel conversions never see a partial file
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as file:
+            yield file
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 
 def write_to_file(file_path, content):
-    with open(file_path, 'w+') as file:
+    with open_for_write(file_path) as file:
         file.write(content)
 
 
+# The generation date in the meta data changes every day without changing the type itself
+_GENERATION_DATE = re.compile(r' Date="[^"]*"')
+
+
+def write_if_changed(file_path, content):
+    """
+    Write the content unless the file already holds it, apart from the generation date.
+
+    :return: True if the file was written.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            existing = file.read()
+    except (FileNotFoundError, UnicodeDecodeError):
+        existing = None
+    if existing is not None and _GENERATION_DATE.sub('', existing) == _GENERATION_DATE.sub('', content):
+        return False
+    write_to_file(file_path, content)
+    return True
+
+
 def check_file(file_path):
     try:
         with open(file_path, 'r'):
@@ -21,26 +65,34 @@ def check_file(file_path):
         return False
 
 def generate_complex_type(filepath):
-    complex_struct = generate_complex_datatype_struct()
-    write_to_file(filepath + '/COMPLEX.dtp', complex_struct)
+    with open_for_write(filepath + '/COMPLEX.dtp') as file:
+        write_complex_datatype_struct(file)
 
 
 def generate_adapters(filepath, complex_or_real):
-    adapter = generate_generic_adapter(complex_or_real)
-    write_to_file(filepath + "/GenericAdapter_" + complex_or_real + ".adp", adapter)
+    with open_for_write(filepath + "/GenericAdapter_" + complex_or_real + ".adp") as file:
+        write_generic_adapter(file, complex_or_real)
 
 
 def create_meta_data():
-    return MetaData(standard="61499-2", version="1.0", author="radio2diac", date=datetime.now().strftime("%Y-%m-%d"),
+    return MetaData(standard="61499-2", version="1.0", author="radio2diac", date=generation_date(),
                     package_name="gnu_radio")
 
 
-def create_function_block(radio_block: Block):
+def create_function_block(radio_block: Block, name=None, converted=None, ports=None, rule=None):
     meta_data = create_meta_data()
-    complex_or_real = "COMPLEX" if radio_block.type == "complex" else "Real"
+    # A rule of the rules file may rename and omit parameters of the generated type
+    if rule is not None:
+        if converted is None:
+            converted = IEC61499Converter(radio_block.parameters).convert()
+        converted = rule.apply(converted)
+    # Sized ports from a BufferPlan may use different adapters for the socket and the plug
+    socket, plug = ports or (None, None)
+    stream_type = stream_type_of(radio_block)
     interface_example = create_interface(radio_block.parameters, radio_block.has_inputs, radio_block.has_outputs,
-                                         complex_or_real)
-    fb = FunctionBlock(name=str(radio_block.id).upper(), interface_list=interface_example, meta_data=meta_data)
+                                         (socket or stream_type).adapter_name, converted,
+                                         (plug or stream_type).adapter_name)
+    fb = FunctionBlock(name=name or str(radio_block.id).upper(), interface_list=interface_example, meta_data=meta_data)
 
     # Bind the variables to the events
     for var in interface_example.input_vars:
@@ -54,12 +106,14 @@ def create_function_block(radio_block: Block):
     return fb
 
 
-def create_interface(parameters: dict[str, str], is_input: bool, is_output: bool, complex_or_real: str):
+def create_interface(parameters: dict[str, str], is_input: bool, is_output: bool, adapter_name: str,
+                     converted=None, plug_adapter_name=None):
     interface_list = InterfaceList()
 
-    # Convert the parameters to IEC61499 data types
-    converter = IEC61499Converter(parameters)
-    parameters = converter.convert()
+    # Convert the parameters to IEC61499 data types, unless they were converted in a batch already
+    if converted is None:
+        converted = IEC61499Converter(parameters).convert()
+    parameters = converted
 
     # Create InputVars
     for parameter in parameters:
@@ -69,39 +123,120 @@ def create_interface(parameters: dict[str, str], is_input: bool, is_output: bool
 
     # Decide if socket or plug is needed
     if is_input > 0:
-        socket = AdapterDeclaration(name="DataIn", type_name="gnu_radio::GenericAdapter_" + complex_or_real,
+        socket = AdapterDeclaration(name="DataIn", type_name="gnu_radio::" + adapter_name,
                                     comment="Socket for Adapter")
         interface_list.add_socket(socket)
     if is_output > 0:
-        plug = AdapterDeclaration(name="DataOut", type_name="gnu_radio::GenericAdapter_" + complex_or_real, comment="Plug for Adapter")
+        plug = AdapterDeclaration(name="DataOut", type_name="gnu_radio::" + (plug_adapter_name or adapter_name),
+                                  comment="Plug for Adapter")
         interface_list.add_plug(plug)
 
     return interface_list
 
 
-def generate_fb_xml(parameters):
-    fb = create_function_block(parameters)
-    fb_xml = fb.to_xml()
-    xml = ET.tostring(fb_xml, encoding='utf8', method='xml').decode()
-    # Search for utf8 and replace it with utf-8 due to how Eclipse 4diac reads the data
-    xml = xml.replace("utf8", "utf-8")
-    return xml, fb.name
+def write_fb_xml(stream, parameters, name=None, converted=None, ports=None, rule=None):
+    fb = create_function_block(parameters, name, converted, ports, rule)
+    writer = XMLWriter(stream)
+    # Eclipse 4diac expects the encoding to be spelled utf-8
+    writer.declaration()
+    fb.to_xml(writer)
+    return fb.name
+
+
+def generate_fb_xml(parameters, name=None, converted=None, ports=None):
+    stream = StringIO()
+    fb_name = write_fb_xml(stream, parameters, name, converted, ports)
+    return stream.getvalue(), fb_name
+
 
+def generate_fbn(radio_blocks: list[Block], function_blocks: list[str], converted=None, layout=True,
+                 partition_size=None, workers=None, ports=None, rules=None):
+    if converted is None:
+        converted = IEC61499Converter.convert_many(radio_blocks)
+    if partition_size is not None and len(radio_blocks) > partition_size:
+        # Large networks are split into nested SubApps of at most partition_size FBs and SubApps each
+        graph = radio_blocks if isinstance(radio_blocks, FlowGraph) else FlowGraph(radio_blocks)
+        return generate_partitioned_fbn(graph, function_blocks, converted, partition_size, workers, layout, ports,
+                                        rules)
 
-def generate_fbn(radio_blocks: list[Block], function_blocks: list[FunctionBlock]):
     network = FunctionBlockNetwork()
+    positions = [None] * len(radio_blocks)
+    if layout:
+        graph = radio_blocks if isinstance(radio_blocks, FlowGraph) else FlowGraph(radio_blocks)
+        positions = layered_layout(graph)
+
+    # function_blocks holds the Function Block type name of each radio block, rules the Rule matching it or None
+    rules = rules or [None] * len(radio_blocks)
+    for block, fb, block_converted, position, rule in zip(radio_blocks, function_blocks, converted, positions, rules):
+        fb_type, parameters = fb_instance(block, fb, block_converted, rule)
+        network.add_function_block(block.name, fb_type, block.connections, parameters, position)
+    stream = StringIO()
+    network.to_xml(XMLWriter(stream))
+    return stream.getvalue()
+
+
+# Markup that matters when looking for the <SubAppNetwork> span, comments and CDATA may hide look-alike tags
+_SUBAPPNETWORK_MARKUP = re.compile(
+    rb"<!--.*?-->|<!\[CDATA\[.*?\]\]>"
+    rb"|(?P<empty><SubAppNetwork(?=[\s/])" + ATTRIBUTES + rb"/>)"
+    rb"|(?P<start><SubAppNetwork(?=[\s>])" + ATTRIBUTES + rb">)"
+    rb"|(?P<end></SubAppNetwork\s*>)",
+    re.DOTALL)
+
+
+def find_subappnetwork_span(data):
+    """
+    Locate the first <SubAppNetwork> element of a project file, including nested SubAppNetworks of SubApps.
+
+    :param data: The raw bytes of the project file.
+    :return: The start and end byte offsets of the element.
+    """
+    start = None
+    depth = 0
+    for match in _SUBAPPNETWORK_MARKUP.finditer(data):
+        if match.group("empty"):
+            if start is None:
+                return match.start(), match.end()
+        elif match.group("start"):
+            if start is None:
+                start = match.start()
+            depth += 1
+        elif match.group("end") and start is not None:
+            depth -= 1
+            if depth == 0:
+                return start, match.end()
+    raise ValueError("No <SubAppNetwork> element found in the file.")
+
+
+def splice_subappnetwork(data, new_subappnetwork_xml):
+    """
+    Replace the <SubAppNetwork> span of a project held in memory.
+
+    :param data: The raw bytes of the project file.
+    :return: The parts of the new project, write them out in order or join them.
+    """
+    start, end = find_subappnetwork_span(data)
+    encoding = declared_encoding(data)
+
+    view = memoryview(data)
+    return view[:start], new_subappnetwork_xml.encode(encoding, errors="xmlcharrefreplace"), view[end:]
+
+
+def splice_subappnetwork_in_file(file_path, new_subappnetwork_xml):
+    """Replace the <SubAppNetwork> span of the file in place, every other byte of the project stays untouched."""
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    parts = splice_subappnetwork(data, new_subappnetwork_xml)
+    with open_for_write(file_path, 'wb') as file:
+        for part in parts:
+            file.write(part)
 
-    # Get the Function Block Name
-    for block in radio_blocks:
-        for fb in function_blocks:
-            if block.id.upper() == fb:
-                network.add_function_block(block.name, "gnu_radio::" + str(fb), block.connections, block.parameters)
-    fbn_xml = network.to_xml()
-    return fbn_xml
 
+def replace_subappnetwork_in_file(file_path, new_subappnetwork_xml, splice=True):
+    if splice:
+        return splice_subappnetwork_in_file(file_path, new_subappnetwork_xml)
 
-def replace_subappnetwork_in_file(file_path, new_subappnetwork_xml):
-    # Parse the existing XML file
+    # Parse the existing XML file and write the whole tree back
     tree = ET.ElementTree()
     tree.parse(file_path)
     root = tree.getroot()
@@ -122,6 +257,5 @@ def replace_subappnetwork_in_file(file_path, new_subappnetwork_xml):
 
     if not find_and_replace_subappnetwork(root):
         raise ValueError("No <SubAppNetwork> element found in the file.")
-    xml = ET.tostring(root, encoding="utf8", method="xml").decode()
-    xml = xml.replace("utf8", "utf-8")
-    write_to_file(file_path, xml)
+    with open_for_write(file_path, 'wb') as file:
+        tree.write(file, encoding="utf-8", xml_declaration=True)
@@ -0,0 +1,73 @@
+# Streaming XML writer producing the same markup as xml.etree.ElementTree, without building a tree first.
+from contextlib import contextmanager
+
+XML_DECLARATION = "<?xml version='1.0' encoding='utf-8'?>\n"
+
+
+def escape_text(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def escape_attribute(value):
+    value = escape_text(value).replace("\"", "&quot;")
+    return value.replace("\r", "&#13;").replace("\n", "&#10;").replace("\t", "&#09;")
+
+
+class XMLWriter:
+    """
+    Writes elements straight into a text stream.
+
+    Like ElementTree, an element without text or children is closed in short form, ``<Tag Name="value" />``.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.open_tags = []
+        # True while the start tag of the innermost element still misses its closing bracket
+        self.pending = False
+
+    def declaration(self):
+        self.stream.write(XML_DECLARATION)
+
+    def _close_pending(self):
+        if self.pending:
+            self.stream.write(">")
+            self.pending = False
+
+    def start(self, tag, **attributes):
+        self._close_pending()
+        write = self.stream.write
+        write("<" + tag)
+        for name, value in attributes.items():
+            write(f' {name}="{escape_attribute(str(value))}"')
+        self.open_tags.append(tag)
+        self.pending = True
+
+    def text(self, text):
+        if text:
+            self._close_pending()
+            self.stream.write(escape_text(text))
+
+    def end(self):
+        tag = self.open_tags.pop()
+        if self.pending:
+            self.stream.write(" />")
+            self.pending = False
+        else:
+            self.stream.write(f"</{tag}>")
+
+    def raw(self, markup):
+        """Insert already generated markup as it is."""
+        self._close_pending()
+        self.stream.write(markup)
+
+    def element(self, tag, text=None, **attributes):
+        self.start(tag, **attributes)
+        self.text(text)
+        self.end()
+
+    @contextmanager
+    def tag(self, tag, **attributes):
+        self.start(tag, **attributes)
+        yield self
+        self.end()
@@ -1,42 +1,99 @@
+import argparse
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import yaml
 
-def extract_ids_and_categories_from_yaml(directory):
+from radio.parser import SafeLoader
+
+CORE_DIRECTORY = "/usr/share/gnuradio/grc/blocks"
+OOT_DIRECTORIES = ["/usr/local/share/gnuradio/grc/blocks"]
+
+
+def default_directories():
+    """The core block directory, the usual OOT prefix and the directories listed in GRC_BLOCKS_PATH."""
+    directories = [CORE_DIRECTORY] + OOT_DIRECTORIES
+    directories += [path for path in os.environ.get("GRC_BLOCKS_PATH", "").split(os.pathsep) if path]
+    return directories
+
+
+def find_yaml_files(directories):
+    """The .yml files of the directories and their subdirectories, like BlockIndex.refresh finds them."""
+    files = []
+    for directory in directories:
+        for root, _, filenames in os.walk(directory):
+            for filename in sorted(filenames):
+                if filename.endswith('.yml'):
+                    files.append(os.path.join(root, filename))
+    return files
+
+
+def scan_files(filepaths):
     """
-    Extracts `id` and `category` from YAML files in the specified directory.
+    Extract `id` and `category` from a chunk of YAML files.
 
-    :param directory: Path to the directory containing YAML files.
-    :return: A tuple containing two lists: unique ids and unique categories.
+    :return: A tuple of the found (id, category) pairs and the (file, error) pairs of files that failed.
     """
-    ids = set()
-    categories = set()
+    found = []
+    errors = []
+    for filepath in filepaths:
+        try:
+            with open(filepath, 'r') as file:
+                data = yaml.load(file, Loader=SafeLoader)
+            if isinstance(data, dict):
+                found.append((data.get('id', None), data.get('category', None)))
+        except Exception as e:
+            errors.append((filepath, str(e).splitlines()[0] if str(e) else type(e).__name__))
+    return found, errors
 
-    for filename in os.listdir(directory):
-        filepath = os.path.join(directory, filename)
 
-        if os.path.isfile(filepath) and filepath.endswith('.yml'):
-            try:
-                with open(filepath, 'r') as file:
-                    data = yaml.safe_load(file)
+def extract_ids_and_categories_from_yaml(directories, workers=None, chunk_size=64, errors=None):
+    """
+    Extracts `id` and `category` from YAML files in the specified directories.
 
-                    # Check for `id` and `category` fields
-                    block_id = data.get('id', None)
-                    category = data.get('category', None)
+    The files are split into chunks that are loaded in a process pool, results are merged as chunks complete.
 
-                    if block_id:
-                        ids.add(block_id)
-                    if category:
-                        categories.add(category)
-            except Exception as e:
-                print(f"Error processing file {filename}: {e}")
+    :param directories: Path to a directory, or a list of directories, containing YAML files.
+    :param workers: Number of worker processes, defaults to the number of CPUs.
+    :param chunk_size: Number of files per chunk handed to a worker.
+    :param errors: A list the (file, error) pairs of files that could not be processed are appended to.
+    :return: A tuple containing two lists: unique ids and unique categories.
+    """
+    if isinstance(directories, str):
+        directories = [directories]
+    ids = set()
+    categories = set()
+
+    files = find_yaml_files(directories)
+    chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for found, chunk_errors in executor.map(scan_files, chunks):
+            for block_id, category in found:
+                # Check for `id` and `category` fields
+                if block_id:
+                    ids.add(block_id)
+                if category:
+                    categories.add(category)
+            if errors is not None:
+                errors.extend(chunk_errors)
 
     return sorted(ids), sorted(categories)
 
+
 if __name__ == "__main__":
-    yaml_directory = "/usr/share/gnuradio/grc/blocks"
+    args = argparse.ArgumentParser(description='List the block ids and categories of the GRC block library')
+    args.add_argument('directories', nargs='*', help='Block YAML directories, defaults to the core and OOT prefixes')
+    args.add_argument('--jobs', type=int, help='Number of worker processes')
+    args = args.parse_args()
+    yaml_directories = [directory for directory in args.directories or default_directories()
+                        if os.path.exists(directory)]
 
-    if os.path.exists(yaml_directory):
-        ids, categories = extract_ids_and_categories_from_yaml(yaml_directory)
+    if yaml_directories:
+        start = time.perf_counter()
+        errors = []
+        ids, categories = extract_ids_and_categories_from_yaml(yaml_directories, workers=args.jobs, errors=errors)
+        seconds = time.perf_counter() - start
 
         print("Unique IDs:")
         for block_id in ids:
@@ -45,5 +102,10 @@ if __name__ == "__main__":
         print("\nUnique Categories:")
         for category in categories:
             print(category)
+
+        print(f"\nScanned {', '.join(yaml_directories)} in {seconds:.3f}s: "
+              f"{len(ids)} ids, {len(categories)} categories, {len(errors)} errors")
+        for filepath, error in errors:
+            print(f"Error processing file {filepath}: {error}")
     else:
-        print(f"Directory does not exist: {yaml_directory}")
+        print(f"Directory does not exist: {', '.join(args.directories or default_directories())}")
@@ -1,63 +1,512 @@
 import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-from diac.writer import generate_fb_xml, write_to_file, generate_adapters, generate_fbn, replace_subappnetwork_in_file, \
-    generate_complex_type
+import yaml
+
+from diac.adapter import MAX_ARRAY_SIZE
+from diac.buffers import BUFFER_PROFILES
+from diac.cache import BlockCache
+from diac.conversion import NETWORK_FILE_NAME, convert
+from diac.document import NetworkDocument
+from diac.fb_registry import FunctionBlockRegistry
+from diac.mapping import Resource
+from diac.project import project_resources, scan_elements
+from diac.rules import load_rules
+from diac.sinks import ArchiveSink, DirectorySink, archive_format
+from diac.type_registry import TypeRegistry
+from radio.block_index import BlockIndex, DEFAULT_INDEX_PATH
 from radio.parser import Parser
-from radio.utils import print_blocks, print_connections, remove_file
+from radio.optimize import PASSES
+from radio.profiler import NULL_PROFILER, Profiler
+from radio.utils import print_connections
+from radio.watcher import watch_file
+
+
+class ConversionCaches:
+    """
+    State kept warm between conversions of a long-lived process.
+
+    Parsed flowgraphs are reused while the file's modification time and size stay the same, conversions get them
+    unchanged. Function block caches stay loaded per blocks directory until another process changes them, and
+    types are generated once per types directory.
+    """
+
+    def __init__(self):
+        self.flowgraphs = {}
+        self.block_caches = {}
+        self.written_types = set()
+        self.parse_hits = 0
+
+    def parse(self, radio):
+        stat = os.stat(radio)
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self.flowgraphs.get(radio)
+        if cached is not None and cached[0] == key:
+            self.parse_hits += 1
+            return cached[1]
+        parsed = Parser(radio).parse()
+        self.flowgraphs[radio] = (key, parsed)
+        return parsed
+
+    def block_cache(self, blocks, force):
+        cache = self.block_caches.get(blocks)
+        if cache is None:
+            cache = self.block_caches[blocks] = BlockCache(blocks).load()
+        elif not cache.is_current():
+            # A conversion outside of this process wrote into the blocks directory
+            cache.load()
+        cache.force = force
+        cache.reset_counts()
+        return cache
+
+
+def convert_flowgraph(radio, diac, blocks, types=None, verbose=True, force=False, previous_network=None,
+                      profiler=NULL_PROFILER, block_index=None, caches=None, archive=None, partition_size=None,
+                      workers=None, resources=None, buffer_profile=None, optimizations=None, fold=False,
+                      rules=None, fb_suffixes=None):
+    """
+    Convert one GNU Radio project file, write the function block types and splice the network into the 4diac
+    project.
+
+    :param radio: Path to the GNU Radio project file.
+    :param diac: Path to the Eclipse 4diac project file.
+    :param blocks: Output directory for the function block types, None to leave them to the caller.
+    :param types: Output directory for data types and adapters, None to leave them to the caller.
+    :param verbose: Print the progress of each step.
+    :param force: Regenerate every function block even if the cache says it is unchanged.
+    :param previous_network: The network written by the previous conversion, it is not spliced in again.
+    :param profiler: Records the phases and counts of the conversion.
+    :param block_index: A BlockIndex to complete the blocks with their GNU Radio block definitions.
+    :param caches: ConversionCaches kept between conversions, None to start cold.
+    :param archive: Path of a zip or tar archive to write everything into instead, the project file is copied
+                    into it with the network spliced in.
+    :param partition_size: Split the network into nested SubApps of at most this many FBs and SubApps.
+    :param workers: Number of processes generating the SubApps of a partitioned network.
+    :param resources: Map the FBs onto these Resources of the project.
+    :param buffer_profile: Size the adapters after the sample rates of the streams with this profile of
+                           diac.buffers.BUFFER_PROFILES, None for the fixed MAX_ARRAY_SIZE.
+    :param optimizations: The names of the optimization passes of radio.optimize to run, None to run none.
+    :param fold: Fold the parameter expressions into literals first, see radio.expressions.
+    :param rules: A RuleSet mapping blocks onto library FB types, see diac.rules.
+    :param fb_suffixes: The suffixes of the FB type names by digest, decided for a whole batch, see run_batch.
+    :return: A dictionary with the number of blocks, the FunctionBlockRegistry, the adapter data types used, the
+             cache summary, the network and the mapping.
+    """
+    log = print if verbose else lambda *args, **kwargs: None
+
+    log("Reading GNU Radio project file...\n=====================")
+    log(radio + "\n")
+    with profiler.phase("parse"):
+        parsed = caches.parse(radio) if caches is not None else Parser(radio).parse()
+    result = convert(parsed, block_index, profiler=profiler, partition_size=partition_size, workers=workers,
+                     resources=resources, buffer_profile=buffer_profile, optimizations=optimizations,
+                     fold=fold, rules=rules, fb_suffixes=fb_suffixes)
+    if result.folding is not None:
+        log(f"Constant folding: {result.folding.summary()}")
+        for name, parameter, expression, reason in result.folding.unfoldable:
+            log(f"  {name}.{parameter} = {expression}: {reason}")
+    if result.optimization is not None:
+        log(f"Optimized away {result.optimization.total} blocks: {result.optimization.summary()}")
+    if result.rules is not None:
+        log(f"{sum(rule is not None for rule in result.rules)} of {len(result.flowgraph)} blocks matched "
+            f"{len(rules)} rules")
+    if result.definitions_found is not None:
+        log(f"{result.definitions_found} of {len(parsed)} blocks found in the block index")
+    if verbose:
+        print("\nConnections:\n=====================")
+        print_connections(parsed)
+    if result.buffer_plan is not None:
+        log("\nSizing adapter buffers...\n=====================")
+        log(result.buffer_plan.summary())
+    if result.mapping is not None:
+        log("\nMapping onto resources...\n=====================")
+        log(result.mapping.summary())
+        # Shown without --verbose as well, the written networks are missing these connections
+        for warning in result.mapping.warnings():
+            print(warning, file=sys.stderr)
+
+    if archive is not None:
+        log("\nWriting 4diac types, function blocks and project into the archive...\n=====================")
+        sink = result.write(ArchiveSink(archive, project=diac), profiler)
+        profiler.count_file(archive)
+        log(sink.summary())
+        return {"blocks": len(parsed), "fb_types": len(result.fb_registry), "fb_registry": result.fb_registry,
+                "stream_types": result.type_registry.stream_types, "cache": sink.summary(),
+                "network": result.network, "mapping": result.mapping}
+
+    log("\nWriting 4diac types, function blocks and network...\n=====================")
+    cache = caches.block_cache(blocks, force) if caches is not None else None
+    sink = DirectorySink(blocks, types, diac, force=force, cache=cache,
+                         known_types=caches.written_types if caches is not None else None,
+                         previous_network=previous_network)
+    result.write(sink, profiler)
+    for path in sink.written_paths:
+        profiler.count_file(path)
+    result.type_registry.record(sink)
+
+    if types is not None:
+        log(result.type_registry.summary())
+    log(f"{len(result.fb_registry)} function block types for {len(parsed)} blocks")
+    log(f"Function block cache: {sink.summary()}")
+    log("Function block network " + ("spliced into " + diac if sink.network_written else "unchanged"))
+    return {"blocks": len(parsed), "fb_types": len(result.fb_registry), "fb_registry": result.fb_registry,
+            "stream_types": result.type_registry.stream_types, "cache": sink.summary(),
+            "network": result.network, "mapping": result.mapping}
+
+
+def load_resources(paths, diac):
+    """
+    The Resources to map onto, the given ones or all resources of the 4diac project.
+
+    :param paths: ``DEVICE.RESOURCE[:CAPACITY]`` strings, empty for all resources of the project.
+    :param diac: Path to the Eclipse 4diac project file.
+    """
+    with open(diac, 'rb') as file:
+        available = project_resources(scan_elements(file.read()))
+    if not available:
+        raise ValueError(f"{diac} has no resources to map onto")
+    resources = [Resource.parse(path) for path in paths or available]
+    for resource in resources:
+        if resource.path not in available:
+            raise ValueError(f"Resource {resource.path} not found in {diac}, it has {', '.join(available)}")
+    return resources
+
+
+def optimizations_of(optimize):
+    """The optimization passes asked for with --optimize, all of them if it is given without any."""
+    if optimize is None:
+        return None
+    return optimize or list(PASSES)
+
+
+def write_mapping_report(path, mapping):
+    if path and mapping is not None:
+        with open(path, 'w') as file:
+            json.dump(mapping.to_dict(), file, indent=1)
+        print("Mapping report written to " + path)
+
+
+def load_batch(batch, args):
+    """
+    Build the list of conversion jobs for a batch run.
+
+    The batch is either a YAML manifest with optional ``defaults`` and a list of ``flowgraphs``, each entry holding
+    ``radio`` and ``diac`` and optionally ``blocks`` and ``types``, or a glob of GNU Radio project files.
+    For a glob, ``--diac`` is a directory holding one project file per flowgraph named ``<flowgraph name>.sys``.
+
+    :param batch: Path to the manifest or a glob pattern.
+    :param args: The parsed command line arguments, used as defaults.
+    :return: A list of job dictionaries.
+    :raise ValueError: If the batch holds no flowgraphs or a job lacks a path.
+    """
+    defaults = {"blocks": args.blocks, "types": args.types, "force": args.force, "partition": args.partition,
+                "buffer_profile": args.buffer_profile, "optimize": optimizations_of(args.optimize),
+                "fold": args.fold_constants, "rules": args.rules,
+                "block_index": args.block_index if args.grc_blocks else None}
+    jobs = []
+    if batch.endswith(('.yml', '.yaml')) and os.path.isfile(batch):
+        with open(batch, 'r') as file:
+            manifest = yaml.safe_load(file)
+        if not isinstance(manifest, dict):
+            raise ValueError("the manifest is no mapping of defaults and flowgraphs")
+        defaults.update({key: value for key, value in (manifest.get('defaults') or {}).items() if value})
+        for entry in manifest.get('flowgraphs') or ():
+            job = dict(defaults)
+            job.update(entry)
+            jobs.append(job)
+        if not jobs:
+            raise ValueError("the manifest lists no flowgraphs")
+    else:
+        if not args.diac:
+            raise ValueError("a glob of flowgraphs needs --diac, the directory holding <flowgraph name>.sys of each")
+        if not os.path.isdir(args.diac):
+            raise ValueError(f"--diac {args.diac} is not a directory of project files")
+        for radio in sorted(glob.glob(batch)):
+            name = os.path.splitext(os.path.basename(radio))[0]
+            job = dict(defaults)
+            job.update({"radio": radio, "diac": os.path.join(args.diac, name + ".sys")})
+            jobs.append(job)
+        if not jobs:
+            raise ValueError("the glob matches no GNU Radio project files")
+
+    for job in jobs:
+        missing = [key for key in ("radio", "diac", "blocks", "types") if not job.get(key)]
+        if missing:
+            raise ValueError(f"Batch entry {job.get('radio')} is missing {', '.join(missing)}")
+    return jobs
+
+
+def run_batch_job(job, fb_suffixes=None):
+    start = time.perf_counter()
+    block_index = BlockIndex(job["block_index"]) if job.get("block_index") else None
+    # Every worker loads the rules, compiled once and then read from the rules cache
+    rules = load_rules(job["rules"]) if job.get("rules") else None
+    try:
+        # Nothing is written here, the parent names the function block types of all jobs first
+        result = convert_flowgraph(job["radio"], None, None, verbose=False,
+                                   force=job.get("force", False), block_index=block_index,
+                                   partition_size=job.get("partition"),
+                                   buffer_profile=job.get("buffer_profile"),
+                                   optimizations=optimizations_of(job.get("optimize")),
+                                   fold=job.get("fold", False), rules=rules, fb_suffixes=fb_suffixes)
+    finally:
+        if block_index is not None:
+            block_index.close()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_batch(jobs, max_workers=None):
+    """
+    Convert all jobs in a process pool.
+
+    The function block types of all jobs sharing a blocks directory are named together, an id the flowgraphs give
+    different interfaces gets suffixed types, see FunctionBlockRegistry. Jobs whose types were named differently
+    on their own are converted again with the shared names. The function block types are then written once per
+    blocks directory, the shared types once per types directory and the networks into the projects, by this
+    process only, so the workers never race for a file or the function block cache.
+
+    :param jobs: A list of job dictionaries as returned by load_batch.
+    :param max_workers: Number of worker processes, defaults to the number of CPUs.
+    :return: The number of failed jobs.
+    """
+    start = time.perf_counter()
+    results = {}
+    fb_registries = {}
+
+    def failed(index, error):
+        print(f"FAILED {jobs[index]['radio']}: {error}")
+
+    print(f"Converting {len(jobs)} GNU Radio project files...\n=====================")
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_batch_job, job) for job in jobs]
+        for index, future in enumerate(futures):
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                failed(index, e)
+                continue
+            # Types are taken in the order of the jobs, the first job holding a type decides its content
+            fb_registries.setdefault(jobs[index]["blocks"], FunctionBlockRegistry()).update(
+                results[index]["fb_registry"])
+        for fb_registry in fb_registries.values():
+            fb_registry.assign_names()
+
+        reruns = {}
+        for index, result in results.items():
+            fb_suffixes = fb_registries[jobs[index]["blocks"]].suffixes_of(result["fb_registry"])
+            if fb_suffixes is not None:
+                reruns[index] = executor.submit(run_batch_job, jobs[index], fb_suffixes)
+        for index, future in reruns.items():
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                del results[index]
+                failed(index, e)
+
+    for index, result in sorted(results.items()):
+        job = jobs[index]
+        try:
+            sink = DirectorySink(diac=job["diac"])
+            sink.write(NetworkDocument(NETWORK_FILE_NAME, result["network"], result["mapping"]))
+        except Exception as e:
+            del results[index]
+            failed(index, e)
+            continue
+        renamed = " (renamed FB types shared with other files)" if index in reruns else ""
+        print(f"OK     {job['radio']}: {result['blocks']} blocks, {result['fb_types']} FB types "
+              f"in {result['seconds']:.3f}s{renamed}")
+
+    print("\nWriting 4diac function blocks...\n=====================")
+    forced = {job["blocks"] for job in jobs if job.get("force")}
+    for blocks_dir, fb_registry in fb_registries.items():
+        sink = fb_registry.write(blocks_dir, force=blocks_dir in forced)
+        print(f"{blocks_dir}: {len(fb_registry)} function block types (cache: {sink.summary()})")
+
+    print("\nSetting up 4diac types and adapters...\n=====================")
+    type_registries = {}
+    for index, result in results.items():
+        type_registries.setdefault(jobs[index]["types"], TypeRegistry()).update(result["stream_types"])
+    for types_dir, type_registry in type_registries.items():
+        type_registry.write(types_dir)
+        print(f"{types_dir}: {type_registry.summary()}")
+
+    failures = len(jobs) - len(results)
+    print(f"\nConverted {len(results)} of {len(jobs)} files in {time.perf_counter() - start:.3f}s")
+    return failures
+
+
+def run_watch(args, block_index=None, resources=None, rules=None, debounce=0.1):
+    """
+    Convert the GNU Radio project file whenever it is saved, until interrupted.
+
+    Unchanged function blocks, types and networks are not written again. The latency from the save, taken from
+    the file's modification time, until the conversion is written is reported per cycle.
+
+    :param args: The parsed command line arguments.
+    :param block_index: A BlockIndex to complete the blocks with, or None.
+    :param resources: The Resources to map the FBs onto, or None.
+    :param rules: A RuleSet mapping blocks onto library FB types, or None.
+    :param debounce: Seconds without further changes before a save is converted.
+    """
+    watcher = watch_file(args.radio)
+    print(f"Watching {args.radio} with {type(watcher).__name__}, press Ctrl+C to stop\n=====================")
+    previous_network = None
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                result = convert_flowgraph(args.radio, args.diac, args.blocks, args.types, verbose=False,
+                                           force=args.force and previous_network is None,
+                                           previous_network=previous_network, block_index=block_index,
+                                           partition_size=args.partition, workers=args.jobs,
+                                           resources=resources, buffer_profile=args.buffer_profile,
+                                           optimizations=optimizations_of(args.optimize),
+                                           fold=args.fold_constants, rules=rules)
+            except Exception as e:
+                print(f"FAILED {args.radio}: {e}")
+            else:
+                network_state = "unchanged" if result["network"] == previous_network else "written"
+                latency = ""
+                if previous_network is not None:
+                    latency = f", {(time.time() - os.stat(args.radio).st_mtime) * 1000:.1f} ms after save"
+                previous_network = result["network"]
+                print(f"{time.strftime('%H:%M:%S')} {result['blocks']} blocks converted in "
+                      f"{(time.perf_counter() - start) * 1000:.1f} ms{latency} "
+                      f"(cache: {result['cache']}, network {network_state})")
+
+            watcher.wait()
+            # Debounce, editors may write the file several times per save
+            while watcher.wait(debounce):
+                pass
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        watcher.close()
+
 
 def main():
     args = argparse.ArgumentParser(
         description='A command line tool to convert GNU Radio projects to Eclipse 4diac projects')
-    args.add_argument('radio', type=str, help='Path to GNU Radio project file')
+    args.add_argument('radio', nargs='?', type=str, help='Path to GNU Radio project file')
     args.add_argument('--diac', type=str, help='Path to Eclipse 4diac project file')
-    args.add_argument('--fbn', type=str, help='Path to the 4diac function block network output directory')
+    args.add_argument('--fbn', type=str,
+                      help='Unused, the network is spliced into the project without writing it to this directory')
     args.add_argument('--blocks', type=str, help='Path to the 4diac blocks output directory')
     args.add_argument('--types', type=str, help='Path to the 4diac types output directory')
-    args.add_argument('--rules', required=False, type=str, help='Path to the rules file')
+    args.add_argument('--rules', required=False, type=str,
+                      help='Path to a YAML rules file mapping blocks onto 4diac library FB types, renaming and '
+                           'omitting their parameters')
+    args.add_argument('--batch', required=False, type=str,
+                      help='Path to a YAML batch manifest or a glob of GNU Radio project files')
+    args.add_argument('--jobs', required=False, type=int,
+                      help='Number of worker processes in batch mode, or generating the SubApps of --partition')
+    args.add_argument('--partition', required=False, type=int,
+                      help='Split networks with more FBs into nested SubApps of at most this many FBs and SubApps')
+    args.add_argument('--buffer-profile', required=False, choices=sorted(BUFFER_PROFILES),
+                      help='Size the adapter arrays after the sample rate of each stream instead of the fixed '
+                           f'{MAX_ARRAY_SIZE} items: latency, balanced or throughput sized frames')
+    args.add_argument('--optimize', required=False, type=str, nargs='*', choices=list(PASSES), metavar='PASS',
+                      help='Simplify the flowgraph before converting it, with all or the given passes: disabled '
+                           '(drop disabled and bypassed blocks), virtual (join virtual sinks and sources), '
+                           'fuse (merge chains of constant arithmetic blocks)')
+    args.add_argument('--fold-constants', action='store_true',
+                      help='Evaluate parameter expressions that only use constants and variables, like '
+                           'samp_rate/4, and write them as typed literals, before --optimize')
+    args.add_argument('--watch', action='store_true',
+                      help='Keep running and convert the GNU Radio project file again whenever it changes')
+    args.add_argument('--profile', required=False, type=str,
+                      help='Directory to write a Chrome trace and a JSON summary of the conversion phases to')
+    args.add_argument('--cprofile', action='store_true', help='With --profile, also write cProfile statistics')
+    args.add_argument('--grc-blocks', required=False, type=str, nargs='+',
+                      help='GRC block YAML directories to look up the real port types and defaults of blocks in')
+    args.add_argument('--block-index', required=False, type=str, default=DEFAULT_INDEX_PATH,
+                      help='Path of the persistent block definition index used with --grc-blocks')
+    args.add_argument('--archive', required=False, type=str,
+                      help='Write everything into this .zip, .tar or .tar.gz archive instead of the output '
+                           'directories, with a copy of the 4diac project holding the new network')
+    args.add_argument('--map', required=False, type=str, nargs='*', metavar='DEVICE.RESOURCE[:CAPACITY]',
+                      help='Map the FBs onto these resources of the 4diac project, balancing their load, '
+                           'or onto all resources of the project if none are given')
+    args.add_argument('--mapping-report', required=False, type=str,
+                      help='With --map, write the cost model and the assignment of every block as JSON to this file')
+    args.add_argument('--force', action='store_true',
+                      help='Regenerate all function blocks, ignoring the cache of unchanged blocks')
+    arg_parser = args
     args = args.parse_args()
 
-    print("Reading GNU Radio project file...\n=====================")
-    print(args.radio + "\n")
-    parser = Parser(args.radio)
-    parsed = parser.parse()
-    print("\nConnections:\n=====================")
-    print_connections(parsed)
+    block_index = None
+    if args.grc_blocks:
+        block_index = BlockIndex(args.block_index)
+        stats = block_index.refresh(args.grc_blocks)
+        print(f"Block index {args.block_index}: {len(block_index)} blocks, {stats['updated']} files updated, "
+              f"{stats['unchanged']} unchanged, {stats['removed']} removed, {len(stats['errors'])} errors")
 
+    if args.partition is not None and args.partition < 2:
+        arg_parser.error("--partition needs room for at least two FBs or SubApps")
+    if args.batch and args.map is not None:
+        arg_parser.error("--map cannot be combined with --batch")
+    if args.archive:
+        if args.batch or args.watch:
+            arg_parser.error("--archive cannot be combined with --batch or --watch")
+        try:
+            archive_format(args.archive)
+        except ValueError as e:
+            arg_parser.error(str(e))
+    if args.batch:
+        try:
+            jobs = load_batch(args.batch, args)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            arg_parser.error(f"--batch {args.batch}: {e}")
+        failed = run_batch(jobs, args.jobs)
+        sys.exit(1 if failed else 0)
+    if not args.radio:
+        arg_parser.error("the radio argument is required unless --batch is given")
 
-    print("\nSetting up 4diac types and adapters...\n=====================")
-    generate_complex_type(args.types)
-    for block in parsed:
-        if block.type == "complex":
-            generate_adapters(args.types, "COMPLEX")
-        if block.type == "float":
-            generate_adapters(args.types, "REAL")
-
-
-    print("\nGenerating 4diac FB interface definition...\n=====================")
-    function_blocks = []
-    function_blocks_names = []
-    file_names = []
-    for block in parsed:
-        fb, fb_name = generate_fb_xml(block)
-        function_blocks.append(fb)
-        function_blocks_names.append(fb_name)
-        file_names.append(args.blocks + "/fb_" + block.id + "_gen" + ".fbt")
-
-    print("\nWriting Function block to file...\n=====================")
-    for fb, file_name in zip(function_blocks, file_names):
-        write_to_file(file_name, fb)
-
-    print("\nGenerating 4diac FB network...\n=====================")
-    fbn_file_content = generate_fbn(parsed, function_blocks_names)
-
-    print("\nWriting Function block network to file...\n=====================")
-    fbn_file = args.fbn + "/fbn_gen.sys"
-    write_to_file(fbn_file, fbn_file_content)
-
-    print("\nReplacing the function block network in the 4diac project file...\n=====================")
-    replace_subappnetwork_in_file(args.diac, fbn_file_content)
-
-    remove_file(fbn_file)
+    resources = None
+    if args.map is not None:
+        try:
+            resources = load_resources(args.map, args.diac)
+        except (OSError, ValueError) as e:
+            arg_parser.error(str(e))
+
+    rules = None
+    if args.rules:
+        try:
+            rules = load_rules(args.rules)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            arg_parser.error(f"--rules {args.rules}: {e}")
+
+    if args.watch:
+        run_watch(args, block_index, resources, rules)
+        return
+    options = {"force": args.force, "block_index": block_index, "archive": args.archive,
+               "partition_size": args.partition, "workers": args.jobs, "resources": resources,
+               "buffer_profile": args.buffer_profile, "optimizations": optimizations_of(args.optimize),
+               "fold": args.fold_constants, "rules": rules}
+    if not args.profile:
+        result = convert_flowgraph(args.radio, args.diac, args.blocks, args.types, **options)
+        write_mapping_report(args.mapping_report, result["mapping"])
+        return
+
+    profiler = Profiler(cprofile=args.cprofile)
+    profiler.start()
+    try:
+        with profiler.phase("convert"):
+            result = convert_flowgraph(args.radio, args.diac, args.blocks, args.types, profiler=profiler, **options)
+    finally:
+        profiler.stop()
+    write_mapping_report(args.mapping_report, result["mapping"])
+    print("\nProfile:\n=====================")
+    for phase, seconds in profiler.summary()["phases"].items():
+        print(f"{phase}: {seconds * 1000:.1f} ms")
+    print(", ".join(f"{name} {count}" for name, count in profiler.counts.items()))
+    print("Written to " + ", ".join(profiler.write(args.profile)))
 
 if __name__ == '__main__':
     main()
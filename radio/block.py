@@ -1,6 +1,9 @@
 # Data structure for a block in GNU Radio
+from radio.flowgraph import FlowGraph
 
 class Block:
+    __slots__ = ('name', 'id', 'connections', 'parameters', 'type', 'has_inputs', 'has_outputs', 'state')
+
     def __init__(self, name, id):
         self.name = name
         self.id = id
@@ -9,6 +12,8 @@ class Block:
         self.type = None
         self.has_inputs = False
         self.has_outputs = False
+        # The GRC state of the block: enabled, disabled or bypassed
+        self.state = "enabled"
 
     def add_connection(self, connection):
         self.connections.append(connection)
@@ -19,6 +24,17 @@ class Block:
     def change_parameter(self, key, value):
         self.parameters[key] = value
 
+    def copy(self):
+        """A copy with its own connections and parameters, to be changed without touching this block."""
+        block = Block(self.name, self.id)
+        block.connections = [Connection(connection.src, connection.dst) for connection in self.connections]
+        block.parameters = dict(self.parameters)
+        block.type = self.type
+        block.has_inputs = self.has_inputs
+        block.has_outputs = self.has_outputs
+        block.state = self.state
+        return block
+
     def __str__(self):
         return f'Block({self.name}, {self.id}, {self.connections}, {self.parameters})'
 
@@ -30,23 +46,19 @@ def analyze_blocks(blocks):
     """
     Analyze blocks to set their input/output attributes based on connections.
 
-    :param blocks: A list of Block objects.
+    :param blocks: A FlowGraph, or a list of Block objects a FlowGraph is built from.
+    :return: The FlowGraph.
     """
-    # Build dictionaries to look up blocks quickly
-    block_dict = {block.name: block for block in blocks}
-
-    # Iterate through all connections to mark blocks with inputs and outputs
-    for block in blocks:
-        for conn in block.connections:
-            # Source of a connection has outputs
-            if conn.src in block_dict:
-                block_dict[conn.src].has_outputs = True
-            # Destination of a connection has inputs
-            if conn.dst in block_dict:
-                block_dict[conn.dst].has_inputs = True
+    graph = blocks if isinstance(blocks, FlowGraph) else FlowGraph(blocks)
+    for block_id, block in enumerate(graph):
+        block.has_inputs = graph.has_inputs(block_id)
+        block.has_outputs = graph.has_outputs(block_id)
+    return graph
 
 
 class Connection:
+    __slots__ = ('src', 'dst')
+
     def __init__(self, src, dst):
         self.src = src
         self.dst = dst
@@ -0,0 +1,225 @@
+# Persistent index of the GNU Radio block definitions of the GRC YAML block library
+import json
+import os
+import re
+import sqlite3
+
+import yaml
+
+from radio.parser import SafeLoader
+
+DEFAULT_BLOCK_DIRECTORY = "/usr/share/gnuradio/grc/blocks"
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "radio2diac", "blocks.sqlite")
+
+# Short GNU Radio dtype names and the stream type names used in flowgraphs
+DTYPE_ALIASES = {
+    "fc32": "complex", "sc16": "complex", "sc8": "complex", "c64": "complex",
+    "f32": "float", "f64": "float", "real": "float",
+    "s32": "int", "s16": "short", "s8": "byte", "u8": "byte",
+}
+# A Mako expression naming a parameter, optionally one of its option attributes, e.g. ${ type.vec }
+_PARAMETER_REFERENCE = re.compile(r"\$\{\s*(\w+)(?:\.(\w+))?\s*\}")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER);
+CREATE TABLE IF NOT EXISTS blocks (id TEXT PRIMARY KEY, path TEXT, category TEXT, definition TEXT);
+CREATE INDEX IF NOT EXISTS blocks_path ON blocks (path);
+"""
+
+
+def _ports(ports):
+    return [{"domain": port.get("domain", "stream"), "dtype": port.get("dtype"), "vlen": port.get("vlen", 1),
+             "optional": bool(port.get("optional", False))}
+            for port in ports or [] if isinstance(port, dict)]
+
+
+def load_block_definition(path):
+    """
+    Read a GRC block YAML file into a definition dictionary.
+
+    :return: The definition, or None if the file does not describe a block.
+    """
+    with open(path, 'r') as file:
+        data = yaml.load(file, Loader=SafeLoader)
+    if not isinstance(data, dict) or not data.get("id"):
+        return None
+    parameters = []
+    for parameter in data.get("parameters") or []:
+        if not isinstance(parameter, dict) or "id" not in parameter:
+            continue
+        entry = {"id": parameter["id"], "dtype": parameter.get("dtype", "raw"), "default": parameter.get("default")}
+        if "options" in parameter:
+            entry["options"] = parameter["options"]
+            entry["option_attributes"] = parameter.get("option_attributes") or {}
+        parameters.append(entry)
+    return {"id": data["id"], "label": data.get("label"), "category": data.get("category"),
+            "parameters": parameters, "inputs": _ports(data.get("inputs")), "outputs": _ports(data.get("outputs"))}
+
+
+def resolve_reference(value, definition, parameters):
+    """
+    Resolve a port attribute like ``${ type }`` or ``${ type.vec }`` against the parameters of a block.
+
+    :param value: The attribute as written in the block definition.
+    :param definition: The block definition.
+    :param parameters: The parameter values of the block instance.
+    :return: The resolved value, or None if it is an expression that cannot be resolved.
+    """
+    if not isinstance(value, str):
+        return value
+    match = _PARAMETER_REFERENCE.fullmatch(value.strip())
+    if not match:
+        return None if "${" in value else value
+    name, attribute = match.groups()
+    declared = next((parameter for parameter in definition["parameters"] if parameter["id"] == name), None)
+    resolved = parameters.get(name, declared["default"] if declared else None)
+    if attribute is None:
+        return resolved
+    if declared is None or resolved not in declared.get("options", []):
+        return None
+    attribute_values = declared["option_attributes"].get(attribute) or []
+    index = declared["options"].index(resolved)
+    return attribute_values[index] if index < len(attribute_values) else None
+
+
+def stream_port_type(definition, parameters):
+    """
+    Determine the stream type and vector length of a block from its first stream port.
+
+    :return: A tuple of the GNU Radio stream type and the vector length, or None if there is no resolvable port.
+    """
+    for port in definition["outputs"] + definition["inputs"]:
+        if port["domain"] != "stream":
+            continue
+        dtype = resolve_reference(port["dtype"], definition, parameters)
+        if dtype is None:
+            return None
+        vlen = resolve_reference(port["vlen"], definition, parameters)
+        vlen = int(vlen) if str(vlen).isdigit() else 1
+        return DTYPE_ALIASES.get(str(dtype), str(dtype)), vlen
+    return None
+
+
+class BlockIndex:
+    """
+    SQLite backed index of block definitions.
+
+    A file is only parsed again when its modification time or size changed, lookups by block id go through the
+    primary key and are memoized for the lifetime of the index.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        # The index may be created in one thread and used in another one, like a server handling requests in a
+        # thread of its own, but never by two threads at a time
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(_SCHEMA)
+        self.definitions = {}
+
+    def refresh(self, directories, loader=load_block_definition):
+        """
+        Bring the index up to date with the YAML files in the directories.
+
+        Files indexed from other directories stay in the index, only files that disappeared from the scanned
+        directories are removed. Files are indexed by their absolute path, so a refresh from another working
+        directory finds them again.
+
+        :param directories: Directories searched recursively for .yml files, missing ones are skipped.
+        :param loader: Reads one file into a definition, used to parse stale files in other ways.
+        :return: A dictionary counting unchanged, updated and removed files and the files that failed.
+        """
+        known = {path: (mtime_ns, size) for path, mtime_ns, size in
+                 self.connection.execute("SELECT path, mtime_ns, size FROM files")}
+        stats = {"unchanged": 0, "updated": 0, "removed": 0, "errors": []}
+        seen = set()
+        scanned = [os.path.join(os.path.abspath(directory), "") for directory in directories
+                   if os.path.isdir(directory)]
+        for directory in directories:
+            for root, _, file_names in os.walk(os.path.abspath(directory)):
+                for file_name in sorted(file_names):
+                    if not file_name.endswith(".yml"):
+                        continue
+                    path = os.path.join(root, file_name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError as e:
+                        # A broken symbolic link or a file removed while walking
+                        stats["errors"].append((path, str(e)))
+                        continue
+                    seen.add(path)
+                    if known.get(path) == (stat.st_mtime_ns, stat.st_size):
+                        stats["unchanged"] += 1
+                        continue
+                    try:
+                        definition = loader(path)
+                    except Exception as e:
+                        stats["errors"].append((path, str(e)))
+                        definition = None
+                    self._store(path, stat, definition)
+                    stats["updated"] += 1
+
+        for path in known.keys() - seen:
+            if not path.startswith(tuple(scanned)):
+                continue
+            self.connection.execute("DELETE FROM blocks WHERE path = ?", (path,))
+            self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+            stats["removed"] += 1
+        self.connection.commit()
+        self.definitions.clear()
+        return stats
+
+    def _store(self, path, stat, definition):
+        self.connection.execute("DELETE FROM blocks WHERE path = ?", (path,))
+        self.connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+                                (path, stat.st_mtime_ns, stat.st_size))
+        if definition is not None:
+            self.connection.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?, ?)",
+                                    (definition["id"], path, definition["category"], json.dumps(definition)))
+
+    def get(self, block_id):
+        """Look up the definition of a block id, None if the library does not have it."""
+        if block_id not in self.definitions:
+            row = self.connection.execute("SELECT definition FROM blocks WHERE id = ?", (block_id,)).fetchone()
+            self.definitions[block_id] = json.loads(row[0]) if row else None
+        return self.definitions[block_id]
+
+    def categories(self):
+        """Yield the id and category of every indexed block."""
+        yield from self.connection.execute("SELECT id, category FROM blocks ORDER BY id")
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM blocks").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+def apply_block_definitions(blocks, index: BlockIndex):
+    """
+    Complete parsed blocks with their library definition.
+
+    Parameters missing in the flowgraph get the default of the definition, and the block type and vlen are taken
+    from the block's real stream port types instead of only its type parameter.
+
+    :return: The number of blocks found in the index.
+    """
+    found = 0
+    for block in blocks:
+        definition = index.get(block.id)
+        if definition is None:
+            continue
+        found += 1
+        for parameter in definition["parameters"]:
+            if parameter["id"] not in block.parameters and parameter["id"] != "type" \
+                    and isinstance(parameter["default"], (str, int, float, bool)):
+                block.add_parameter(parameter["id"], str(parameter["default"]))
+        port_type = stream_port_type(definition, {**block.parameters, "type": block.type} if block.type
+                                     else block.parameters)
+        if port_type is not None:
+            block.type = port_type[0]
+            if port_type[1] > 1:
+                block.parameters["vlen"] = str(port_type[1])
+    return found
@@ -0,0 +1,253 @@
+# Evaluate the Python expressions of GRC parameters that only depend on constants and variables, without exec
+import ast
+import math
+import operator
+from functools import lru_cache
+
+from radio.block import analyze_blocks
+from radio.flowgraph import FlowGraph
+
+# Blocks whose value parameter is a variable other expressions refer to by the block name
+VARIABLE_BLOCKS = {"variable": "value"}
+# Names an expression may use besides the variables, module prefixes like math.pi or numpy.sqrt are dropped
+SAFE_NAMES = {
+    "pi": math.pi, "e": math.e, "tau": math.tau, "inf": math.inf,
+    "abs": abs, "min": min, "max": max, "round": round, "int": int, "float": float, "len": len,
+    "sum": sum, "sqrt": math.sqrt, "exp": math.exp, "log": math.log, "log2": math.log2, "log10": math.log10,
+    "sin": math.sin, "cos": math.cos, "tan": math.tan, "atan2": math.atan2, "floor": math.floor,
+    "ceil": math.ceil,
+}
+SAFE_MODULES = {"math", "numpy", "np"}
+_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+    ast.USub: operator.neg, ast.UAdd: operator.pos,
+}
+MAX_EXPONENT = 1024
+MAX_INT_BITS = 4096
+
+
+class ExpressionError(ValueError):
+    """An expression that cannot be evaluated at conversion time."""
+
+
+@lru_cache(maxsize=4096)
+def parse_expression(text):
+    """The syntax tree of an expression, None if it is not valid Python."""
+    try:
+        return ast.parse(text.strip(), mode="eval").body
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return None
+
+
+def _module_name(node):
+    return isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id in SAFE_MODULES
+
+
+def references(tree):
+    """The names an expression refers to, a safe module prefix counts as the name after it."""
+    names = set()
+    for node in ast.walk(tree):
+        if _module_name(node):
+            names.add(node.attr)
+        elif isinstance(node, ast.Name) and node.id not in SAFE_MODULES:
+            names.add(node.id)
+    return names
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, complex))
+
+
+def evaluate(tree, values):
+    """
+    Evaluate an expression from numbers, strings, lists of them, the values and SAFE_NAMES.
+
+    :param tree: The syntax tree from parse_expression.
+    :param values: The values of the variables by name.
+    :raise ExpressionError: If the expression uses anything else or fails.
+    """
+    if isinstance(tree, ast.Constant):
+        if _is_number(tree.value) or isinstance(tree.value, str):
+            return tree.value
+        raise ExpressionError(f"{type(tree.value).__name__} constant")
+    if isinstance(tree, ast.Name) or _module_name(tree):
+        name = tree.attr if isinstance(tree, ast.Attribute) else tree.id
+        if name in values:
+            return values[name]
+        if name in SAFE_NAMES:
+            return SAFE_NAMES[name]
+        raise ExpressionError(f"unknown name {name}")
+    if isinstance(tree, (ast.List, ast.Tuple)):
+        return [evaluate(element, values) for element in tree.elts]
+    if isinstance(tree, ast.UnaryOp) and type(tree.op) in _OPERATORS:
+        operand = evaluate(tree.operand, values)
+        if not _is_number(operand):
+            raise ExpressionError(f"arithmetic on a {type(operand).__name__}")
+        return _OPERATORS[type(tree.op)](operand)
+    if isinstance(tree, ast.BinOp) and type(tree.op) in _OPERATORS:
+        left = evaluate(tree.left, values)
+        right = evaluate(tree.right, values)
+        for operand in (left, right):
+            if not _is_number(operand):
+                raise ExpressionError(f"arithmetic on a {type(operand).__name__}")
+        if isinstance(tree.op, ast.Pow) and isinstance(right, (int, float)) and abs(right) > MAX_EXPONENT:
+            raise ExpressionError(f"exponent {right} is too large")
+        try:
+            result = _OPERATORS[type(tree.op)](left, right)
+        except ArithmeticError as e:
+            raise ExpressionError(str(e)) from None
+        if isinstance(result, int) and result.bit_length() > MAX_INT_BITS:
+            raise ExpressionError("integer is too large")
+        return result
+    if isinstance(tree, ast.Call) and not tree.keywords:
+        function = evaluate(tree.func, values) if isinstance(tree.func, ast.Name) or _module_name(tree.func) else None
+        if not callable(function) or function not in SAFE_NAMES.values():
+            raise ExpressionError(f"call of {ast.unparse(tree.func)}")
+        arguments = [evaluate(argument, values) for argument in tree.args]
+        try:
+            return function(*arguments)
+        except (ArithmeticError, ValueError, TypeError) as e:
+            raise ExpressionError(f"{ast.unparse(tree.func)}: {e}") from None
+    raise ExpressionError(f"{type(tree).__name__} is not supported")
+
+
+def literal(value):
+    """The value written as an IEC 61499 compatible literal, None if it has none."""
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float) and math.isfinite(value):
+        return repr(value)
+    return None
+
+
+class FoldingReport:
+    """
+    The parameters folded into literals and the expressions that could not be.
+
+    :ivar unfoldable: A (block name, parameter, expression, reason) tuple for every expression left as it is.
+    """
+
+    def __init__(self):
+        self.folded = 0
+        self.unfoldable = []
+
+    def summary(self):
+        return f"{self.folded} parameters folded, {len(self.unfoldable)} expressions left to the runtime"
+
+    def __str__(self):
+        return f'FoldingReport({self.summary()})'
+
+    def __repr__(self):
+        return str(self)
+
+
+def variable_values(graph: FlowGraph, report=None):
+    """
+    Evaluate the variables of the flowgraph in dependency order, each exactly once.
+
+    :param report: A FoldingReport the variables that cannot be evaluated are added to.
+    :return: The values of the variables that could be evaluated, by name.
+    """
+    expressions = {name: str(value) for name, value in graph.variables.items()}
+    for block in graph:
+        key = VARIABLE_BLOCKS.get(block.id)
+        if key is not None and key in block.parameters:
+            expressions.setdefault(block.name, str(block.parameters[key]))
+
+    trees = {name: parse_expression(expression) for name, expression in expressions.items()}
+    dependencies = {name: (references(tree) & expressions.keys()) - {name} if tree is not None else set()
+                    for name, tree in trees.items()}
+    dependents = {name: [] for name in expressions}
+    for name, needed in dependencies.items():
+        for other in needed:
+            dependents[other].append(name)
+
+    values = {}
+    failed = {}
+    waiting = {name: len(needed) for name, needed in dependencies.items()}
+    ready = [name for name, count in waiting.items() if count == 0]
+    while ready:
+        name = ready.pop()
+        broken = sorted(dependencies[name] & failed.keys())
+        if trees[name] is None:
+            failed[name] = "not a Python expression"
+        elif broken:
+            failed[name] = f"depends on {', '.join(broken)}"
+        else:
+            try:
+                values[name] = evaluate(trees[name], values)
+            except ExpressionError as e:
+                failed[name] = str(e)
+        for other in dependents[name]:
+            waiting[other] -= 1
+            if waiting[other] == 0:
+                ready.append(other)
+    for name in expressions:
+        if name not in values and name not in failed:
+            failed[name] = "circular dependency"
+
+    if report is not None:
+        for name in expressions:
+            if name in failed:
+                report.unfoldable.append((name, VARIABLE_BLOCKS["variable"], expressions[name], failed[name]))
+    return values
+
+
+def fold_constants(graph: FlowGraph):
+    """
+    Replace the parameter expressions that only depend on constants and variables by typed literals.
+
+    The variables are evaluated once in dependency order, see variable_values. Expressions without operators and
+    without references to variables or SAFE_NAMES, like enum values or strings, are left alone silently. The
+    flowgraph itself stays as it is.
+
+    :return: The folded FlowGraph and a FoldingReport.
+    """
+    report = FoldingReport()
+    values = variable_values(graph, report)
+    failed = {name for name, _, _, _ in report.unfoldable}
+    flagged = {(name, VARIABLE_BLOCKS["variable"]) for name in failed}
+    results = {}
+    blocks = [block.copy() for block in graph]
+    for block in blocks:
+        for key, value in block.parameters.items():
+            if not isinstance(value, str) or (block.name, key) in flagged:
+                continue
+            if value not in results:
+                results[value] = _fold(value, values, failed)
+            folded, reason = results[value]
+            if folded is not None:
+                if folded != value:
+                    block.parameters[key] = folded
+                    report.folded += 1
+            elif reason is not None:
+                report.unfoldable.append((block.name, key, value, reason))
+    folded_graph = analyze_blocks(blocks)
+    folded_graph.variables = {name: literal(values[name]) or value if name in values else value
+                              for name, value in graph.variables.items()}
+    return folded_graph, report
+
+
+def _fold(expression, values, failed):
+    """The literal of the expression and None, or None and why it cannot be folded, None for no candidate."""
+    tree = parse_expression(expression)
+    if tree is None or isinstance(tree, ast.Constant):
+        return None, None
+    names = references(tree)
+    broken = sorted(names & failed)
+    if broken:
+        return None, f"depends on {', '.join(broken)}"
+    operations = any(isinstance(node, (ast.BinOp, ast.UnaryOp, ast.Call)) for node in ast.walk(tree))
+    if not operations and not names & (values.keys() | SAFE_NAMES.keys()):
+        return None, None
+    try:
+        result = evaluate(tree, values)
+    except ExpressionError as e:
+        return None, str(e)
+    folded = literal(result)
+    if folded is None:
+        return None, f"no IEC 61499 literal for {type(result).__name__}"
+    return folded, None
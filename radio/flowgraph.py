@@ -0,0 +1,111 @@
+# Compact graph of the blocks of a GNU Radio flowgraph
+from array import array
+
+
+def _compressed_rows(size, rows, columns):
+    """
+    Build a compressed sparse row adjacency from parallel lists of row and column indices.
+
+    :return: The offsets, size + 1 entries, and the column indices grouped by row in input order.
+    """
+    offsets = array('l', [0]) * (size + 1)
+    for row in rows:
+        offsets[row + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    targets = array('l', [0]) * len(rows)
+    fill = offsets[:-1]
+    for row, column in zip(rows, columns):
+        targets[fill[row]] = column
+        fill[row] += 1
+    return offsets, targets
+
+
+class FlowGraph:
+    """
+    The blocks of a flowgraph with their connections stored as array backed CSR out- and in-adjacency.
+
+    Block names are interned to integer ids, the position of the block in the flowgraph. The graph is a sequence
+    of its blocks, so it can be used wherever a list of blocks is expected.
+
+    :ivar variables: The value of GRC variables without a block in the graph, like samp_rate, by name.
+    """
+
+    __slots__ = ('blocks', 'ids', 'out_offsets', 'out_targets', 'in_offsets', 'in_sources', 'variables')
+
+    def __init__(self, blocks):
+        self.blocks = list(blocks)
+        self.variables = {}
+        self.ids = {}
+        for block_id, block in enumerate(self.blocks):
+            # Keep the first block with a given name
+            self.ids.setdefault(block.name, block_id)
+
+        sources = array('l')
+        destinations = array('l')
+        for src, block in enumerate(self.blocks):
+            for connection in block.connections:
+                dst = self.ids.get(connection.dst)
+                if dst is not None:
+                    sources.append(src)
+                    destinations.append(dst)
+        self.out_offsets, self.out_targets = _compressed_rows(len(self.blocks), sources, destinations)
+        self.in_offsets, self.in_sources = _compressed_rows(len(self.blocks), destinations, sources)
+
+    def copy(self):
+        """A copy holding copies of the blocks, to be changed without touching this flowgraph."""
+        graph = FlowGraph.__new__(FlowGraph)
+        graph.blocks = [block.copy() for block in self.blocks]
+        graph.variables = dict(self.variables)
+        graph.ids = dict(self.ids)
+        # The adjacency only depends on the connections, which the copies keep
+        graph.out_offsets, graph.out_targets = array('l', self.out_offsets), array('l', self.out_targets)
+        graph.in_offsets, graph.in_sources = array('l', self.in_offsets), array('l', self.in_sources)
+        return graph
+
+    def block_id(self, name):
+        return self.ids[name]
+
+    def out_degree(self, block_id):
+        return self.out_offsets[block_id + 1] - self.out_offsets[block_id]
+
+    def in_degree(self, block_id):
+        return self.in_offsets[block_id + 1] - self.in_offsets[block_id]
+
+    def has_inputs(self, block_id):
+        return self.in_offsets[block_id + 1] != self.in_offsets[block_id]
+
+    def has_outputs(self, block_id):
+        return self.out_offsets[block_id + 1] != self.out_offsets[block_id]
+
+    def successors(self, block_id):
+        return self.out_targets[self.out_offsets[block_id]:self.out_offsets[block_id + 1]]
+
+    def predecessors(self, block_id):
+        return self.in_sources[self.in_offsets[block_id]:self.in_offsets[block_id + 1]]
+
+    def edges(self):
+        """Yield all connections as (source id, destination id) pairs."""
+        for src in range(len(self.blocks)):
+            for i in range(self.out_offsets[src], self.out_offsets[src + 1]):
+                yield src, self.out_targets[i]
+
+    @property
+    def num_edges(self):
+        return len(self.out_targets)
+
+    def __getitem__(self, index):
+        return self.blocks[index]
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __str__(self):
+        return f'FlowGraph({len(self.blocks)} blocks, {self.num_edges} connections)'
+
+    def __repr__(self):
+        return str(self)
@@ -0,0 +1,214 @@
+# Simplify a parsed GNU Radio flowgraph before it is converted, so the 4diac network gets fewer FBs and events
+import ast
+import operator
+from collections import Counter
+
+from radio.block import Connection, analyze_blocks
+from radio.flowgraph import FlowGraph
+
+VIRTUAL_SINK = "virtual_sink"
+VIRTUAL_SOURCE = "virtual_source"
+# Blocks applying a constant to every item, how two of their constants in a row combine and the identity constant
+CONSTANT_ARITHMETIC = {
+    "blocks_multiply_const_xx": (operator.mul, 1),
+    "blocks_multiply_const_vxx": (operator.mul, 1),
+    "blocks_add_const_vxx": (operator.add, 0),
+}
+
+
+def _reroute(blocks, skipped):
+    """
+    Connect the blocks past the skipped ones.
+
+    :param blocks: The blocks that stay, their connections are rewritten.
+    :param skipped: The names of the removed blocks and the names their input is passed on to, an empty list
+                    drops the connections into the block.
+    """
+    resolved = {}
+
+    def resolve(name, visiting):
+        if name not in skipped:
+            return [name]
+        if name in resolved:
+            return resolved[name]
+        if name in visiting:
+            return []
+        visiting.add(name)
+        targets = []
+        for dst in skipped[name]:
+            for target in resolve(dst, visiting):
+                if target not in targets:
+                    targets.append(target)
+        visiting.discard(name)
+        resolved[name] = targets
+        return targets
+
+    for block in blocks:
+        if not any(connection.dst in skipped for connection in block.connections):
+            continue
+        connections = []
+        for connection in block.connections:
+            if connection.dst not in skipped:
+                connections.append(connection)
+                continue
+            for dst in resolve(connection.dst, set()):
+                if not any(existing.dst == dst for existing in connections):
+                    connections.append(Connection(block.name, dst))
+        block.connections = connections
+
+
+def remove_disabled_blocks(blocks):
+    """
+    Remove the blocks disabled in GRC together with their connections, bypassed blocks are replaced by direct
+    connections from their inputs to their outputs.
+
+    :return: The remaining blocks and the names of the removed ones.
+    """
+    skipped = {}
+    for block in blocks:
+        if block.state == "disabled":
+            skipped[block.name] = []
+        elif block.state == "bypassed":
+            skipped[block.name] = [connection.dst for connection in block.connections]
+    kept = [block for block in blocks if block.name not in skipped]
+    _reroute(kept, skipped)
+    return kept, list(skipped)
+
+
+def collapse_virtual_ports(blocks):
+    """
+    Replace every virtual sink and virtual source pair by direct connections from the blocks feeding the sink to
+    the blocks fed by the sources of the same stream id.
+
+    :return: The remaining blocks and the names of the removed ones.
+    """
+    stream_targets = {}
+    for block in blocks:
+        if block.id == VIRTUAL_SOURCE:
+            targets = stream_targets.setdefault(str(block.parameters.get("stream_id")), [])
+            targets.extend(connection.dst for connection in block.connections)
+
+    skipped = {}
+    for block in blocks:
+        if block.id == VIRTUAL_SINK:
+            skipped[block.name] = stream_targets.get(str(block.parameters.get("stream_id")), [])
+        elif block.id == VIRTUAL_SOURCE:
+            skipped[block.name] = []
+    kept = [block for block in blocks if block.name not in skipped]
+    _reroute(kept, skipped)
+    return kept, list(skipped)
+
+
+def _number(value):
+    """The value of a numeric literal, None for anything else like a variable or an expression."""
+    if isinstance(value, (int, float, complex)) and not isinstance(value, bool):
+        return value
+    try:
+        number = ast.literal_eval(str(value).strip())
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return None
+    return number if isinstance(number, (int, float, complex)) and not isinstance(number, bool) else None
+
+
+def _fusible(first, second):
+    return (first.id in CONSTANT_ARITHMETIC and first.id == second.id and first.type == second.type
+            and str(first.parameters.get("vlen", "1")) == str(second.parameters.get("vlen", "1"))
+            and _number(first.parameters.get("const")) is not None
+            and _number(second.parameters.get("const")) is not None)
+
+
+def fuse_constant_arithmetic(blocks):
+    """
+    Fuse chains of the same constant arithmetic block into the first block of the chain, see CONSTANT_ARITHMETIC.
+
+    Only literal constants are combined, a chain link feeding or fed by other blocks as well ends the chain.
+    Blocks left with the identity constant, like a multiplication by one, are replaced by direct connections.
+
+    :return: The remaining blocks and the names of the removed ones.
+    """
+    by_name = {}
+    for block in blocks:
+        by_name.setdefault(block.name, block)
+    in_degree = Counter(connection.dst for block in blocks for connection in block.connections)
+
+    absorbed = {}
+    for head in blocks:
+        if head.name in absorbed:
+            continue
+        while len(head.connections) == 1:
+            successor = by_name.get(head.connections[0].dst)
+            if (successor is None or successor is head or successor.name in absorbed
+                    or in_degree[successor.name] != 1 or not _fusible(head, successor)):
+                break
+            combine, _ = CONSTANT_ARITHMETIC[head.id]
+            head.parameters["const"] = str(combine(_number(head.parameters["const"]),
+                                                   _number(successor.parameters["const"])))
+            head.connections = [Connection(head.name, connection.dst) for connection in successor.connections]
+            absorbed[successor.name] = []
+
+    for block in blocks:
+        if block.name in absorbed or block.id not in CONSTANT_ARITHMETIC:
+            continue
+        _, identity = CONSTANT_ARITHMETIC[block.id]
+        if _number(block.parameters.get("const")) == identity and in_degree[block.name] and block.connections:
+            absorbed[block.name] = [connection.dst for connection in block.connections]
+
+    kept = [block for block in blocks if block.name not in absorbed]
+    _reroute(kept, absorbed)
+    return kept, list(absorbed)
+
+
+# The passes in the order they run, by the name they are switched with
+PASSES = {
+    "disabled": remove_disabled_blocks,
+    "virtual": collapse_virtual_ports,
+    "fuse": fuse_constant_arithmetic,
+}
+
+
+class OptimizationReport:
+    """
+    The blocks every pass removed.
+
+    :ivar removed: The names of the removed blocks by pass name, for the passes that ran.
+    """
+
+    def __init__(self):
+        self.removed = {}
+
+    @property
+    def total(self):
+        return sum(len(names) for names in self.removed.values())
+
+    def summary(self):
+        if not self.removed:
+            return "no optimization passes"
+        return "; ".join(f"{name}: {len(names)} removed" + (f" ({', '.join(names)})" if names else "")
+                         for name, names in self.removed.items())
+
+    def __str__(self):
+        return f'OptimizationReport({self.total} blocks removed)'
+
+    def __repr__(self):
+        return str(self)
+
+
+def optimize(graph: FlowGraph, passes=None):
+    """
+    Run the optimization passes on a parsed flowgraph, the flowgraph itself stays as it is.
+
+    :param graph: The FlowGraph from Parser.parse.
+    :param passes: The names of the PASSES to run, all of them if None. They always run in the order of PASSES.
+    :return: The optimized FlowGraph and an OptimizationReport.
+    """
+    unknown = set(passes or ()) - set(PASSES)
+    if unknown:
+        raise ValueError(f"Unknown optimization passes {', '.join(sorted(unknown))}, use {', '.join(PASSES)}")
+    blocks = [block.copy() for block in graph]
+    report = OptimizationReport()
+    for name, optimization in PASSES.items():
+        if passes is None or name in passes:
+            blocks, report.removed[name] = optimization(blocks)
+    optimized = analyze_blocks(blocks)
+    optimized.variables = dict(graph.variables)
+    return optimized, report
@@ -3,6 +3,12 @@
 import yaml
 from radio.block import Connection, Block, analyze_blocks
 
+# Prefer the libyaml backed loader, GRC files are plain YAML so the safe loader is sufficient
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 
 def set_sample_rate(blocks, sample_rate):
     for block in blocks:
@@ -20,32 +26,42 @@ class Parser:
 
     def parse(self):
         with open(self.path, 'r') as file:
-            data = yaml.load(file, Loader=yaml.FullLoader)
-            blocks = []
-            sample_rate = None
+            return self.parse_stream(file)
+
+    def parse_stream(self, stream):
+        return self.parse_data(yaml.load(stream, Loader=SafeLoader))
+
+    def parse_data(self, data):
+        blocks = []
+        # Index the blocks by name so connections can be resolved in a single pass
+        blocks_by_name = {}
+        sample_rate = None
 
-            for block in data['blocks']:
-                # Skip the sample block but save the sample rate
-                if block['name'] == 'samp_rate':
-                    sample_rate = block['parameters']['value']
-                    continue
-                b = Block(block['name'], block['id'])
-                for key, value in block['parameters'].items():
-                    b.add_parameter(key, value)
-                blocks.append(b)
+        for block in data['blocks']:
+            # Skip the sample block but save the sample rate
+            if block['name'] == 'samp_rate':
+                sample_rate = block['parameters']['value']
+                continue
+            b = Block(block['name'], block['id'])
+            b.state = (block.get('states') or {}).get('state', 'enabled')
+            for key, value in block['parameters'].items():
+                b.add_parameter(key, value)
+            blocks.append(b)
+            # Keep the first block with a given name, like the former linear search did
+            blocks_by_name.setdefault(b.name, b)
 
-            for connection in data['connections']:
-                c = Connection(connection[0], connection[2])
-                for block in blocks:
-                    if block.name == 'samp_rate':
-                        continue
-                    if block.name == c.src:
-                        block.add_connection(c)
-                        break
-            analyze_blocks(blocks)
-            blocks = self.set_type(blocks)
-            blocks = set_sample_rate(blocks, sample_rate)
-            return self.remove_advanced_tab(blocks)
+        for connection in data['connections']:
+            c = Connection(connection[0], connection[2])
+            src = blocks_by_name.get(c.src)
+            if src is not None:
+                src.add_connection(c)
+        # From here on the blocks are held by a FlowGraph
+        blocks = analyze_blocks(blocks)
+        if sample_rate is not None:
+            blocks.variables['samp_rate'] = sample_rate
+        blocks = self.set_type(blocks)
+        blocks = set_sample_rate(blocks, sample_rate)
+        return self.remove_advanced_tab(blocks)
 
     # Remove alias, affinity, minoutbuf, maxoutbuf and comment parameters
     def remove_advanced_tab(self, blocks):
@@ -0,0 +1,93 @@
+# Per-phase timings and counters of a conversion, written as a Chrome trace and a JSON summary
+import cProfile
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+
+class Profiler:
+    """
+    Records phases as Chrome trace events (chrome://tracing, Perfetto) and counts what the conversion did.
+
+    :param cprofile: Also run cProfile while the profiler is started.
+    """
+
+    def __init__(self, cprofile=False):
+        self.events = []
+        self.counts = defaultdict(int)
+        self.phase_seconds = defaultdict(float)
+        # Seconds per event of another category than "phase", like the rendering of each FB type
+        self.fb_type_seconds = {}
+        self.origin = time.perf_counter()
+        self.cprofile = cProfile.Profile() if cprofile else None
+
+    def start(self):
+        if self.cprofile:
+            self.cprofile.enable()
+
+    def stop(self):
+        if self.cprofile:
+            self.cprofile.disable()
+
+    @contextmanager
+    def phase(self, name, category="phase", **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.events.append({"name": name, "cat": category, "ph": "X", "pid": os.getpid(),
+                                "tid": threading.get_ident(), "ts": (start - self.origin) * 1e6,
+                                "dur": (end - start) * 1e6, "args": args})
+            if category == "phase":
+                self.phase_seconds[name] += end - start
+            else:
+                self.fb_type_seconds[name] = self.fb_type_seconds.get(name, 0.0) + end - start
+
+    def count(self, name, amount=1):
+        self.counts[name] += amount
+
+    def count_file(self, path):
+        self.counts["files_written"] += 1
+        self.counts["bytes_written"] += os.path.getsize(path)
+
+    def summary(self):
+        return {"phases": dict(self.phase_seconds), "fb_types": self.fb_type_seconds, "counts": dict(self.counts)}
+
+    def write(self, directory):
+        """
+        Write trace.json, summary.json and, with cProfile enabled, cprofile.pstats into the directory.
+
+        :return: The paths of the written files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = [os.path.join(directory, "trace.json"), os.path.join(directory, "summary.json")]
+        with open(paths[0], 'w') as file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+        with open(paths[1], 'w') as file:
+            json.dump(self.summary(), file, indent=2)
+        if self.cprofile:
+            paths.append(os.path.join(directory, "cprofile.pstats"))
+            self.cprofile.dump_stats(paths[-1])
+        return paths
+
+
+class NullProfiler:
+    """Stands in for the Profiler when profiling is disabled, every call is a no-op."""
+
+    _phase = nullcontext()
+
+    def phase(self, name, category="phase", **args):
+        return self._phase
+
+    def count(self, name, amount=1):
+        pass
+
+    def count_file(self, path):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
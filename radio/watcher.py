@@ -0,0 +1,118 @@
+# Watch a GNU Radio project file for changes, with inotify on Linux and polling everywhere else
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """Detect changes by comparing the modification time and size of the file."""
+
+    def __init__(self, path, poll_interval=0.25):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.last = self._stat()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def wait(self, timeout=None):
+        """
+        Wait for the file to change.
+
+        :param timeout: Seconds to wait at most, None to wait forever.
+        :return: True if the file changed, False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._stat()
+            if current != self.last:
+                self.last = current
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            sleep = self.poll_interval if deadline is None else min(self.poll_interval, deadline - time.monotonic())
+            time.sleep(max(sleep, 0))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Detect changes with Linux inotify.
+
+    The directory is watched instead of the file, editors often save by writing a new file and renaming it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.fsencode(os.path.basename(path))
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        directory = os.fsencode(os.path.dirname(os.path.abspath(path)))
+        if libc.inotify_add_watch(self.fd, directory, IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch failed")
+
+    def _read_events(self):
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if name == self.name:
+                    changed = True
+
+    def wait(self, timeout=None):
+        """
+        Wait for the file to change.
+
+        :param timeout: Seconds to wait at most, None to wait forever.
+        :return: True if the file changed, False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return False
+            if self._read_events():
+                return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+def watch_file(path, poll_interval=0.25):
+    """Create the best watcher available for the file, inotify where the platform has it, polling otherwise."""
+    if hasattr(select, "select") and ctypes.util.find_library("c"):
+        try:
+            return InotifyWatcher(path)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(path, poll_interval)
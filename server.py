@@ -0,0 +1,169 @@
+# Long-lived conversion server that keeps the converter loaded with warm caches, use client.py to talk to it
+import argparse
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from client import DEFAULT_TOKEN_PATH, read_token
+from diac.rules import load_rules
+from main import ConversionCaches, convert_flowgraph, optimizations_of
+from radio.block_index import BlockIndex, DEFAULT_INDEX_PATH
+
+DEFAULT_PORT = 8765
+
+
+def write_token(path):
+    """Write a new random token to a file only the user can read, replacing an older one."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    # O_EXCL refuses to follow a link planted in place of the removed file
+    with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'w') as file:
+        file.write(token)
+    return token
+
+
+class ConversionServer(HTTPServer):
+    """
+    Serves conversions over HTTP on localhost.
+
+    Every request needs the token written to token_path on start, other local processes and web pages cannot
+    trigger conversions that write files. Requests are handled one after the other, so conversions sharing output
+    directories never interleave.
+    """
+
+    def __init__(self, address, block_index=None, token_path=DEFAULT_TOKEN_PATH):
+        super().__init__(address, ConversionRequestHandler)
+        self.caches = ConversionCaches()
+        self.block_index = block_index
+        self.conversions = 0
+        self.started = time.time()
+        self.token_path = token_path
+        self.token = write_token(token_path)
+
+    @property
+    def origin(self):
+        return "http://%s:%d" % self.server_address[:2]
+
+    def server_close(self):
+        super().server_close()
+        # Leave the file alone if another server took it over
+        if read_token(self.token_path) == self.token:
+            os.remove(self.token_path)
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    server: ConversionServer
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _refused(self, body):
+        """Reply with an error and return True if the request may not use the server."""
+        origin = self.headers.get("Origin")
+        if origin is not None and origin != self.server.origin:
+            self._reply(403, {"ok": False, "error": "cross-origin requests are not allowed"})
+            return True
+        authorization = self.headers.get("Authorization", "")
+        if not hmac.compare_digest(authorization.encode(), ("Bearer " + self.server.token).encode()):
+            self._reply(401, {"ok": False, "error": "missing or wrong token, see " + self.server.token_path})
+            return True
+        if body and self.headers.get("Content-Type", "").split(";")[0].strip().lower() != "application/json":
+            self._reply(415, {"ok": False, "error": "requests must be sent as application/json"})
+            return True
+        return False
+
+    def do_GET(self):
+        if self._refused(body=False):
+            return
+        if self.path != "/status":
+            return self._reply(404, {"ok": False, "error": "unknown path " + self.path})
+        caches = self.server.caches
+        self._reply(200, {"ok": True, "conversions": self.server.conversions,
+                          "uptime": time.time() - self.server.started,
+                          "cached_flowgraphs": len(caches.flowgraphs), "parse_hits": caches.parse_hits,
+                          "written_types": len(caches.written_types)})
+
+    def do_POST(self):
+        if self._refused(body=True):
+            return
+        if self.path == "/shutdown":
+            self._reply(200, {"ok": True})
+            # shutdown() blocks until serve_forever returns, which cannot happen while this request is handled
+            threading.Thread(target=self.server.shutdown).start()
+            return
+        if self.path != "/convert":
+            return self._reply(404, {"ok": False, "error": "unknown path " + self.path})
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            start = time.perf_counter()
+            rules = load_rules(request["rules"]) if request.get("rules") else None
+            result = convert_flowgraph(request["radio"], request["diac"], request["blocks"],
+                                       request.get("types"), verbose=False, force=request.get("force", False),
+                                       block_index=self.server.block_index, caches=self.server.caches,
+                                       partition_size=request.get("partition"),
+                                       optimizations=optimizations_of(request.get("optimize")),
+                                       fold=request.get("fold", False), rules=rules)
+        except Exception as e:
+            return self._reply(400, {"ok": False, "error": f"{type(e).__name__}: {e}"})
+        self.server.conversions += 1
+        self._reply(200, {"ok": True, "blocks": result["blocks"], "fb_types": result["fb_types"],
+                          "cache": result["cache"], "seconds": time.perf_counter() - start})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, block_index=None, token_path=DEFAULT_TOKEN_PATH):
+    """
+    Create a conversion server, call serve_forever() on it to handle requests.
+
+    :param port: The port to listen on, 0 picks a free one, see server_address.
+    :param token_path: Where the token clients need is written to, only readable by the user.
+    """
+    return ConversionServer((host, port), block_index, token_path)
+
+
+def main():
+    args = argparse.ArgumentParser(description='Serve GNU Radio to Eclipse 4diac conversions on localhost')
+    args.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    args.add_argument('--grc-blocks', required=False, type=str, nargs='+',
+                      help='GRC block YAML directories to look up the real port types and defaults of blocks in')
+    args.add_argument('--block-index', required=False, type=str, default=DEFAULT_INDEX_PATH,
+                      help='Path of the persistent block definition index used with --grc-blocks')
+    args.add_argument('--token-file', type=str, default=DEFAULT_TOKEN_PATH,
+                      help='File the access token of the clients is written to')
+    args = args.parse_args()
+
+    block_index = None
+    if args.grc_blocks:
+        block_index = BlockIndex(args.block_index)
+        block_index.refresh(args.grc_blocks)
+
+    server = serve(port=args.port, block_index=block_index, token_path=args.token_file)
+    print(f"Serving conversions on {server.origin}, token in {server.token_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+# Builders of the blocks and flowgraphs the tests convert
+from radio.block import Block, Connection, analyze_blocks
+
+
+def block(name, id, connections=(), stream_type="complex", state="enabled", **parameters):
+    """A block with the parameters, connected to the blocks named in connections."""
+    result = Block(name, id)
+    result.type = stream_type
+    result.state = state
+    result.parameters = parameters
+    for dst in connections:
+        result.add_connection(Connection(name, dst))
+    return result
+
+
+def flowgraph(*blocks):
+    """The FlowGraph of the blocks, their inputs and outputs set after the connections."""
+    return analyze_blocks(list(blocks))
@@ -0,0 +1,111 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from diac.cache import CACHE_FILE_NAME
+from main import run_batch
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+class BatchTest(unittest.TestCase):
+    """Converts several flowgraphs sharing the blocks and types directories in a process pool."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.flowgraphs = os.path.join(self.directory, "flowgraphs")
+        self.projects = os.path.join(self.directory, "projects")
+        self.blocks = os.path.join(self.directory, "blocks")
+        self.types = os.path.join(self.directory, "types")
+        for path in (self.flowgraphs, self.projects, self.blocks, self.types):
+            os.makedirs(path)
+        with open(os.path.join(DATA, "flowgraph.grc"), 'r') as file:
+            content = file.read()
+        # A REAL constant gives blocks_multiply_const_xx a second interface
+        for name, text in (("integer", content), ("real", content.replace("const: '3'", "const: '2.5'")),
+                           ("broken", "blocks: [")):
+            with open(os.path.join(self.flowgraphs, name + ".grc"), 'w') as file:
+                file.write(text)
+            shutil.copy(os.path.join(DATA, "project.sys"), os.path.join(self.projects, name + ".sys"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def job(self, name):
+        return {"radio": os.path.join(self.flowgraphs, name + ".grc"),
+                "diac": os.path.join(self.projects, name + ".sys"), "blocks": self.blocks, "types": self.types}
+
+    def run_batch(self, names):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            failed = run_batch([self.job(name) for name in names], max_workers=2)
+        return failed, output.getvalue()
+
+    def project(self, name):
+        with open(os.path.join(self.projects, name + ".sys"), 'r') as file:
+            return file.read()
+
+    def test_failures_are_isolated(self):
+        with open(os.path.join(DATA, "project.sys"), 'r') as file:
+            original = file.read()
+        failed, output = self.run_batch(["integer", "broken", "real"])
+        self.assertEqual(failed, 1)
+        self.assertIn("FAILED " + self.job("broken")["radio"], output)
+        self.assertIn("Converted 2 of 3 files", output)
+        self.assertEqual(self.project("broken"), original)
+        self.assertNotEqual(self.project("integer"), original)
+        self.assertNotEqual(self.project("real"), original)
+
+    def test_shared_directories_written_once(self):
+        _, output = self.run_batch(["integer", "real"])
+        # Both interfaces of the multiply block get suffixed names, in the types and in both projects
+        fbts = sorted(name for name in os.listdir(self.blocks) if name.endswith(".fbt"))
+        multiply = [name for name in fbts if name.startswith("fb_blocks_multiply_const_xx_")]
+        self.assertEqual(len(multiply), 2)
+        self.assertIn("fb_blocks_throttle_gen.fbt", fbts)
+        for name in ("integer", "real"):
+            project = self.project(name)
+            for fbt in fbts:
+                if fbt in multiply:
+                    continue
+                self.assertIn('Type="gnu_radio::' + fbt[3:-8].upper() + '"', project)
+        types = [fbt[3:-8].upper() for fbt in multiply]
+        self.assertEqual(len([name for name in types if name in self.project("integer")]), 1)
+        self.assertEqual(len([name for name in types if name in self.project("real")]), 2)
+
+        with open(os.path.join(self.blocks, CACHE_FILE_NAME), 'r') as file:
+            self.assertEqual(sorted(json.load(file)), fbts)
+        self.assertEqual(output.count(self.blocks + ":"), 1)
+        self.assertIn(f"{self.blocks}: {len(fbts)} function block types (cache: 0 unchanged, {len(fbts)} "
+                      f"regenerated)", output)
+
+        _, output = self.run_batch(["integer", "real"])
+        self.assertIn(f"(cache: {len(fbts)} unchanged, 0 regenerated)", output)
+
+    def test_exit_status(self):
+        def main(*arguments):
+            return subprocess.run([sys.executable, MAIN, *arguments], capture_output=True, text=True)
+
+        directories = ["--blocks", self.blocks, "--types", self.types]
+        result = main("--batch", os.path.join(self.flowgraphs, "*.grc"), "--diac", self.projects, *directories)
+        self.assertEqual(result.returncode, 1, result.stderr)
+        result = main("--batch", os.path.join(self.flowgraphs, "[ir]*.grc"), "--diac", self.projects, *directories)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        result = main("--batch", os.path.join(self.flowgraphs, "*.grc"), *directories)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("needs --diac", result.stderr)
+        result = main("--batch", os.path.join(self.flowgraphs, "*.missing"), "--diac", self.projects, *directories)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("matches no GNU Radio project files", result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
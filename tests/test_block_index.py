@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from radio.block import Block
+from radio.block_index import BlockIndex, apply_block_definitions, load_block_definition, resolve_reference
+
+BLOCKS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "grc_blocks")
+MULTIPLY_CONST = os.path.join(BLOCKS, "blocks_multiply_const_xx.block.yml")
+
+
+class BlockDefinitionTest(unittest.TestCase):
+    def test_load_block_definition(self):
+        definition = load_block_definition(MULTIPLY_CONST)
+        self.assertEqual(definition["id"], "blocks_multiply_const_xx")
+        self.assertEqual(definition["category"], "[Core]/Math Operators")
+        self.assertEqual([parameter["id"] for parameter in definition["parameters"]], ["type", "const", "vlen"])
+        self.assertEqual(definition["parameters"][0]["option_attributes"]["fcn"], ["cc", "ff", "ii", "ss"])
+        self.assertEqual(definition["inputs"], [{"domain": "stream", "dtype": "${ type }", "vlen": "${ vlen }",
+                                                 "optional": False}])
+
+    def test_load_non_block_file(self):
+        self.assertIsNone(load_block_definition(os.path.join(BLOCKS, "not_a_block.yml")))
+
+    def test_resolve_reference(self):
+        definition = load_block_definition(MULTIPLY_CONST)
+        parameters = {"type": "float", "vlen": "4"}
+        self.assertEqual(resolve_reference("${ type }", definition, parameters), "float")
+        self.assertEqual(resolve_reference("${type.fcn}", definition, parameters), "ff")
+        self.assertEqual(resolve_reference("${ vlen }", definition, {}), "1")
+        self.assertEqual(resolve_reference("fc32", definition, parameters), "fc32")
+        self.assertEqual(resolve_reference(2, definition, parameters), 2)
+        self.assertIsNone(resolve_reference("${ vlen * 2 }", definition, parameters))
+        self.assertIsNone(resolve_reference("${ type.fcn }", definition, {"type": "byte"}))
+
+
+class BlockIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.blocks = os.path.join(self.directory, "blocks")
+        shutil.copytree(BLOCKS, self.blocks)
+        self.index = BlockIndex(os.path.join(self.directory, "index.sqlite"))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+
+    def test_refresh_walks_subdirectories_and_skips_unchanged_files(self):
+        stats = self.index.refresh([self.blocks])
+        self.assertEqual((stats["updated"], stats["unchanged"], stats["removed"]), (4, 0, 0))
+        self.assertEqual(dict(self.index.categories()), {"blocks_multiply_const_xx": "[Core]/Math Operators",
+                                                         "blocks_throttle": "[Core]/Misc", "oot_gain": "[OOT]/Gain"})
+        stats = self.index.refresh([self.blocks])
+        self.assertEqual((stats["updated"], stats["unchanged"], stats["removed"]), (0, 4, 0))
+
+    def test_refresh_keeps_files_of_other_directories(self):
+        other = os.path.join(self.directory, "other")
+        os.makedirs(other)
+        shutil.move(os.path.join(self.blocks, "oot"), other)
+        self.index.refresh([self.blocks])
+        self.index.refresh([other])
+        self.assertEqual(len(self.index), 3)
+        stats = self.index.refresh([])
+        self.assertEqual(stats["removed"], 0)
+        stats = self.index.refresh([os.path.join(self.directory, "missing")])
+        self.assertEqual(stats["removed"], 0)
+        self.assertEqual(len(self.index), 3)
+
+    def test_refresh_removes_deleted_files_of_scanned_directories(self):
+        self.index.refresh([self.blocks])
+        os.remove(os.path.join(self.blocks, "oot", "oot_gain.block.yml"))
+        stats = self.index.refresh([self.blocks])
+        self.assertEqual(stats["removed"], 1)
+        self.assertIsNone(self.index.get("oot_gain"))
+        self.assertIsNotNone(self.index.get("blocks_multiply_const_xx"))
+
+    def test_refresh_from_another_working_directory(self):
+        cwd = os.getcwd()
+        try:
+            os.chdir(self.directory)
+            stats = self.index.refresh(["blocks"])
+            self.assertEqual(stats["updated"], 4)
+            os.chdir(self.blocks)
+            stats = self.index.refresh(["."])
+            self.assertEqual((stats["updated"], stats["unchanged"], stats["removed"]), (0, 4, 0))
+        finally:
+            os.chdir(cwd)
+        # The working directory is resolved, so is the temporary directory in case it lies behind a link
+        blocks = os.path.realpath(self.blocks)
+        stats = self.index.refresh([blocks])
+        self.assertEqual((stats["updated"], stats["unchanged"], stats["removed"]), (0, 4, 0))
+        (path,) = self.index.connection.execute("SELECT path FROM blocks WHERE id = 'oot_gain'").fetchone()
+        self.assertEqual(path, os.path.join(blocks, "oot", "oot_gain.block.yml"))
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "needs symbolic links")
+    def test_refresh_skips_broken_links(self):
+        os.symlink(os.path.join(self.directory, "gone.yml"), os.path.join(self.blocks, "broken.yml"))
+        stats = self.index.refresh([self.blocks])
+        self.assertEqual(stats["updated"], 4)
+        self.assertEqual([path for path, _ in stats["errors"]], [os.path.join(self.blocks, "broken.yml")])
+
+    def test_apply_block_definitions(self):
+        self.index.refresh([self.blocks])
+        multiply = Block("multiply", "blocks_multiply_const_xx")
+        multiply.type = "float"
+        multiply.parameters = {"const": "2", "vlen": "4"}
+        gain = Block("gain", "oot_gain")
+        unknown = Block("unknown", "not_in_the_library")
+        unknown.parameters = {"x": "1"}
+
+        self.assertEqual(apply_block_definitions([multiply, gain, unknown], self.index), 2)
+        self.assertEqual((multiply.type, multiply.parameters), ("float", {"const": "2", "vlen": "4"}))
+        self.assertEqual((gain.type, gain.parameters), ("complex", {"gain": "1.5"}))
+        self.assertEqual((unknown.type, unknown.parameters), (None, {"x": "1"}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from diac.buffers import BUFFER_PROFILES, BufferProfile, plan_buffers
+from diac.rates import propagate_rates
+from tests.helpers import block, flowgraph
+
+
+def receiver():
+    """A 1 MS/s source decimated by 100 into a sink, and an audio source running at the default rate."""
+    return flowgraph(block("source", "uhd_usrp_source", ["filter"], samp_rate="1e6"),
+                     block("filter", "fir_filter_xxx", ["sink"], decim="100"),
+                     block("sink", "blocks_null_sink"),
+                     block("audio", "audio_source", ["audio_sink"]),
+                     block("audio_sink", "blocks_null_sink"))
+
+
+def frames(plan):
+    return [tuple(port.frame_size if port is not None else None for port in pair) for pair in plan.ports]
+
+
+class BufferPlanTest(unittest.TestCase):
+    def test_rates(self):
+        input_rates, output_rates = propagate_rates(receiver())
+        self.assertEqual(input_rates, [1e6, 1e6, 1e4, 32000.0, 32000.0])
+        self.assertEqual(output_rates, [1e6, 1e4, 1e4, 32000.0, 32000.0])
+
+    def test_frame_size(self):
+        profile = BufferProfile("test", 0.01, 64, 4096)
+        self.assertEqual(profile.frame_size(32000), 512)
+        self.assertEqual(profile.frame_size(1000), 64)
+        self.assertEqual(profile.frame_size(1e9), 4096)
+        self.assertEqual(profile.frame_size(0), 64)
+
+    def test_frames_follow_the_stream_rates(self):
+        graph = receiver()
+        self.assertEqual(frames(plan_buffers(graph, "latency")),
+                         [(None, 1024), (1024, 16), (16, None), (None, 32), (32, None)])
+        self.assertEqual(frames(plan_buffers(graph, "balanced")),
+                         [(None, 4096), (4096, 128), (128, None), (None, 512), (512, None)])
+        self.assertEqual(frames(plan_buffers(graph, BUFFER_PROFILES["throughput"])),
+                         [(None, 16384), (16384, 512), (512, None), (None, 2048), (2048, None)])
+
+    def test_plan(self):
+        plan = plan_buffers(receiver(), "balanced")
+        self.assertEqual(plan.frame_sizes, [128, 512, 4096])
+        self.assertEqual(str(plan.ports[1][0]), str(plan.ports[0][1]))
+        self.assertAlmostEqual(plan.max_event_rate, 1e6 / 4096)
+        self.assertEqual(plan.summary(), "balanced buffers: frames of 128..4096 items, at most 244 events/s")
+        self.assertEqual(plan_buffers(flowgraph(), "balanced").summary(), "balanced buffers: no streams")
+
+    def test_connected_ports_share_the_largest_frame(self):
+        # The slow source feeds the adder next to the fast one, and the fast source feeds a second sink as well
+        graph = flowgraph(block("fast", "analog_sig_source_x", ["add", "probe"], samp_rate="1e6"),
+                          block("slow", "analog_sig_source_x", ["add"], samp_rate="8000"),
+                          block("add", "blocks_add_xx", ["sink"]),
+                          block("sink", "blocks_null_sink"),
+                          block("probe", "blocks_probe_signal_x"))
+        plan = plan_buffers(graph, "balanced")
+        self.assertEqual(frames(plan), [(None, 4096), (None, 4096), (4096, 4096), (4096, None), (4096, None)])
+        for src, dst in graph.edges():
+            self.assertEqual(plan.ports[src][1].frame_size, plan.ports[dst][0].frame_size)
+
+    def test_unknown_profile(self):
+        self.assertRaises(ValueError, plan_buffers, receiver(), "huge")
+
+
+if __name__ == '__main__':
+    unittest.main()
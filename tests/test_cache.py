@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from diac.cache import BlockCache
+from diac.conversion import convert
+from diac.sinks import DirectorySink
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+class BlockCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.blocks = os.path.join(self.directory, "blocks")
+        os.makedirs(self.blocks)
+        self.flowgraph = os.path.join(self.directory, "flowgraph.grc")
+        shutil.copy(os.path.join(DATA, "flowgraph.grc"), self.flowgraph)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_conversion(self, force=False):
+        """Convert the flowgraph into the blocks directory and return the summary and the FB files written."""
+        sink = convert(self.flowgraph).write(DirectorySink(self.blocks, force=force))
+        return sink.summary(), sorted(os.path.basename(path) for path in sink.written_paths)
+
+    def test_unchanged_blocks_are_not_regenerated(self):
+        summary, written = self.run_conversion()
+        self.assertEqual(summary, "0 unchanged, 5 regenerated")
+        self.assertEqual(len(written), 5)
+        stamps = {name: os.stat(os.path.join(self.blocks, name)).st_mtime_ns for name in written}
+
+        self.assertEqual(self.run_conversion(), ("5 unchanged, 0 regenerated", []))
+        self.assertEqual({name: os.stat(os.path.join(self.blocks, name)).st_mtime_ns for name in written}, stamps)
+
+    def test_changed_interface_is_regenerated(self):
+        self.run_conversion()
+        # A BOOL parameter turned INT changes the interface of the throttle, its file name stays
+        with open(self.flowgraph, 'r') as file:
+            content = file.read()
+        with open(self.flowgraph, 'w') as file:
+            file.write(content.replace("ignoretag: 'True'", "ignoretag: '1'"))
+        self.assertEqual(self.run_conversion(), ("4 unchanged, 1 regenerated", ["fb_blocks_throttle_gen.fbt"]))
+        self.assertEqual(self.run_conversion(), ("5 unchanged, 0 regenerated", []))
+
+    def test_deleted_file_and_force(self):
+        self.run_conversion()
+        os.remove(os.path.join(self.blocks, "fb_blocks_null_sink_gen.fbt"))
+        self.assertEqual(self.run_conversion(), ("4 unchanged, 1 regenerated", ["fb_blocks_null_sink_gen.fbt"]))
+        summary, written = self.run_conversion(force=True)
+        self.assertEqual((summary, len(written)), ("0 unchanged, 5 regenerated", 5))
+
+    def test_manifest(self):
+        self.run_conversion()
+        cache = BlockCache(self.blocks).load()
+        fbts = sorted(name for name in os.listdir(self.blocks) if name.endswith(".fbt"))
+        self.assertEqual(sorted(cache.entries), fbts)
+        self.assertTrue(cache.is_current())
+        # Another conversion saving the manifest makes the loaded one stale
+        other = BlockCache(self.blocks).load()
+        other.update(os.path.join(self.blocks, "fb_new_gen.fbt"), "digest")
+        other.save()
+        self.assertFalse(cache.is_current())
+        self.assertIn("fb_new_gen.fbt", cache.load().entries)
+        self.assertTrue(cache.is_current())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import unittest
+
+from radio.block_index import BlockIndex
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BLOCKS = os.path.join(ROOT, "tests", "data", "grc_blocks")
+
+# The script's name is no module name, it is loaded from its path
+_spec = importlib.util.spec_from_file_location("categorize_blocks", os.path.join(ROOT, "categorize-blocks.py"))
+categorize_blocks = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(categorize_blocks)
+
+
+class CategorizeBlocksTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.mapping = os.path.join(self.directory, "categories.yml")
+        self.index = BlockIndex(os.path.join(self.directory, "index.sqlite"))
+        self.index.refresh([BLOCKS])
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+
+    def load(self, text):
+        with open(self.mapping, 'w') as file:
+            file.write(text)
+        return categorize_blocks.load_category_mapping(self.mapping)
+
+    def test_grc_categories(self):
+        self.assertEqual(dict(categorize_blocks.categorize_blocks_by_type(self.index)),
+                         {"[Core]/Math Operators": ["blocks_multiply_const_xx"], "[Core]/Misc": ["blocks_throttle"],
+                          "[OOT]/Gain": ["oot_gain"]})
+
+    def test_overrides_take_precedence(self):
+        overrides = self.load("Math: [blocks_multiply_const_xx, oot_gain]\nUnused: [not_indexed]\nEmpty:\n")
+        self.assertEqual(overrides, {"blocks_multiply_const_xx": "Math", "oot_gain": "Math", "not_indexed": "Unused"})
+        categories = categorize_blocks.categorize_blocks_by_type(self.index, overrides)
+        self.assertEqual(dict(categories), {"Math": ["blocks_multiply_const_xx", "oot_gain"],
+                                            "[Core]/Misc": ["blocks_throttle"]})
+
+    def test_default_mapping_file(self):
+        overrides = categorize_blocks.load_category_mapping(categorize_blocks.DEFAULT_MAPPING_FILE)
+        self.assertEqual(overrides["fir_filter_xxx"], "Filters")
+        self.assertEqual(self.load(""), {})
+
+    def test_malformed_mapping(self):
+        for text in ("Math: blocks_multiply_const_xx\n", "- blocks_multiply_const_xx\n"):
+            with self.subTest(text=text):
+                with self.assertRaisesRegex(ValueError, self.mapping):
+                    self.load(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import builtins
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import yaml
+
+from diac.conversion import NETWORK_FILE_NAME, convert, parse_source
+from diac.document import FBT, NETWORK
+from diac.function_block import fixed_generation_date
+from diac.sinks import MemorySink
+from radio.block_index import BlockIndex
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+FLOWGRAPH = os.path.join(DATA, "flowgraph.grc")
+
+
+def contents(result):
+    with fixed_generation_date(0):
+        return {document.file_name: document.content for document in result.documents}
+
+
+def parameters(flowgraph):
+    return [(block.name, block.type, dict(block.parameters)) for block in flowgraph]
+
+
+class ConvertTest(unittest.TestCase):
+    """The library API converts a flowgraph into documents held in memory."""
+
+    def test_nothing_is_written(self):
+        modes = []
+        builtin_open = builtins.open
+
+        def recording_open(file, mode='r', *arguments, **keywords):
+            modes.append(mode)
+            return builtin_open(file, mode, *arguments, **keywords)
+
+        with mock.patch.object(builtins, "open", recording_open), mock.patch("os.replace") as replace, \
+                mock.patch("os.remove") as remove:
+            result = convert(FLOWGRAPH)
+            documents = contents(result)
+        self.assertTrue(modes)
+        self.assertTrue(all(set(mode) <= {"r", "b", "t"} for mode in modes), modes)
+        replace.assert_not_called()
+        remove.assert_not_called()
+
+        self.assertEqual(documents[NETWORK_FILE_NAME], result.network)
+        self.assertTrue(result.network.startswith("<SubAppNetwork>"))
+        self.assertEqual({document.kind for document in result.documents if document.kind != NETWORK},
+                         {FBT, "dtp", "adp"})
+        self.assertEqual(len(result.fb_documents), len(result.fb_registry))
+
+    def test_sources(self):
+        with open(FLOWGRAPH, 'r') as file:
+            from_stream = convert(file)
+        with open(FLOWGRAPH, 'r') as file:
+            from_data = convert(yaml.safe_load(file))
+        expected = contents(convert(FLOWGRAPH))
+        self.assertEqual(contents(from_stream), expected)
+        self.assertEqual(contents(from_data), expected)
+
+        flowgraph = parse_source(FLOWGRAPH)
+        self.assertIs(parse_source(flowgraph), flowgraph)
+        self.assertIs(convert(flowgraph).flowgraph, flowgraph)
+        self.assertEqual(contents(convert(flowgraph)), expected)
+
+    def test_flowgraph_handed_in_stays_unchanged(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        block_index = BlockIndex(os.path.join(directory, "index.sqlite"))
+        self.addCleanup(block_index.close)
+        block_index.refresh([os.path.join(DATA, "grc_blocks")])
+
+        flowgraph = parse_source(FLOWGRAPH)
+        before = parameters(flowgraph)
+        result = convert(flowgraph, block_index=block_index)
+        self.assertGreater(result.definitions_found, 0)
+        self.assertIsNot(result.flowgraph, flowgraph)
+        self.assertEqual(parameters(flowgraph), before)
+        self.assertNotEqual(parameters(result.flowgraph), before)
+
+    def test_memory_sink(self):
+        result = convert(FLOWGRAPH, network_name="network.sys")
+        with fixed_generation_date(0):
+            sink = result.write(MemorySink())
+        self.assertEqual(sink.documents, contents(result))
+        self.assertEqual(list(sink.documents), [document.file_name for document in result.documents])
+        self.assertIs(result.get("network.sys"), result.network_document)
+        self.assertEqual(result.get("network.sys").content, result.network)
+        self.assertIsNone(result.get(NETWORK_FILE_NAME))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+
+from radio.expressions import ExpressionError, evaluate, fold_constants, parse_expression, variable_values
+from tests.helpers import block, flowgraph
+
+
+def with_variables(variables, **parameters):
+    """A flowgraph of variable blocks and one block "b" with the parameters."""
+    multiply = block("b", "blocks_multiply_const_xx", stream_type=None)
+    multiply.parameters = parameters
+    return flowgraph(*[block(name, "variable", stream_type=None, value=value) for name, value in variables.items()],
+                     multiply)
+
+
+def unfoldable(report):
+    return {(name, key): reason for name, key, _, reason in report.unfoldable}
+
+
+class EvaluateTest(unittest.TestCase):
+    def test_safe_expressions(self):
+        values = {"samp_rate": 32000}
+        self.assertEqual(evaluate(parse_expression("samp_rate / 4"), values), 8000.0)
+        self.assertEqual(evaluate(parse_expression("2 ** 10 - 1"), values), 1023)
+        self.assertEqual(evaluate(parse_expression("math.pi * 2"), values), evaluate(parse_expression("tau"), {}))
+        self.assertEqual(evaluate(parse_expression("numpy.sqrt(16)"), values), 4.0)
+        self.assertEqual(evaluate(parse_expression("[1, -samp_rate]"), values), [1, -32000])
+
+    def test_unsafe_expressions(self):
+        for expression in ("__import__('os').system('true')", "firdes.low_pass(1, 32000, 4000, 1000)",
+                           "(1).__class__", "open('x')", "max(*[1, 2])", "abs(x=1)", "lambda: 1",
+                           "2 ** 100000", "10 ** 1000 * 10 ** 1000 * 10 ** 1000 * 10 ** 1000 * 10 ** 1000",
+                           "1 / 0", "'a' * 3", "sqrt(-1)", "b'bytes'", "None"):
+            with self.subTest(expression=expression):
+                self.assertRaises(ExpressionError, evaluate, parse_expression(expression), {})
+
+    def test_parse_expression(self):
+        self.assertIsNone(parse_expression("1 +"))
+        self.assertIsNone(parse_expression("x = 1"))
+        self.assertIsNotNone(parse_expression(" samp_rate "))
+
+
+class FoldConstantsTest(unittest.TestCase):
+    def test_fold_safe_expressions(self):
+        graph = with_variables({"samp_rate": "32000", "cutoff": "samp_rate / 4"},
+                          const="cutoff * 2", vlen="1", type="complex", taps="[1, 2]", gain="-samp_rate")
+        folded, report = fold_constants(graph)
+        block = folded[folded.block_id("b")]
+        self.assertEqual(block.parameters, {"const": "16000.0", "vlen": "1", "type": "complex", "taps": "[1, 2]",
+                                            "gain": "-32000"})
+        self.assertEqual(folded[folded.block_id("cutoff")].parameters["value"], "8000.0")
+        self.assertEqual(report.folded, 3)
+        self.assertEqual(report.unfoldable, [])
+        # The flowgraph itself stays as it is
+        self.assertEqual(graph[graph.block_id("b")].parameters["const"], "cutoff * 2")
+
+    def test_unsafe_expressions_are_reported(self):
+        graph = with_variables({"samp_rate": "32000", "taps": "firdes.low_pass(1, samp_rate, 4000, 1000)"},
+                          const="__import__('os').getpid()", vlen="2 ** 100000", gain="taps[0]",
+                          offset="samp_rate * 1j", scale="samp_rate / 2")
+        folded, report = fold_constants(graph)
+        reasons = unfoldable(report)
+        self.assertEqual(reasons[("taps", "value")], "call of firdes.low_pass")
+        self.assertEqual(reasons[("b", "const")], "call of __import__('os').getpid")
+        self.assertEqual(reasons[("b", "vlen")], "exponent 100000 is too large")
+        self.assertEqual(reasons[("b", "gain")], "depends on taps")
+        self.assertEqual(reasons[("b", "offset")], "no IEC 61499 literal for complex")
+        self.assertEqual(len(reasons), 5)
+
+        block = folded[folded.block_id("b")]
+        self.assertEqual(block.parameters["const"], "__import__('os').getpid()")
+        self.assertEqual(block.parameters["scale"], "16000.0")
+        self.assertEqual(report.folded, 1)
+
+    def test_circular_variables(self):
+        graph = with_variables({"a": "b_rate + 1", "b_rate": "a * 2", "c": "3"}, const="a + c")
+        _, report = fold_constants(graph)
+        reasons = unfoldable(report)
+        self.assertEqual(reasons[("a", "value")], "circular dependency")
+        self.assertEqual(reasons[("b_rate", "value")], "circular dependency")
+        self.assertEqual(reasons[("b", "const")], "depends on a")
+        self.assertEqual(variable_values(graph), {"c": 3})
+
+    def test_plain_values_are_left_alone(self):
+        graph = with_variables({}, type="complex", const="2", name="'label'", window="window.WIN_HAMMING")
+        folded, report = fold_constants(graph)
+        self.assertEqual((report.folded, report.unfoldable), (0, []))
+        self.assertEqual(folded[folded.block_id("b")].parameters, graph[graph.block_id("b")].parameters)
+
+    def test_variables_without_blocks(self):
+        graph = with_variables({}, const="samp_rate / 8")
+        graph.variables = {"samp_rate": "samp_base * 2", "samp_base": "16000"}
+        folded, _ = fold_constants(graph)
+        self.assertEqual(folded[folded.block_id("b")].parameters["const"], "4000.0")
+        self.assertEqual(folded.variables, {"samp_rate": "32000", "samp_base": "16000"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BLOCKS = os.path.join(ROOT, "tests", "data", "grc_blocks")
+SCRIPT = os.path.join(ROOT, "extract-block-ids.py")
+
+# The script's name is no module name, it is loaded from its path
+_spec = importlib.util.spec_from_file_location("extract_block_ids", SCRIPT)
+extract_block_ids = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(extract_block_ids)
+
+
+class ExtractBlockIdsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.oot = os.path.join(self.directory, "oot")
+        os.makedirs(os.path.join(self.oot, "nested"))
+        with open(os.path.join(self.oot, "nested", "oot_mixer.block.yml"), 'w') as file:
+            file.write("id: oot_mixer\ncategory: '[OOT]/Mixers'\n")
+        with open(os.path.join(self.oot, "broken.block.yml"), 'w') as file:
+            file.write("id: [unclosed\n")
+        with open(os.path.join(self.oot, "notes.txt"), 'w') as file:
+            file.write("id: not_yaml\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_scan_files(self):
+        files = extract_block_ids.find_yaml_files([BLOCKS, self.oot])
+        self.assertEqual([path for path in files if path.startswith(self.oot)],
+                         [os.path.join(self.oot, "broken.block.yml"),
+                          os.path.join(self.oot, "nested", "oot_mixer.block.yml")])
+        found, errors = extract_block_ids.scan_files(files)
+        # A YAML file holding no mapping is skipped without an error
+        self.assertEqual(sorted(found), [("blocks_multiply_const_xx", "[Core]/Math Operators"),
+                                         ("blocks_throttle", "[Core]/Misc"), ("oot_gain", "[OOT]/Gain"),
+                                         ("oot_mixer", "[OOT]/Mixers")])
+        self.assertEqual([path for path, _ in errors], [os.path.join(self.oot, "broken.block.yml")])
+
+    def test_parallel_scan(self):
+        # The worker processes import the functions of the script, so it runs as a script
+        result = subprocess.run([sys.executable, SCRIPT, BLOCKS, self.oot, "--jobs", "2"], capture_output=True,
+                                text=True, cwd=ROOT)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        ids, _, rest = result.stdout.partition("\nUnique Categories:\n")
+        categories, _, summary = rest.partition("\n\nScanned ")
+        self.assertEqual(ids.splitlines()[1:], ["blocks_multiply_const_xx", "blocks_throttle", "oot_gain",
+                                                "oot_mixer"])
+        self.assertEqual(categories.splitlines(), ["[Core]/Math Operators", "[Core]/Misc", "[OOT]/Gain",
+                                                   "[OOT]/Mixers"])
+        self.assertIn("4 ids, 4 categories, 1 errors", summary)
+        self.assertIn("Error processing file " + os.path.join(self.oot, "broken.block.yml"), summary)
+
+    def test_default_directories(self):
+        with mock.patch.dict(os.environ, {"GRC_BLOCKS_PATH": os.pathsep.join([self.oot, ""])}):
+            directories = extract_block_ids.default_directories()
+        self.assertEqual(directories,
+                         [extract_block_ids.CORE_DIRECTORY] + extract_block_ids.OOT_DIRECTORIES + [self.oot])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from diac.fb_registry import FunctionBlockRegistry
+from tests.helpers import block
+
+
+def multiply(name, const, vlen="1"):
+    result = block(name, "blocks_multiply_const_xx", const=const, vlen=vlen)
+    result.has_inputs = result.has_outputs = True
+    return result
+
+
+def registered(blocks, suffixes=None):
+    fb_registry = FunctionBlockRegistry(suffixes)
+    fb_types = [fb_registry.register(block) for block in blocks]
+    fb_registry.assign_names()
+    return fb_registry, [fb_type.name for fb_type in fb_types]
+
+
+class FunctionBlockRegistryTest(unittest.TestCase):
+    def test_one_type_per_signature(self):
+        fb_registry, names = registered([multiply("a", "2"), multiply("b", "3"), multiply("c", "4")])
+        self.assertEqual(len(fb_registry), 1)
+        self.assertEqual(names, ["BLOCKS_MULTIPLY_CONST_XX"] * 3)
+        (fb_type,) = fb_registry
+        self.assertEqual((fb_type.instances, fb_type.file_name), (3, "fb_blocks_multiply_const_xx_gen.fbt"))
+
+    def test_suffixes_only_on_a_clash(self):
+        # An INT and a REAL constant give the same id two interfaces
+        blocks = [multiply("a", "2"), multiply("b", "2.5"), multiply("c", "3")]
+        _, names = registered(blocks)
+        _, reversed_names = registered(blocks[::-1])
+        self.assertEqual(len(set(names)), 2)
+        self.assertEqual(names[0], names[2])
+        self.assertTrue(all(name.startswith("BLOCKS_MULTIPLY_CONST_XX_") and len(name) == 33 for name in names))
+        # The names do not depend on the order of the blocks
+        self.assertEqual(reversed_names, names[::-1])
+
+    def test_shared_registry_of_a_batch(self):
+        first, first_names = registered([multiply("a", "2")])
+        second, second_names = registered([multiply("a", "2.5")])
+        unchanged, _ = registered([multiply("a", "2"), multiply("b", "2.5")])
+        self.assertEqual(first_names, second_names)
+
+        shared = FunctionBlockRegistry()
+        for fb_registry in (first, second, unchanged):
+            shared.update(fb_registry)
+        shared.assign_names()
+        self.assertEqual(len(shared), 2)
+        self.assertIsNone(shared.suffixes_of(unchanged))
+        # The flowgraphs named their type on their own, they are converted again with the shared suffixes
+        suffixes = shared.suffixes_of(first)
+        self.assertEqual(first_names, ["BLOCKS_MULTIPLY_CONST_XX"])
+        _, names = registered([multiply("a", "2")], suffixes)
+        self.assertEqual(names, [shared.types[next(iter(first)).signature].name])
+        self.assertNotEqual(names, first_names)
+
+
+if __name__ == '__main__':
+    unittest.main()
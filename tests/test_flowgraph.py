@@ -0,0 +1,57 @@
+import random
+import unittest
+
+from radio.block import Block, Connection
+from radio.flowgraph import FlowGraph
+from tests.helpers import block, flowgraph
+
+
+class FlowGraphTest(unittest.TestCase):
+    def test_adjacency(self):
+        graph = flowgraph(block("a", "x", ["b", "c", "gone"]), block("b", "x", ["c"]), block("c", "x", ["a", "c"]),
+                          block("d", "x"))
+        self.assertEqual(graph.num_edges, 5)
+        self.assertEqual(list(graph.edges()), [(0, 1), (0, 2), (1, 2), (2, 0), (2, 2)])
+        self.assertEqual([list(graph.successors(i)) for i in range(4)], [[1, 2], [2], [0, 2], []])
+        self.assertEqual([list(graph.predecessors(i)) for i in range(4)], [[2], [0], [0, 1, 2], []])
+        self.assertEqual([(graph.in_degree(i), graph.out_degree(i)) for i in range(4)],
+                         [(1, 2), (1, 1), (3, 2), (0, 0)])
+        self.assertEqual([(block.has_inputs, block.has_outputs) for block in graph],
+                         [(True, True), (True, True), (True, True), (False, False)])
+        self.assertEqual((graph.block_id("c"), graph[2].name, len(graph)), (2, "c", 4))
+
+    def test_matches_adjacency_lists(self):
+        generator = random.Random(7)
+        names = [f"b{i}" for i in range(200)]
+        blocks = [block(name, "x", [generator.choice(names) for _ in range(generator.randrange(4))])
+                  for name in names]
+        graph = FlowGraph(blocks)
+        for block_id, source in enumerate(blocks):
+            self.assertEqual([graph[i].name for i in graph.successors(block_id)],
+                             [connection.dst for connection in source.connections])
+            self.assertEqual(sorted(graph[i].name for i in graph.predecessors(block_id)),
+                             sorted(other.name for other in blocks for connection in other.connections
+                                    if connection.dst == source.name))
+
+    def test_duplicate_names_resolve_to_the_first_block(self):
+        graph = flowgraph(block("a", "x"), block("b", "x", ["a"]), block("a", "y"))
+        self.assertEqual(graph.block_id("a"), 0)
+        self.assertEqual(list(graph.edges()), [(1, 0)])
+
+    def test_copy(self):
+        graph = flowgraph(block("a", "x", ["b"], gain="1"), block("b", "x"))
+        graph.variables["samp_rate"] = "32000"
+        copy = graph.copy()
+        copy[0].parameters["gain"] = "2"
+        copy.variables["samp_rate"] = "48000"
+        self.assertEqual((graph[0].parameters["gain"], graph.variables["samp_rate"]), ("1", "32000"))
+        self.assertEqual(list(copy.edges()), list(graph.edges()))
+
+    def test_slots(self):
+        for value in (Block("a", "x"), Connection("a", "b"), FlowGraph([])):
+            with self.subTest(type=type(value).__name__):
+                self.assertFalse(hasattr(value, "__dict__"))
+
+
+if __name__ == '__main__':
+    unittest.main()
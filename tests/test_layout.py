@@ -0,0 +1,63 @@
+import random
+import unittest
+
+from diac.layout import (LAYER_SPACING, ROW_SPACING, X_ORIGIN, Y_ORIGIN, assign_layers, count_crossings,
+                         layered_layout, order_layers)
+from tests.helpers import block, flowgraph
+
+
+def crossings(graph, order):
+    """Count the crossing connections between neighbouring layers of the order, pair by pair."""
+    position = {block_id: (layer, row) for layer, block_ids in enumerate(order)
+                for row, block_id in enumerate(block_ids)}
+    edges = [(position[src][1], position[dst][1], position[src][0]) for src, dst in graph.edges()
+             if position[dst][0] == position[src][0] + 1]
+    return sum(1 for i, (a, b, layer) in enumerate(edges) for c, d, other in edges[i + 1:]
+               if layer == other and (a - c) * (b - d) < 0)
+
+
+class LayoutTest(unittest.TestCase):
+    def test_layers_follow_the_longest_path(self):
+        graph = flowgraph(block("sink", "x"), block("source", "x", ["filter", "sink"]), block("filter", "x", ["gain"]),
+                          block("gain", "x", ["sink"]), block("alone", "x"))
+        self.assertEqual(assign_layers(graph), [3, 0, 1, 2, 0])
+        positions = layered_layout(graph)
+        self.assertEqual(positions[1], (X_ORIGIN, Y_ORIGIN))
+        self.assertEqual(positions[0], (X_ORIGIN + 3 * LAYER_SPACING, Y_ORIGIN))
+        self.assertEqual(sorted(positions[i] for i in (1, 4)),
+                         [(X_ORIGIN, Y_ORIGIN), (X_ORIGIN, Y_ORIGIN + ROW_SPACING)])
+
+    def test_cycles_are_broken(self):
+        graph = flowgraph(block("source", "x", ["a"]), block("a", "x", ["b"]), block("b", "x", ["a", "sink"]),
+                          block("sink", "x"), block("c", "x", ["d"]), block("d", "x", ["c"]))
+        layers = assign_layers(graph)
+        self.assertEqual(layers[:4], [0, 1, 2, 3])
+        self.assertEqual(sorted(layers[4:]), [0, 1])
+        self.assertEqual(len(set(layered_layout(graph))), len(graph))
+
+    def test_sweeps_remove_crossings(self):
+        graph = flowgraph(block("s1", "x", ["t2"]), block("s2", "x", ["t1"]), block("t1", "x"), block("t2", "x"))
+        layers = assign_layers(graph)
+        self.assertEqual(crossings(graph, order_layers(graph, layers, 0)), 1)
+        self.assertEqual(order_layers(graph, layers), [[0, 1], [3, 2]])
+        self.assertEqual(crossings(graph, order_layers(graph, layers)), 0)
+
+    def test_sweeps_never_add_crossings(self):
+        for seed in range(5):
+            generator = random.Random(seed)
+            names = [f"b{i}" for i in range(300)]
+            # Connections only go to later blocks, so the layers are those of a DAG
+            graph = flowgraph(*[block(name, "x", [generator.choice(names[i + 1:i + 30])
+                                                  for _ in range(generator.randrange(3))] if names[i + 1:] else [])
+                                for i, name in enumerate(names)])
+            layers = assign_layers(graph)
+            before, after = order_layers(graph, layers, 0), order_layers(graph, layers)
+            with self.subTest(seed=seed):
+                self.assertEqual(count_crossings(graph, layers, before), crossings(graph, before))
+                self.assertEqual(count_crossings(graph, layers, after), crossings(graph, after))
+                self.assertLess(crossings(graph, after), crossings(graph, before) / 2)
+                self.assertEqual(sorted(block_id for layer in after for block_id in layer), list(range(len(graph))))
+
+
+if __name__ == '__main__':
+    unittest.main()
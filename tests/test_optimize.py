@@ -0,0 +1,90 @@
+import unittest
+
+from radio.optimize import PASSES, optimize
+from tests.helpers import block, flowgraph
+
+
+def edges(graph):
+    return sorted((block.name, connection.dst) for block in graph for connection in block.connections)
+
+
+class OptimizeTest(unittest.TestCase):
+    def test_disabled_and_bypassed_blocks(self):
+        graph = flowgraph(block("source", "analog_sig_source_x", ["filter", "probe"]),
+                          block("filter", "fir_filter_xxx", ["sink"], state="bypassed"),
+                          block("probe", "blocks_probe_signal_x", state="disabled"),
+                          block("sink", "blocks_null_sink"))
+        optimized, report = optimize(graph, ["disabled"])
+        self.assertEqual([block.name for block in optimized], ["source", "sink"])
+        self.assertEqual(edges(optimized), [("source", "sink")])
+        self.assertEqual(report.removed, {"disabled": ["filter", "probe"]})
+        self.assertTrue(optimized[optimized.block_id("sink")].has_inputs)
+        # The flowgraph itself stays as it is
+        self.assertEqual(len(graph), 4)
+        self.assertEqual(edges(graph), [("filter", "sink"), ("source", "filter"), ("source", "probe")])
+
+    def test_virtual_ports(self):
+        graph = flowgraph(block("source", "analog_sig_source_x", ["to_a"]),
+                          block("to_a", "virtual_sink", stream_id="'a'"),
+                          block("from_a", "virtual_source", ["sink"], stream_id="'a'"),
+                          block("from_a_2", "virtual_source", ["scope"], stream_id="'a'"),
+                          block("from_b", "virtual_source", ["sink"], stream_id="'b'"),
+                          block("sink", "blocks_null_sink"),
+                          block("scope", "qtgui_time_sink_x"))
+        optimized, report = optimize(graph, ["virtual"])
+        self.assertEqual(edges(optimized), [("source", "scope"), ("source", "sink")])
+        self.assertEqual(report.removed["virtual"], ["to_a", "from_a", "from_a_2", "from_b"])
+
+    def test_fuse_constant_arithmetic(self):
+        graph = flowgraph(block("source", "analog_sig_source_x", ["times_2"]),
+                          block("times_2", "blocks_multiply_const_xx", ["times_3"], const="2"),
+                          block("times_3", "blocks_multiply_const_xx", ["sink"], const="3"),
+                          block("sink", "blocks_null_sink"))
+        optimized, report = optimize(graph, ["fuse"])
+        self.assertEqual(edges(optimized), [("source", "times_2"), ("times_2", "sink")])
+        self.assertEqual(optimized[optimized.block_id("times_2")].parameters["const"], "6")
+        self.assertEqual(report.removed, {"fuse": ["times_3"]})
+        self.assertEqual(graph[graph.block_id("times_2")].parameters["const"], "2")
+
+    def test_fusion_stops_at_branches_and_expressions(self):
+        graph = flowgraph(block("source", "analog_sig_source_x", ["a", "scope"]),
+                          block("a", "blocks_multiply_const_xx", ["b", "scope"], const="2"),
+                          block("b", "blocks_multiply_const_xx", ["c"], const="3"),
+                          block("c", "blocks_multiply_const_xx", ["d"], const="gain"),
+                          block("d", "blocks_add_const_vxx", ["sink"], const="1"),
+                          block("scope", "qtgui_time_sink_x"),
+                          block("sink", "blocks_null_sink"))
+        optimized, report = optimize(graph, ["fuse"])
+        self.assertEqual(report.removed, {"fuse": []})
+        self.assertEqual(len(optimized), len(graph))
+
+    def test_identity_removal(self):
+        graph = flowgraph(block("source", "analog_sig_source_x", ["half"]),
+                          block("half", "blocks_multiply_const_xx", ["double"], const="0.5"),
+                          block("double", "blocks_multiply_const_xx", ["offset"], const="2"),
+                          block("offset", "blocks_add_const_vxx", ["sink"], const="0"),
+                          block("sink", "blocks_null_sink"))
+        optimized, report = optimize(graph, ["fuse"])
+        self.assertEqual(edges(optimized), [("source", "sink")])
+        self.assertEqual(report.removed, {"fuse": ["double", "half", "offset"]})
+
+    def test_passes_run_in_order(self):
+        graph = flowgraph(block("source", "analog_sig_source_x", ["times_2"]),
+                          block("times_2", "blocks_multiply_const_xx", ["to_a"], const="2"),
+                          block("to_a", "virtual_sink", stream_id="'a'"),
+                          block("from_a", "virtual_source", ["probe"], stream_id="'a'"),
+                          block("probe", "blocks_probe_signal_x", ["times_3"], state="bypassed"),
+                          block("times_3", "blocks_multiply_const_xx", ["sink"], const="3"),
+                          block("sink", "blocks_null_sink"))
+        optimized, report = optimize(graph)
+        self.assertEqual(list(report.removed), list(PASSES))
+        self.assertEqual(edges(optimized), [("source", "times_2"), ("times_2", "sink")])
+        self.assertEqual(optimized[optimized.block_id("times_2")].parameters["const"], "6")
+        self.assertEqual(report.total, 4)
+
+    def test_unknown_pass(self):
+        self.assertRaises(ValueError, optimize, flowgraph(), ["inline"])
+
+
+if __name__ == '__main__':
+    unittest.main()
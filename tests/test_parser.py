@@ -0,0 +1,61 @@
+import io
+import os
+import unittest
+
+import yaml
+
+from radio import parser
+from radio.parser import Parser
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def data(blocks, connections):
+    return {"blocks": [{"name": name, "id": id, "parameters": {"comment": "", "type": "float"}}
+                       for name, id in blocks],
+            "connections": [[src, "0", dst, "0"] for src, dst in connections]}
+
+
+class ParserTest(unittest.TestCase):
+    def test_parse(self):
+        graph = Parser(os.path.join(DATA, "flowgraph.grc")).parse()
+        self.assertEqual([block.name for block in graph],
+                         ["freq", "analog_sig_source_x_0", "blocks_multiply_const_xx_0", "blocks_multiply_const_xx_1",
+                          "blocks_throttle_0", "blocks_null_sink_0"])
+        self.assertEqual(graph.variables["samp_rate"], "32000")
+        source = graph[graph.block_id("analog_sig_source_x_0")]
+        self.assertEqual([connection.dst for connection in source.connections], ["blocks_throttle_0"])
+        self.assertEqual((source.type, source.parameters["samp_rate"]), ("complex", "32000"))
+        self.assertNotIn("affinity", source.parameters)
+        self.assertEqual(graph.num_edges, 4)
+        self.assertEqual([(block.has_inputs, block.has_outputs) for block in graph],
+                         [(False, False), (False, True), (True, True), (True, True), (True, True), (True, False)])
+
+    def test_connections_resolved_by_name(self):
+        graph = Parser(None).parse_data(data([("a", "x"), ("b", "x"), ("a", "y")],
+                                             [("a", "b"), ("b", "a"), ("gone", "b")]))
+        # A connection goes to the first block of its name, connections from unknown blocks are dropped
+        self.assertEqual([[connection.dst for connection in block.connections] for block in graph], [["b"], ["a"], []])
+        self.assertEqual(graph.num_edges, 2)
+
+    def test_sources_agree(self):
+        path = os.path.join(DATA, "flowgraph.grc")
+        with open(path, 'r') as file:
+            text = file.read()
+
+        def contents(graph):
+            return [(block.name, block.parameters, [connection.dst for connection in block.connections])
+                    for block in graph]
+
+        expected = contents(Parser(path).parse())
+        self.assertEqual(contents(Parser(None).parse_stream(io.StringIO(text))), expected)
+        self.assertEqual(contents(Parser(None).parse_data(yaml.load(text, Loader=parser.SafeLoader))), expected)
+
+    def test_safe_loader(self):
+        self.assertIs(parser.SafeLoader, yaml.CSafeLoader if yaml.__with_libyaml__ else yaml.SafeLoader)
+        unsafe = "blocks: !!python/object/apply:os.getcwd []\nconnections: []\n"
+        self.assertRaises(yaml.YAMLError, Parser(None).parse_stream, io.StringIO(unsafe))
+
+
+if __name__ == '__main__':
+    unittest.main()
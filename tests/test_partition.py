@@ -0,0 +1,97 @@
+import unittest
+
+from diac.partition import Partition, generate_partitioned_fbn, partition_graph, route_connections
+from diac.project import scan_elements
+from tests.helpers import block, flowgraph
+
+
+def numbered(size, connections):
+    """A flowgraph of the complex blocks b0, b1, ... with the (src, dst) connections by block number."""
+    targets = [[] for _ in range(size)]
+    for src, dst in connections:
+        targets[src].append(dst if isinstance(dst, str) else f"b{dst}")
+    return flowgraph(*[block(f"b{i}", "blocks_copy", targets[i]) for i in range(size)])
+
+
+def chain(size, extra=()):
+    """A flowgraph b0 -> b1 -> ..., with extra connections."""
+    return numbered(size, [(i, i + 1) for i in range(size - 1)] + list(extra))
+
+
+def routed(graph, max_size):
+    root = partition_graph(graph, max_size)
+    route_connections(graph, root)
+    return root, {partition.name: partition for partition in root.partitions()}
+
+
+class PartitionTest(unittest.TestCase):
+    def test_partitions_are_bounded(self):
+        graph = chain(40)
+        root = partition_graph(graph, 8)
+        for partition in root.partitions():
+            self.assertLessEqual(len(partition.members), 8)
+        self.assertEqual(sorted(root.blocks()), list(range(40)))
+        self.assertIsNone(root.name)
+
+    def test_boundary_pins(self):
+        root, partitions = routed(chain(6), 2)
+        self.assertEqual([member.name for member in root.members], ["SubApp_1", "SubApp_4"])
+        self.assertEqual(partitions["SubApp_2"].members, [0, 1])
+        self.assertEqual(partitions["SubApp_3"].members, [2, 3])
+
+        # b3 -> b4 leaves two SubApps and enters one, every SubApp on the way gets a pin of its own
+        self.assertEqual(root.connections, [("SubApp_1.b3_DataOut", "SubApp_4.b4_DataIn")])
+        self.assertEqual(partitions["SubApp_1"].plugs, {3: "b3_DataOut"})
+        self.assertEqual(partitions["SubApp_3"].plugs, {3: "b3_DataOut"})
+        self.assertEqual(partitions["SubApp_4"].sockets, {4: "b4_DataIn"})
+        self.assertIn(("SubApp_3.b3_DataOut", "b3_DataOut"), partitions["SubApp_1"].connections)
+        self.assertIn(("b3.DataOut", "b3_DataOut"), partitions["SubApp_3"].connections)
+        self.assertIn(("b4_DataIn", "b4.DataIn"), partitions["SubApp_4"].connections)
+
+        # Connections inside a partition don't touch its pins
+        self.assertIn(("b0.DataOut", "b1.DataIn"), partitions["SubApp_2"].connections)
+        self.assertEqual(partitions["SubApp_2"].sockets, {})
+
+    def test_connections_of_a_block_share_its_pin(self):
+        # b1 feeds b2 -> b3 and b4 -> b5
+        root, partitions = routed(numbered(6, [(0, 1), (1, 2), (2, 3), (1, 4), (4, 5)]), 2)
+        self.assertEqual(partitions["SubApp_2"].members, [0, 1])
+        self.assertEqual(partitions["SubApp_2"].plugs, {1: "b1_DataOut"})
+        self.assertEqual(partitions["SubApp_2"].connections,
+                         [("b0.DataOut", "b1.DataIn"), ("b1.DataOut", "b1_DataOut")])
+        # Inside SubApp_1 the pin of SubApp_2 feeds SubApp_3 and the pin leading out of SubApp_1
+        self.assertEqual(partitions["SubApp_1"].connections, [("SubApp_2.b1_DataOut", "SubApp_3.b2_DataIn"),
+                                                              ("SubApp_2.b1_DataOut", "b1_DataOut")])
+        self.assertEqual(root.connections, [("SubApp_1.b1_DataOut", "SubApp_4.b4_DataIn")])
+
+    def test_missing_blocks_stay_next_to_their_source(self):
+        root, partitions = routed(chain(6, [(0, "gone")]), 2)
+        self.assertIn(("b0.DataOut", "gone.DataIn"), partitions["SubApp_2"].connections)
+        self.assertNotIn("gone", str([partition.connections for partition in partitions.values()
+                                      if partition.name != "SubApp_2"]))
+
+    def test_generated_pins(self):
+        graph = chain(6)
+        network = generate_partitioned_fbn(graph, ["COPY"] * 6, [[] for _ in range(6)], 2, layout=False)
+        elements = scan_elements(network.encode())
+        pins = {(element.parents[-3].name, element.parents[-1].tag, element.name): element.attributes["Type"]
+                for element in elements if element.tag == "AdapterDeclaration"}
+        self.assertEqual(pins, {("SubApp_1", "Plugs", "b3_DataOut"): "gnu_radio::GenericAdapter_COMPLEX",
+                                ("SubApp_3", "Sockets", "b2_DataIn"): "gnu_radio::GenericAdapter_COMPLEX",
+                                ("SubApp_3", "Plugs", "b3_DataOut"): "gnu_radio::GenericAdapter_COMPLEX",
+                                ("SubApp_2", "Plugs", "b1_DataOut"): "gnu_radio::GenericAdapter_COMPLEX",
+                                ("SubApp_4", "Sockets", "b4_DataIn"): "gnu_radio::GenericAdapter_COMPLEX"})
+        self.assertEqual(len([element for element in elements if element.tag == "FB"]), 6)
+        self.assertTrue(all(isinstance(member, Partition) for member in partition_graph(graph, 2).members))
+
+    def test_workers_generate_the_same_network(self):
+        graph = chain(30, [(3, 17), (25, 8)])
+        arguments = (graph, ["COPY"] * 30, [[] for _ in range(30)], 4)
+        network = generate_partitioned_fbn(*arguments)
+        self.assertGreater(len(partition_graph(graph, 4).members), 1)
+        self.assertEqual(generate_partitioned_fbn(*arguments, workers=2), network)
+        self.assertEqual(generate_partitioned_fbn(*arguments, workers=1), network)
+
+
+if __name__ == '__main__':
+    unittest.main()
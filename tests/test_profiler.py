@@ -0,0 +1,25 @@
+import os
+import unittest
+
+from diac.conversion import convert
+from diac.sinks import MemorySink
+from radio.profiler import Profiler
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+class ProfilerTest(unittest.TestCase):
+    def test_phases_counts_and_fb_types(self):
+        profiler = Profiler()
+        result = convert(os.path.join(DATA, "flowgraph.grc"), profiler=profiler)
+        result.write(MemorySink(), profiler)
+        summary = profiler.summary()
+        for phase in ("parse", "type inference", "register FB types", "generate network", "render FB types",
+                      "write FB types", "write network"):
+            self.assertIn(phase, summary["phases"])
+        self.assertEqual(summary["counts"]["blocks"], len(result.flowgraph))
+        self.assertEqual(summary["counts"]["fb_types"], len(result.fb_documents))
+        # One render event per FB type, the blocks sharing a type have none of their own
+        self.assertEqual(sorted(summary["fb_types"]), sorted(document.name for document in result.fb_documents))
+        self.assertLess(len(summary["fb_types"]), len(result.flowgraph))
+        self.assertEqual(sum(event["cat"] == "fb type" for event in profiler.events), len(result.fb_documents))
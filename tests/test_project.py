@@ -0,0 +1,117 @@
+import os
+import unittest
+
+from diac.conversion import convert
+from diac.mapping import Resource
+from diac.project import project_resources, scan_elements, update_project
+from diac.writer import find_subappnetwork_span, splice_subappnetwork
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+NETWORK = '<SubAppNetwork><FB Name="gain" Type="gnu_radio::GAIN" x="0" y="0" /></SubAppNetwork>'
+
+
+def read(name):
+    with open(os.path.join(DATA, name), 'rb') as file:
+        return file.read()
+
+
+def apply(data, network, mapping=None):
+    return b"".join(update_project(data, network, mapping))
+
+
+class SpliceTest(unittest.TestCase):
+    def test_span_skips_comments(self):
+        data = read("mapped_project.sys")
+        start, end = find_subappnetwork_span(data)
+        self.assertTrue(data[start:end].startswith(b"<SubAppNetwork>\n\t\t\t<FB Name=\"old\""))
+        self.assertTrue(data[start:end].endswith(b"</SubAppNetwork>"))
+
+    def test_splice_keeps_every_other_byte(self):
+        data = read("project.sys")
+        start, end = find_subappnetwork_span(data)
+        spliced = b"".join(splice_subappnetwork(data, NETWORK))
+        self.assertEqual(spliced, data[:start] + NETWORK.encode() + data[end:])
+        self.assertEqual(b"".join(splice_subappnetwork(spliced, NETWORK)), spliced)
+
+    def test_splice_into_empty_network(self):
+        data = b'<System><Application Name="a"><SubAppNetwork/></Application></System>'
+        self.assertEqual(b"".join(splice_subappnetwork(data, NETWORK)),
+                         b'<System><Application Name="a">' + NETWORK.encode() + b'</Application></System>')
+
+    def test_splice_uses_declared_encoding(self):
+        data = b'<?xml version="1.0" encoding="ISO-8859-1"?>\n<System><SubAppNetwork></SubAppNetwork></System>'
+        spliced = b"".join(splice_subappnetwork(data, '<SubAppNetwork Comment="ä€" />'))
+        self.assertIn(b'Comment="\xe4&#8364;"', spliced)
+
+    def test_update_project_without_mapping_splices(self):
+        data = read("project.sys")
+        self.assertEqual(apply(data, NETWORK), b"".join(splice_subappnetwork(data, NETWORK)))
+
+
+class UpdateProjectTest(unittest.TestCase):
+    def setUp(self):
+        self.data = read("mapped_project.sys")
+        self.resources = [Resource.parse(path) for path in project_resources(scan_elements(self.data))]
+        self.result = convert(os.path.join(DATA, "flowgraph.grc"), resources=self.resources)
+
+    def test_mapping_is_idempotent(self):
+        once = apply(self.data, self.result.network, self.result.mapping)
+        self.assertEqual(apply(once, self.result.network, self.result.mapping), once)
+
+    def test_mapping_edits(self):
+        updated = apply(self.data, self.result.network, self.result.mapping).decode()
+        mapping = self.result.mapping
+        self.assertEqual(sorted(set(mapping.assignment)), [0, 1])
+        # Other applications, the START block and its connection stay, the old mapping of the application goes
+        self.assertIn('<Mapping From="otherApp.x" To="FORTE_A.EMB_RES.x"/>', updated)
+        self.assertIn('<FB Name="START" Type="E_RESTART" x="0" y="0"/>', updated)
+        self.assertIn('<Connection Source="START.COLD" Destination="X.INIT"/>', updated)
+        self.assertNotIn("projApp.old", updated)
+        self.assertTrue(updated.startswith('<?xml version="1.0" encoding="UTF-8"?>\n<!-- <SubAppNetwork> in'))
+        for name, target in mapping.mappings():
+            self.assertEqual(updated.count(f'<Mapping From="projApp.{name}" To="{target}" />'), 1)
+            self.assertEqual(updated.count(f'<FB Name="{name}" '), 2)
+
+        elements = scan_elements(updated.encode())
+        networks = [element for element in elements if element.tag == "FBNetwork"]
+        self.assertEqual([network.parents[-1].parents[-1].name for network in networks], ["FORTE_A", "FORTE_B"])
+
+    def test_cut_connections_are_reported(self):
+        mapping = self.result.mapping
+        crossing = sorted((mapping.instances[src][0], mapping.instances[dst][0]) for src, dst in mapping.graph.edges()
+                          if mapping.assignment[src] != mapping.assignment[dst])
+        cut = mapping.cut_connections()
+        self.assertTrue(crossing)
+        self.assertEqual(sorted((src, dst) for src, _, dst, _ in cut), crossing)
+        for src, src_resource, dst, dst_resource in cut:
+            self.assertNotEqual(src_resource, dst_resource)
+        warnings = mapping.warnings()
+        self.assertEqual(len(warnings), len(cut) + 1)
+        self.assertIn(f"{len(cut)} connection(s) between resources", warnings[0])
+        self.assertIn(f"{len(cut)} connections", mapping.summary())
+
+        # The written resource networks hold only the other connections
+        updated = apply(self.data, self.result.network, mapping).decode()
+        devices = updated[updated.index("<Device"):]
+        for src, _, dst, _ in cut:
+            self.assertNotIn(f'Source="{src}.DataOut" Destination="{dst}.DataIn"', devices)
+        self.assertEqual(convert(os.path.join(DATA, "flowgraph.grc"), resources=self.resources[:1]).mapping.warnings(),
+                         [])
+
+    def test_mapping_onto_other_resources_replaces_the_previous_one(self):
+        once = apply(self.data, self.result.network, self.result.mapping)
+        single = convert(os.path.join(DATA, "flowgraph.grc"), resources=self.resources[1:])
+        updated = apply(once, single.network, single.mapping)
+        self.assertEqual(apply(updated, single.network, single.mapping), updated)
+
+        elements = scan_elements(updated)
+        devices = {element.name: updated[element.start:element.end].decode() for element in elements
+                   if element.tag == "Device"}
+        self.assertNotIn("gnu_radio::", devices["FORTE_A"])
+        self.assertIn('<FB Name="START" Type="E_RESTART" x="0" y="0"/>', devices["FORTE_A"])
+        self.assertEqual(devices["FORTE_B"].count("gnu_radio::"), len(single.flowgraph))
+        self.assertNotIn(b'To="FORTE_A.EMB_RES.blocks', updated)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from diac.rules import RuleSet, compile_rules, load_rules
+from tests.helpers import block
+
+RULES = """
+rules:
+  - id: blocks_multiply_const_xx
+    type: float
+    fb_type: math::MUL_REAL
+    rename: {const: FACTOR}
+  - id_pattern: blocks_multiply_.*
+    parameters: {vlen: '1'}
+    omit: [vlen]
+  - id: blocks_multiply_const_xx
+    fb_type: math::MUL
+  - id_pattern: .*_sink
+    fb_type: io::SINK
+"""
+
+
+class RuleSetTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "rules.yml")
+        self.cache = os.path.join(self.directory, "cache")
+        with open(self.path, 'w') as file:
+            file.write(RULES)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_first_match_in_file_order(self):
+        rules = load_rules(self.path, None)
+        self.assertEqual(len(rules), 4)
+        # Exact ids and patterns are tried together in the order of the file
+        self.assertEqual(rules.match(block("b", "blocks_multiply_const_xx", stream_type="float", vlen="1")).index, 0)
+        self.assertEqual(rules.match(block("b", "blocks_multiply_const_xx", vlen="1")).index, 1)
+        self.assertEqual(rules.match(block("b", "blocks_multiply_const_xx", vlen="4")).index, 2)
+        self.assertEqual(rules.match(block("b", "blocks_multiply_xx", vlen="1")).index, 1)
+        self.assertIsNone(rules.match(block("b", "blocks_multiply_xx", vlen="4")))
+        self.assertEqual(rules.match(block("b", "blocks_null_sink")).index, 3)
+        self.assertIsNone(rules.match(block("b", "blocks_null_sink_2_src")))
+        self.assertEqual([rule.index for rule in rules.candidates("blocks_multiply_const_xx")], [0, 1, 2])
+
+    def test_apply(self):
+        rules = load_rules(self.path, None)
+        parameters = [("const", "2", "REAL"), ("vlen", "1", "INT")]
+        self.assertEqual(rules.rules[0].apply(parameters), [("FACTOR", "2", "REAL"), ("vlen", "1", "INT")])
+        self.assertEqual(rules.rules[1].apply(parameters), [("const", "2", "REAL")])
+        self.assertEqual(rules.rules[0].type_name("MUL_1"), "math::MUL_REAL")
+        self.assertEqual(rules.rules[1].type_name("MUL_1"), "gnu_radio::MUL_1")
+
+    def test_malformed_rules(self):
+        for entries in ([{"id": "a", "id_pattern": "a", "omit": ["x"]}], [{"id": "a"}], [{"id": "a", "fb_type": "X"}],
+                        [{"id_pattern": "(", "omit": ["x"]}], [{"id": "a", "omit": [], "bypass": True}], ["a"],
+                        {"rule": []}):
+            with self.subTest(entries=entries):
+                self.assertRaises(ValueError, compile_rules, entries)
+
+    def test_cache_hit(self):
+        rules = load_rules(self.path, self.cache)
+        (name,) = os.listdir(self.cache)
+        self.assertTrue(name.startswith(rules.digest))
+
+        # A cached RuleSet of the same digest is taken as it is
+        cached = RuleSet(rules.rules[:1], rules.digest)
+        with open(os.path.join(self.cache, name), 'wb') as file:
+            pickle.dump(cached, file)
+        self.assertEqual(len(load_rules(self.path, self.cache)), 1)
+
+    def test_cache_invalidated_by_content(self):
+        first = load_rules(self.path, self.cache)
+        first.match(block("b", "blocks_null_sink"))
+        with open(self.path, 'w') as file:
+            file.write(RULES.replace("io::SINK", "io::OUT"))
+        second = load_rules(self.path, self.cache)
+        self.assertNotEqual(second.digest, first.digest)
+        self.assertEqual(second.match(block("b", "blocks_null_sink")).fb_type, "io::OUT")
+        self.assertEqual(len(os.listdir(self.cache)), 2)
+
+        # Restoring the content takes the first compilation from the cache again, without the memoized candidates
+        with open(self.path, 'w') as file:
+            file.write(RULES)
+        again = load_rules(self.path, self.cache)
+        self.assertEqual((again.digest, again._candidates), (first.digest, {}))
+        self.assertEqual(again.match(block("b", "blocks_null_sink")).fb_type, "io::SINK")
+
+    def test_broken_cache_is_recompiled(self):
+        rules = load_rules(self.path, self.cache)
+        (name,) = os.listdir(self.cache)
+        with open(os.path.join(self.cache, name), 'wb') as file:
+            file.write(b"not a pickle")
+        self.assertEqual(len(load_rules(self.path, self.cache)), len(rules))
+        with open(os.path.join(self.cache, name), 'rb') as file:
+            self.assertEqual(pickle.load(file).digest, rules.digest)
+
+
+if __name__ == '__main__':
+    unittest.main()
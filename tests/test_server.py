@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import tempfile
+import stat
+import threading
+import unittest
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import client
+from diac.cache import CACHE_FILE_NAME
+from main import convert_flowgraph
+from radio.block_index import BlockIndex
+from radio.parser import Parser
+from server import serve
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+class ServerTest(unittest.TestCase):
+    """Runs server.py on an ephemeral port of localhost and converts through client.py, offline."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.radio = os.path.join(self.directory, "flowgraph.grc")
+        self.diac = os.path.join(self.directory, "project.sys")
+        self.blocks = os.path.join(self.directory, "blocks")
+        self.types = os.path.join(self.directory, "types")
+        shutil.copy(os.path.join(DATA, "flowgraph.grc"), self.radio)
+        shutil.copy(os.path.join(DATA, "project.sys"), self.diac)
+        os.makedirs(self.blocks)
+        os.makedirs(self.types)
+
+        self.block_index = BlockIndex(os.path.join(self.directory, "index.sqlite"))
+        self.block_index.refresh([os.path.join(DATA, "grc_blocks")])
+        self.token_path = os.path.join(self.directory, "server.token")
+        self.server = serve(port=0, block_index=self.block_index, token_path=self.token_path)
+        self.url = "http://%s:%d" % self.server.server_address
+        self.token = client.read_token(self.token_path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.block_index.close()
+        shutil.rmtree(self.directory)
+
+    def variant(self, name, old, new):
+        """A copy of the flowgraph with some text replaced, next to the original."""
+        path = os.path.join(self.directory, name)
+        with open(self.radio, 'r') as file:
+            content = file.read()
+        with open(path, 'w') as file:
+            file.write(content.replace(old, new))
+        return path
+
+    def cache_entries(self):
+        with open(os.path.join(self.blocks, CACHE_FILE_NAME), 'r') as file:
+            return json.load(file)
+
+    def test_convert(self):
+        result = client.convert(self.url, self.radio, self.diac, self.blocks, self.types, token=self.token)
+        self.assertTrue(result["ok"], result.get("error"))
+        self.assertEqual((result["blocks"], result["fb_types"]), (6, 5))
+        self.assertEqual(len([name for name in os.listdir(self.blocks) if name.endswith(".fbt")]), 5)
+        self.assertEqual(sorted(os.listdir(self.types)), ["COMPLEX.dtp", "GenericAdapter_COMPLEX.adp"])
+        with open(self.diac, 'r') as file:
+            self.assertIn('Type="gnu_radio::BLOCKS_THROTTLE"', file.read())
+
+        result = client.convert(self.url, self.radio, self.diac, self.blocks, self.types, token=self.token)
+        self.assertEqual(result["cache"], "5 unchanged, 0 regenerated")
+        status = client.request(self.url, "/status", token=self.token)
+        self.assertEqual((status["conversions"], status["parse_hits"]), (2, 1))
+
+    def raw_request(self, path, body, headers):
+        """Send a request without client.py, return the HTTP status."""
+        try:
+            with urlopen(Request(self.url + path, data=body, headers=headers), timeout=10) as response:
+                return response.status
+        except HTTPError as e:
+            return e.code
+
+    def test_requests_without_token_are_refused(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.token_path).st_mode), 0o600)
+        body = json.dumps({"radio": self.radio, "diac": self.diac, "blocks": self.blocks}).encode()
+        authorization = "Bearer " + self.token
+        # A web page can send text/plain without a preflight, and carries its own Origin
+        self.assertEqual(self.raw_request("/convert", body, {"Content-Type": "text/plain",
+                                                             "Authorization": authorization}), 415)
+        self.assertEqual(self.raw_request("/convert", body, {"Content-Type": "application/json"}), 401)
+        self.assertEqual(self.raw_request("/convert", body, {"Content-Type": "application/json",
+                                                             "Authorization": "Bearer wrong"}), 401)
+        self.assertEqual(self.raw_request("/shutdown", b"{}", {"Content-Type": "application/json"}), 401)
+        self.assertEqual(self.raw_request("/convert", body, {"Content-Type": "application/json",
+                                                             "Authorization": authorization,
+                                                             "Origin": "http://example.com"}), 403)
+        self.assertEqual(self.raw_request("/status", None, {}), 401)
+        self.assertEqual(os.listdir(self.blocks), [])
+        self.assertEqual(self.server.conversions, 0)
+
+        self.assertEqual(self.raw_request("/status", None, {"Authorization": authorization,
+                                                            "Origin": self.server.origin}), 200)
+
+    def test_token_file_removed_on_close(self):
+        self.server.server_close()
+        self.assertFalse(os.path.exists(self.token_path))
+
+    def test_convert_failure(self):
+        result = client.convert(self.url, os.path.join(self.directory, "missing.grc"), self.diac, self.blocks,
+                                token=self.token)
+        self.assertFalse(result["ok"])
+        self.assertIn("FileNotFoundError", result["error"])
+
+    def test_cached_flowgraph_stays_as_parsed(self):
+        client.convert(self.url, self.radio, self.diac, self.blocks, self.types, token=self.token)
+        with open(self.diac, 'rb') as file:
+            first = file.read()
+        client.convert(self.url, self.radio, self.diac, self.blocks, self.types, token=self.token)
+        with open(self.diac, 'rb') as file:
+            self.assertEqual(file.read(), first)
+
+        # The block index adds the maximum parameter of the throttle, but only to the converted copy
+        cached = self.server.caches.flowgraphs[os.path.abspath(self.radio)][1]
+        parsed = Parser(self.radio).parse()
+        self.assertEqual([block.parameters for block in cached], [block.parameters for block in parsed])
+        self.assertIn("Maximum", first.decode())
+
+    def test_block_cache_reloaded_after_other_conversions(self):
+        client.convert(self.url, self.radio, self.diac, self.blocks, self.types, token=self.token)
+        # A conversion outside of the server writes more types into the same blocks directory
+        other = self.variant("float.grc", "type: complex", "type: float")
+        convert_flowgraph(other, self.diac, self.blocks, self.types, verbose=False)
+        written_outside = set(self.cache_entries())
+
+        scaled = self.variant("scaled.grc", "const: '2'", "const: '2.5'")
+        result = client.convert(self.url, scaled, self.diac, self.blocks, self.types, token=self.token)
+        self.assertTrue(result["ok"], result.get("error"))
+        self.assertLessEqual(written_outside, set(self.cache_entries()))
+
+
+if __name__ == '__main__':
+    unittest.main()
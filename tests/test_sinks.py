@@ -0,0 +1,61 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+from diac.conversion import convert
+from diac.function_block import generation_date
+from diac.sinks import ArchiveSink
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+class ArchiveSinkTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def archive(self, name, rendered=False):
+        """Convert the test flowgraph into the archive and return its sha256."""
+        result = convert(os.path.join(DATA, "flowgraph.grc"))
+        if rendered:
+            # The documents hold content dated today before the archive gets them
+            for document in result.documents:
+                document.content
+        path = os.path.join(self.directory, name)
+        result.write(ArchiveSink(path, project=os.path.join(DATA, "project.sys")))
+        with open(path, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+    def test_reproducible(self):
+        for extension in (".zip", ".tar", ".tar.gz"):
+            with self.subTest(extension=extension):
+                first = self.archive("first" + extension)
+                self.assertEqual(self.archive("second" + extension), first)
+                self.assertEqual(self.archive("rendered" + extension, rendered=True), first)
+                with mock.patch.dict(os.environ, {"SOURCE_DATE_EPOCH": "1700000000"}):
+                    dated = self.archive("dated" + extension, rendered=True)
+                    self.assertEqual(self.archive("dated_again" + extension), dated)
+                self.assertNotEqual(dated, first)
+
+    def test_types_dated_after_the_epoch(self):
+        with mock.patch.dict(os.environ, {"SOURCE_DATE_EPOCH": "1700000000"}):
+            self.archive("dated.zip", rendered=True)
+        with zipfile.ZipFile(os.path.join(self.directory, "dated.zip")) as archive:
+            names = archive.namelist()
+            self.assertIn("project.sys", names)
+            for name in names:
+                if name.startswith(("blocks/", "types/")):
+                    content = archive.read(name).decode("utf-8")
+                    self.assertIn('Date="2023-11-14"', content)
+                    self.assertNotIn(f'Date="{generation_date()}"', content)
+                    self.assertEqual(archive.getinfo(name).date_time, (2023, 11, 14, 22, 13, 20))
+
+
+if __name__ == '__main__':
+    unittest.main()
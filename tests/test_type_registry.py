@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from diac.type_registry import TypeRegistry
+from tests.helpers import block
+
+
+def registry(*streams):
+    """A TypeRegistry of blocks with outputs of the (stream type, vlen) streams."""
+    result = TypeRegistry()
+    for stream_type, vlen in streams:
+        source = block("source", "analog_sig_source_x", stream_type=stream_type, vlen=vlen)
+        source.has_outputs = True
+        result.register(source)
+    return result
+
+
+class TypeRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_each_type_once(self):
+        types = registry(("complex", "1"), ("float", "1"), ("int", "1"), ("short", "1"), ("byte", "1"),
+                         ("complex", "4"), ("complex", "1"), ("float", "1"))
+        # Blocks without ports need no adapter
+        types.register(block("samp_rate", "variable", stream_type=None))
+        self.assertEqual([document.file_name for document in types.documents()],
+                         ["COMPLEX.dtp", "COMPLEX_V4.dtp", "GenericAdapter_COMPLEX.adp",
+                          "GenericAdapter_COMPLEX_V4.adp", "GenericAdapter_DINT.adp", "GenericAdapter_INT.adp",
+                          "GenericAdapter_REAL.adp", "GenericAdapter_SINT.adp"])
+        self.assertEqual([document.file_name for document in registry().documents()], ["COMPLEX.dtp"])
+
+    def test_unchanged_files_are_left_alone(self):
+        registry(("complex", "1"), ("float", "1")).write(self.directory)
+        path = os.path.join(self.directory, "GenericAdapter_REAL.adp")
+        stamp = os.stat(path).st_mtime_ns
+
+        again = registry(("complex", "1"), ("float", "1"))
+        again.write(self.directory)
+        self.assertEqual((again.written, again.unchanged, again.written_paths), (0, 3, []))
+        self.assertEqual(os.stat(path).st_mtime_ns, stamp)
+
+        # A changed file is written again, paths this process wrote before are not even compared
+        with open(path, 'w') as file:
+            file.write("changed")
+        known = set()
+        changed = registry(("float", "1"))
+        changed.write(self.directory, known)
+        self.assertEqual((changed.written, changed.unchanged, changed.written_paths), (1, 1, [path]))
+        with open(path, 'w') as file:
+            file.write("changed")
+        cached = registry(("float", "1"))
+        cached.write(self.directory, known)
+        self.assertEqual((cached.written, cached.unchanged), (0, 2))
+        self.assertEqual(cached.summary(), "stream types REAL; 0 written, 2 unchanged")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import math
+import unittest
+
+from diac.types import IEC61499Converter, classify_value
+
+# Literals float() accepts and ones it rejects, next to plain integers and the other types
+FLOAT_CASES = ["1e5", ".5", "5.", "inf", "nan", "1_000", "+1.0", "0x10", " 1.0 ", "-Infinity", "nAn", "1.e5", "\t2.5\n",
+               "1E-3", "1__0", "_1", "1_", "1._5", "e5", ".", "+", "", "1e", "1.5.2", "1 0", "infinit", "1e5j"]
+
+
+def float_or_none(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class ClassifyValueTest(unittest.TestCase):
+    def test_real_exactly_where_float_accepts(self):
+        for value in FLOAT_CASES:
+            with self.subTest(value=value):
+                iec_type, converted = classify_value(value)
+                expected = float_or_none(value)
+                if expected is None:
+                    self.assertEqual((iec_type, converted), ("STRING", value))
+                elif math.isnan(expected):
+                    self.assertEqual(iec_type, "REAL")
+                    self.assertTrue(math.isnan(converted))
+                else:
+                    self.assertEqual((iec_type, converted), ("REAL", expected))
+
+    def test_other_types(self):
+        self.assertEqual(classify_value("42"), ("INT", "42"))
+        self.assertEqual(classify_value("32769"), ("DINT", "32769"))
+        self.assertEqual(classify_value(7), ("INT", 7))
+        self.assertEqual(classify_value(2.5), ("REAL", 2.5))
+        self.assertEqual(classify_value("True"), ("BOOL", "True"))
+        self.assertEqual(classify_value("COMPLEX"), ("COMPLEX", "COMPLEX"))
+        # Python bools are ints, as they always were
+        self.assertEqual(classify_value(True), ("INT", True))
+
+    def test_converter(self):
+        converted = IEC61499Converter({"samp_rate": "32000", "gain": "0.5", "label": "out"}).convert()
+        self.assertEqual(converted, [["samp_rate", "32000", "INT"], ["gain", 0.5, "REAL"], ["label", "out", "STRING"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
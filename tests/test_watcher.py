@@ -0,0 +1,106 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import main
+from radio.watcher import InotifyWatcher, PollingWatcher, watch_file
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+class ScriptedWatcher:
+    """Reports a change after each step of the script changed the file, and interrupts once it ran out of steps."""
+
+    def __init__(self, steps):
+        self.steps = iter(steps)
+        self.closed = False
+
+    def wait(self, timeout=None):
+        if timeout is not None:
+            # Nothing more within the debounce time
+            return False
+        step = next(self.steps, None)
+        if step is None:
+            raise KeyboardInterrupt
+        step()
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+class WatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "flowgraph.grc")
+        shutil.copy(os.path.join(DATA, "flowgraph.grc"), self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def save(self, old="", new=""):
+        with open(self.path, 'r') as file:
+            content = file.read()
+        # Editors save by writing a new file and renaming it over the old one
+        with open(self.path + ".new", 'w') as file:
+            file.write(content.replace(old, new) if old else content + "\n")
+        os.replace(self.path + ".new", self.path)
+
+    def assertDetects(self, watcher):
+        try:
+            self.assertFalse(watcher.wait(0.05))
+            with open(os.path.join(self.directory, "other.grc"), 'w') as file:
+                file.write("unrelated")
+            self.assertFalse(watcher.wait(0.05))
+            self.save()
+            self.assertTrue(watcher.wait(2))
+            with open(self.path, 'a') as file:
+                file.write("\n")
+            self.assertTrue(watcher.wait(2))
+        finally:
+            watcher.close()
+
+    def test_polling(self):
+        self.assertDetects(PollingWatcher(self.path, poll_interval=0.01))
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "needs inotify")
+    def test_inotify(self):
+        self.assertIsInstance(watch_file(self.path), InotifyWatcher)
+        self.assertDetects(InotifyWatcher(self.path))
+
+    def test_watch_mode_converts_only_what_changed(self):
+        blocks, types = os.path.join(self.directory, "blocks"), os.path.join(self.directory, "types")
+        os.makedirs(blocks)
+        os.makedirs(types)
+        project = os.path.join(self.directory, "project.sys")
+        shutil.copy(os.path.join(DATA, "project.sys"), project)
+        args = argparse.Namespace(radio=self.path, diac=project, blocks=blocks, types=types, force=False,
+                                  partition=None, jobs=None, buffer_profile=None, optimize=None, fold_constants=False)
+        watcher = ScriptedWatcher([self.save, lambda: self.save("const: '3'", "const: '4'"),
+                                   lambda: self.save("ignoretag: 'True'", "ignoretag: '1'")])
+        output = io.StringIO()
+        with mock.patch.object(main, "watch_file", return_value=watcher), contextlib.redirect_stdout(output):
+            main.run_watch(args)
+        cycles = [line for line in output.getvalue().splitlines() if "blocks converted in" in line]
+        self.assertEqual(len(cycles), 4)
+        self.assertIn("(cache: 0 unchanged, 5 regenerated, network written)", cycles[0])
+        # Saved unchanged, then a new constant only changes the network, then a new interface one FB type
+        self.assertIn("(cache: 5 unchanged, 0 regenerated, network unchanged)", cycles[1])
+        self.assertIn("(cache: 5 unchanged, 0 regenerated, network written)", cycles[2])
+        self.assertIn("(cache: 4 unchanged, 1 regenerated, network written)", cycles[3])
+        for cycle in cycles[1:]:
+            self.assertRegex(cycle, r"ms after save")
+        self.assertIn("Stopped watching", output.getvalue())
+        self.assertTrue(watcher.closed)
+        with open(project, 'r') as file:
+            self.assertIn('Value="4"', file.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
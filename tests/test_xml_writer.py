@@ -0,0 +1,104 @@
+import os
+import unittest
+import xml.etree.ElementTree as ET
+from io import StringIO
+from unittest import mock
+
+from diac.adapter import write_generic_adapter
+from diac.conversion import parse_source
+from diac.function_block import fixed_generation_date
+from diac.types import StreamType, write_complex_datatype_struct, write_vector_datatype_struct
+from diac.writer import write_fb_xml
+from diac.xml_writer import XML_DECLARATION
+from radio.block import Block
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+class TreeWriter:
+    """The interface of XMLWriter building an ElementTree, which is serialized once the root element is closed."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.builder = ET.TreeBuilder()
+        self.open_tags = []
+
+    def declaration(self):
+        self.stream.write(XML_DECLARATION)
+
+    def start(self, tag, **attributes):
+        self.builder.start(tag, {name: str(value) for name, value in attributes.items()})
+        self.open_tags.append(tag)
+
+    def text(self, text):
+        if text:
+            self.builder.data(text)
+
+    def end(self):
+        self.builder.end(self.open_tags.pop())
+        if not self.open_tags:
+            self.stream.write(ET.tostring(self.builder.close(), encoding="unicode"))
+
+    def element(self, tag, text=None, **attributes):
+        self.start(tag, **attributes)
+        self.text(text)
+        self.end()
+
+    def tag(self, tag, **attributes):
+        return _Tag(self, tag, attributes)
+
+
+class _Tag:
+    def __init__(self, writer, tag, attributes):
+        self.writer, self.tag, self.attributes = writer, tag, attributes
+
+    def __enter__(self):
+        self.writer.start(self.tag, **self.attributes)
+        return self.writer
+
+    def __exit__(self, *exc_info):
+        self.writer.end()
+
+
+def tree(markup):
+    def node(element):
+        return element.tag, element.attrib, element.text or "", element.tail or "", [node(child) for child in element]
+    return node(ET.fromstring(markup.encode()))
+
+
+class XMLWriterTest(unittest.TestCase):
+    """The streamed .fbt, .adp and .dtp files match what ElementTree makes of the same elements."""
+
+    def assertSameAsElementTree(self, module, write, *arguments):
+        streamed, built = StringIO(), StringIO()
+        with fixed_generation_date(0):
+            write(streamed, *arguments)
+            with mock.patch(module + ".XMLWriter", TreeWriter):
+                write(built, *arguments)
+        self.assertTrue(streamed.getvalue().startswith(XML_DECLARATION))
+        self.assertEqual(tree(streamed.getvalue()), tree(built.getvalue()))
+        self.assertEqual(streamed.getvalue(), built.getvalue())
+
+    def test_function_blocks(self):
+        blocks = list(parse_source(os.path.join(DATA, "flowgraph.grc")))
+        # Parameter names end up in the comments, with characters ElementTree escapes in attributes
+        special = Block("special", "epy_block")
+        special.type = "float"
+        special.parameters = {'gain "dB" & <max>': "1", "label\tline\nbreak": "'quoted'"}
+        special.has_inputs = special.has_outputs = True
+        for block in blocks + [special]:
+            with self.subTest(block=block.name):
+                self.assertSameAsElementTree("diac.writer", write_fb_xml, block)
+
+    def test_adapters(self):
+        for type_of_data in ("COMPLEX", "REAL", "VECTOR_4_COMPLEX"):
+            with self.subTest(type_of_data=type_of_data):
+                self.assertSameAsElementTree("diac.adapter", write_generic_adapter, type_of_data, 128)
+
+    def test_data_types(self):
+        self.assertSameAsElementTree("diac.types", write_complex_datatype_struct)
+        self.assertSameAsElementTree("diac.types", write_vector_datatype_struct, StreamType("COMPLEX", 4))
+
+
+if __name__ == '__main__':
+    unittest.main()